@@ -17,6 +17,7 @@ __all__ = [
     'exceptions',
     'kana_table',
     'maps',
+    'parallel',
     'scripts',
     'smart_cache',
     'resources',
@@ -57,15 +57,29 @@ def sopen(filename, mode='rb', encoding='utf8'):
     else:
         streamhandler = lambda x: x
 
+    # In Python 3, files opened in text mode are decoded with the given
+    # encoding, rather than the locale's, whether or not they are compressed.
+    decode = (six.PY3 and 'b' not in mode and
+              encoding not in (None, 'byte'))
+    text_mode = mode.replace('t', '') + 't'
+
     if filename.endswith('.bz2'):
-        stream = bz2.BZ2File(filename, mode)
+        if decode:
+            stream = bz2.open(filename, text_mode, encoding=encoding)
+        else:
+            stream = bz2.BZ2File(filename, mode)
     elif filename.endswith('.gz'):
-        stream = gzip.GzipFile(filename, mode)
+        if decode:
+            stream = gzip.open(filename, text_mode, encoding=encoding)
+        else:
+            stream = gzip.GzipFile(filename, mode)
     elif filename == '-':
         if read_mode:
             stream = sys.stdin
         else:
             stream = sys.stdout
+    elif decode:
+        stream = open(filename, mode, encoding=encoding)
     else:
         stream = open(filename, mode)
 
@@ -110,3 +124,10 @@ try:
     from contextlib import ExitStack as _ExitStack
 except ImportError:
     from contextlib2 import ExitStack as _ExitStack
+
+# The abstract base classes moved to collections.abc in Python 3.3, and the
+# aliases in collections were removed in Python 3.10
+try:
+    from collections.abc import Mapping as _Mapping
+except ImportError:
+    from collections import Mapping as _Mapping
@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+#  packed.py
+#  cjktools
+#
+
+"""
+Helpers for compact indexes: sets of small integers packed into the bits of
+a single Python integer, and arrays read in place from binary buffers such
+as memory-mapped files.
+"""
+
+from array import array
+from itertools import compress
+
+# Maps the digits of a binary string to the bytes 0 and 1, so that it can be
+# used as the selectors of itertools.compress().
+_BIT_TABLE = bytes(bytearray(int(i == ord('1')) for i in range(256)))
+
+
+def to_bits(ids):
+    """
+    Builds a bitset with the bits of a list of increasing ids set.
+    """
+    if not ids:
+        return 0
+
+    # Setting bits one at a time would copy the integer each time, so
+    # write out its binary digits instead, most significant first.
+    n = ids[-1] + 1
+    digits = bytearray(b'0') * n
+    for i in ids:
+        digits[n - 1 - i] = ord('1')
+
+    return int(digits.decode('ascii'), 2)
+
+
+def iter_bits(bits):
+    """
+    Yields the positions of the set bits of a bitset, in increasing order.
+    """
+    # The binary string is reversed so that string position matches bit
+    # position; splitting it on the set bits and summing the gap lengths is
+    # much faster than shifting, or than searching for each bit in turn.
+    position = -1
+    for gap in bin(bits)[:1:-1].split('1')[:-1]:
+        position += len(gap) + 1
+        yield position
+
+
+def select_bits(values, bits):
+    """
+    Returns a tuple of the values at the positions of the set bits of a
+    bitset. For a bitset no longer than the sequence of values, most of whose
+    bits are set, this is much faster than indexing with iter_bits().
+    """
+    selectors = bytearray(bin(bits)[:1:-1], 'ascii').translate(_BIT_TABLE)
+    return tuple(compress(values, selectors))
+
+
+def array_view(buf, offset, count, typecode):
+    """
+    Returns a read-only sequence of count items of the given array type in
+    a buffer at the given offset, and the offset just past them. Where
+    possible this is a view of the buffer rather than a copy, so that a
+    memory-mapped file is only read as it is used.
+
+    :param buf:
+        The buffer to read, such as an :py:class:`mmap.mmap`.
+
+    :param offset:
+        The byte offset of the first item.
+
+    :param count:
+        The number of items.
+
+    :param typecode:
+        An :py:mod:`array` typecode, such as ``'I'``.
+    """
+    end = offset + array(typecode).itemsize * count
+    try:
+        view = memoryview(buf)[offset:end].cast(typecode)
+    except (AttributeError, TypeError):
+        # Python 2 memoryviews cannot be cast, nor made of an mmap, so we
+        # fall back to a copy.
+        view = array(typecode)
+        view.fromstring(buf[offset:end])
+
+    return view, end
@@ -0,0 +1,248 @@
+# -*- coding: utf-8 -*-
+#
+#  parallel.py
+#  cjktools
+#
+
+"""
+Tools for parsing large line-based resources in a pool of worker processes.
+Files are split into byte ranges which begin and end on line boundaries, each
+range is parsed independently, and the partial results are returned in file
+order so that the caller can merge them. Streams which cannot be split, such
+as compressed files or standard input, are instead sent to the workers in
+chunks of lines.
+"""
+
+import os
+import multiprocessing
+from collections import deque
+from itertools import islice
+
+from cjktools.common import sopen
+
+
+def is_compressed(filename):
+    """
+    Returns True if the file is compressed, and so cannot be split into byte
+    ranges.
+    """
+    return filename.endswith('.bz2') or filename.endswith('.gz')
+
+
+def split_file(filename, n_chunks, boundary=None):
+    """
+    Splits a file into at most n_chunks byte ranges, each of which starts at
+    the beginning of a line. Compressed files cannot be seeked into cheaply,
+    so they are always returned as a single range.
+
+    :param filename:
+        The file to split.
+
+    :param n_chunks:
+        The desired number of chunks.
+
+    :param boundary:
+        If given, a byte string which every chunk must start with. This is
+        needed for formats such as the radkfile, where the meaning of a line
+        depends on an earlier header line.
+
+    :return:
+        A list of ``(start, end)`` byte offsets, where an ``end`` of
+        :py:const:`None` means the end of the file.
+    """
+    if n_chunks <= 1 or is_compressed(filename):
+        return [(0, None)]
+
+    size = os.path.getsize(filename)
+    offsets = [0]
+    with open(filename, 'rb') as istream:
+        for i in range(1, n_chunks):
+            istream.seek(max(size * i // n_chunks, offsets[-1]))
+
+            # Skip to the start of the next line.
+            istream.readline()
+            start = istream.tell()
+
+            if boundary is not None:
+                line = istream.readline()
+                while line and not line.startswith(boundary):
+                    start = istream.tell()
+                    line = istream.readline()
+
+            if start >= size:
+                break
+
+            if start > offsets[-1]:
+                offsets.append(start)
+
+    offsets.append(None)
+
+    return list(zip(offsets[:-1], offsets[1:]))
+
+
+def iter_lines(filename, start=0, end=None, encoding='utf8'):
+    """
+    Iterates over the decoded lines in the given byte range of a file.
+
+    :param filename:
+        The file to read.
+
+    :param start:
+        The offset of the first line to read.
+
+    :param end:
+        The offset to stop reading at, or :py:const:`None` to read to the end
+        of the file.
+
+    :param encoding:
+        The encoding of the file.
+    """
+    with sopen(filename, 'rb', encoding=None) as istream:
+        if start:
+            istream.seek(start)
+
+        position = start
+        for line in istream:
+            if end is not None and position >= end:
+                break
+
+            position += len(line)
+            yield line.decode(encoding)
+
+
+def _run_task(task):
+    parse_lines, filename, start, end, encoding = task
+    return parse_lines(iter_lines(filename, start, end, encoding))
+
+
+def parse_files(parse_lines, filenames, processes=None, chunks_per_file=None,
+                boundary=None, encoding='utf8'):
+    """
+    Parses a number of line-based files, splitting each into chunks which are
+    parsed in a pool of worker processes.
+
+    :param parse_lines:
+        A module-level function taking an iterator of lines and returning a
+        partial result. It must be picklable, and so cannot be a lambda or a
+        bound method.
+
+    :param filenames:
+        The files to parse.
+
+    :param processes:
+        The number of worker processes to use, defaulting to the number of
+        CPUs. If 1, the chunks are parsed serially in this process.
+
+    :param chunks_per_file:
+        How many chunks to split each file into. Defaults to the number of
+        processes.
+
+    :param boundary:
+        A byte string which every chunk must start with, as for
+        :func:`split_file`.
+
+    :param encoding:
+        The encoding of the files.
+
+    :return:
+        A list of partial results, one per chunk, in file order.
+    """
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if chunks_per_file is None:
+        chunks_per_file = processes
+
+    tasks = [(parse_lines, filename, start, end, encoding)
+             for filename in filenames
+             for (start, end) in split_file(filename, chunks_per_file,
+                                            boundary=boundary)]
+
+    if processes == 1 or len(tasks) == 1:
+        return [_run_task(task) for task in tasks]
+
+    pool = multiprocessing.Pool(min(processes, len(tasks)))
+    try:
+        return pool.map(_run_task, tasks)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def iter_chunks(iterable, chunk_size):
+    """ Splits an iterable into lists of at most chunk_size items. """
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+
+        yield chunk
+
+
+_worker_function = None
+_worker_context = None
+
+
+def _init_worker(function, context):
+    global _worker_function, _worker_context
+    _worker_function = function
+    _worker_context = context
+
+
+def _run_chunk(chunk):
+    return _worker_function(_worker_context, chunk)
+
+
+def map_chunks(function, iterable, context=None, processes=None,
+               chunk_size=1000):
+    """
+    Splits a stream into chunks which are processed in a pool of worker
+    processes, yielding the results in order. Only a few chunks are in
+    flight at any time, so memory use stays flat however long the stream,
+    and however far the consumer falls behind the workers.
+
+    :param function:
+        A module-level function taking the context and a list of items, and
+        returning a result for the chunk. It must be picklable, and so
+        cannot be a lambda or a bound method.
+
+    :param iterable:
+        The items to process, such as the lines of a file.
+
+    :param context:
+        An object passed to every call of the function, such as a dictionary
+        format or a preloaded table. It is sent to each worker once, when it
+        starts, rather than with every chunk.
+
+    :param processes:
+        The number of worker processes to use, defaulting to the number of
+        CPUs. If 1, the chunks are processed serially in this process.
+
+    :param chunk_size:
+        How many items to send to a worker at a time.
+    """
+    chunks = iter_chunks(iterable, chunk_size)
+
+    if processes is None:
+        processes = multiprocessing.cpu_count()
+
+    if processes == 1:
+        for chunk in chunks:
+            yield function(context, chunk)
+        return
+
+    pool = multiprocessing.Pool(processes, initializer=_init_worker,
+                                initargs=(function, context))
+    try:
+        pending = deque()
+        for chunk in chunks:
+            pending.append(pool.apply_async(_run_chunk, (chunk,)))
+            if len(pending) > 2 * processes:
+                yield pending.popleft().get()
+
+        while pending:
+            yield pending.popleft().get()
+    finally:
+        pool.close()
+        pool.join()
@@ -11,16 +11,24 @@ of the appropriate data files.
 """
 
 __all__ = [
+    'alternation_index',
     'auto_format',
     'bilingual_dict',
+    'code_index',
+    'dict_diff',
+    'dict_store',
+    'dict_trie',
     'format',
+    'jmdict',
     'kanjidic',
     'kanji_list',
     'languages',
     'pinyin_table',
     'place',
     'radkdict',
+    'sense_index',
     'split_by_codes',
+    'transliterate',
     'tree',
     'zhuyin_table',
 ]
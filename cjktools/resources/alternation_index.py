@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+#
+#  alternation_index.py
+#  cjktools
+#
+
+"""
+An index from the variants of dictionary readings back to their entries,
+for lookup which tolerates sequential voicing (rendaku) and sound euphony
+(onbin). Every variant is generated once, when the index is built, with
+:func:`alternations.surface_forms` and :func:`alternations.canonical_forms`,
+so that a query is a single lookup rather than a search over the forms of
+each of its segments.
+"""
+
+from __future__ import unicode_literals
+
+from array import array
+from itertools import combinations
+
+from six.moves import cPickle as pickle
+
+from cjktools import scripts
+from cjktools.alternations import surface_forms, canonical_forms, to_voiced
+
+VERSION = 1
+
+_TYPECODE = 'I'
+
+
+def reading_segmentations(word, reading, max_segments=2):
+    """
+    Yields the ways in which a reading may be split into one segment per
+    kanji of its word. Without an alignment of the reading to the kanji,
+    every split is possible, so words with many kanji are treated as having
+    at most max_segments segments, to bound the number of splits.
+
+    Only splits to which alternations can apply are yielded: the reading
+    must be hiragana, and each later segment must start with a kana.
+    """
+    n_kanji = sum(1 for c in word
+                  if scripts.script_type(c) == scripts.Script.Kanji)
+    n_segments = min(n_kanji, max_segments)
+    if n_segments < 2 or len(reading) < n_segments:
+        return
+
+    if scripts.script_type(reading) != scripts.Script.Hiragana:
+        return
+
+    for cuts in combinations(range(1, len(reading)), n_segments - 1):
+        if all(reading[i] in to_voiced for i in cuts):
+            bounds = (0,) + cuts + (len(reading),)
+            yield tuple(reading[i:j] for (i, j) in zip(bounds, bounds[1:]))
+
+
+class AlternationIndex(object):
+    """
+    A map from every variant of every dictionary reading to the words with
+    that reading. The variants of a reading are its surface forms, where
+    the reading is voiced or shortened further, and its canonical forms,
+    where voicing or shortening already in the reading is undone. Readings
+    are normalised to hiragana.
+
+    The variants are stored as one sorted string with an array of offsets
+    into it, and the words of each variant as compressed sparse rows of
+    word ids.
+
+    :param entries:
+        A :class:`BilingualDictionary`, or an iterable of
+        :class:`DictionaryEntry` objects, such as the stream from
+        :func:`auto_format.iter_entries`.
+
+    :param max_segments:
+        The maximum number of segments to split a reading into, as for
+        :func:`reading_segmentations`.
+    """
+
+    def __init__(self, entries, max_segments=2):
+        if hasattr(entries, 'values'):
+            entries = entries.values()
+
+        words = []
+        word_ids = {}
+        pairs = []
+        for entry in entries:
+            word_id = word_ids.get(entry.word)
+            if word_id is None:
+                word_id = word_ids[entry.word] = len(words)
+                words.append(entry.word)
+
+            variants = set()
+            for reading in set(entry.readings):
+                reading = scripts.to_hiragana(reading)
+                variants.add(reading)
+                for segments in reading_segmentations(entry.word, reading,
+                                                      max_segments):
+                    variants.update(''.join(f)
+                                    for f in surface_forms(segments))
+                    variants.update(''.join(f)
+                                    for f in canonical_forms(segments))
+
+            pairs.extend((v, word_id) for v in variants)
+
+        pairs.sort()
+
+        keys = []
+        offsets = array(_TYPECODE, [0])
+        indptr = array(_TYPECODE, [0])
+        indices = array(_TYPECODE)
+        for variant, word_id in pairs:
+            if not keys or keys[-1] != variant:
+                keys.append(variant)
+                offsets.append(offsets[-1] + len(variant))
+                indptr.append(indptr[-1])
+            elif indices[-1] == word_id:
+                # A homograph which was listed separately.
+                continue
+
+            indices.append(word_id)
+            indptr[-1] += 1
+
+        self._words = words
+        self._keys = ''.join(keys)
+        self._offsets = offsets
+        self._indptr = indptr
+        self._indices = indices
+
+    def __len__(self):
+        """ The number of distinct variants indexed. """
+        return len(self._offsets) - 1
+
+    def __contains__(self, reading):
+        return self._find(scripts.to_hiragana(reading)) is not None
+
+    def lookup(self, reading):
+        """
+        Returns the words which have the given reading, or a reading which
+        differs from it only by sequential voicing or sound euphony.
+        """
+        i = self._find(scripts.to_hiragana(reading))
+        if i is None:
+            return []
+
+        words = self._words
+        return [words[j]
+                for j in self._indices[self._indptr[i]:self._indptr[i + 1]]]
+
+    def save(self, filename):
+        """ Saves the index to a file, to be read with :meth:`load`. """
+        with open(filename, 'wb') as ostream:
+            pickle.dump((VERSION, self.__dict__), ostream,
+                        pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """ Loads an index saved with :meth:`save`. """
+        with open(filename, 'rb') as istream:
+            version, state = pickle.load(istream)
+
+        if version != VERSION:
+            raise ValueError('unsupported alternation index version in %s' %
+                             filename)
+
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+    def _find(self, key):
+        """ Finds the position of a variant by bisection, or None. """
+        keys = self._keys
+        offsets = self._offsets
+        lo = 0
+        hi = len(offsets) - 1
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if keys[offsets[mid]:offsets[mid + 1]] < key:
+                lo = mid + 1
+            else:
+                hi = mid
+
+        if lo < len(offsets) - 1 and keys[offsets[lo]:offsets[lo + 1]] == key:
+            return lo
+
+        return None
@@ -10,7 +10,9 @@ file.
 """
 from __future__ import unicode_literals
 
-from .dict_format import RegexFormat, UnknownFormatError
+from .dict_format import RegexFormat, EdictFormat, CedictFormat
+from .dict_format import UnknownFormatError
+from .jmdict import JMdictFormat
 
 
 def detect_format(header):
@@ -26,14 +28,23 @@ def detect_format(header):
     raise UnknownFormatError('unknown header line: %s' % repr(header))
 
 
-def load_dictionary(istream):
+def load_dictionary(istream, processes=1, compact=False):
     """
     Attempts to detect the format of and parse a dictionary, returning the
     dictionary object on success.
+
+    :param processes:
+        The number of worker processes to parse with, as for
+        :meth:`DictionaryFormat.parse_dictionary`.
+
+    :param compact:
+        If True, store the entries compactly, as for
+        :meth:`DictionaryFormat.parse_dictionary`.
     """
     lines = iter(istream)
     header = next(lines)
-    return detect_format(header).parse_dictionary(lines)
+    return detect_format(header).parse_dictionary(lines, processes=processes,
+                                                  compact=compact)
 
 
 def iter_entries(istream):
@@ -50,8 +61,10 @@ def iter_entries(istream):
 #  DICTIONARY FORMATS
 #
 
+# EDICT and CEDICT have hand-written parsers, which are much faster than
+# their regular expressions.
 known_formats = [
-    RegexFormat(
+    EdictFormat(
         'edict',
         '^.？？？.*$',
         '^(?P<word>[^ ]+) (\[(?P<reading>[^\]]+)\] )?(?P<senses>.*)$',
@@ -69,10 +82,11 @@ known_formats = [
         '^(?P<word>[^\t]+)\t(?P<reading>[^\\\\]+)\\\\n(?P<senses>.*)$',
         '([１２３４５７８９０]+．)?(?P<sense>[^\\\\]+)(\\\\n)?',
     ),
-    RegexFormat(
+    CedictFormat(
         'cedict',
         '^# CEDICT.*$',
         '^[^ ]+ (?P<word>[^ ]+) (\[(?P<reading>[^\]]+)\])?(?P<senses>.*)',
         '/(?P<sense>[^/]+)',
     ),
+    JMdictFormat(),
 ]
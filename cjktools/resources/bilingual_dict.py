@@ -8,13 +8,19 @@
 A generic bilingual dictionary class.
 """
 
+import sys
+from collections import OrderedDict
 from enum import Enum
-from cjktools.errors import NotYetImplementedError
+from cjktools.scripts import to_hiragana
 
 import six
 from six import text_type
 
 
+# Plain dicts keep their insertion order from Python 3.7.
+_OrderedDict = dict if sys.version_info >= (3, 7) else OrderedDict
+
+
 class ClashPolicy(Enum):
     Overwrite = 1
     Merge = 2
@@ -25,6 +31,13 @@ class BilingualDictionary(dict):
     An abstract bilingual dictionary, containing headwords in one
     language and translated senses in another language. Homographs are
     stored as senses of the same lexeme, rather than being separate.
+
+    The dictionary also indexes its entries by reading, so that all the
+    words with a given reading can be found with
+    :meth:`words_by_reading`. Every method which adds or removes entries
+    keeps the index up to date, but entries changed in place must be
+    re-added with :meth:`add_entry` or assignment for the index to see the
+    change.
     """
 
     def __init__(self, fmt):
@@ -33,13 +46,134 @@ class BilingualDictionary(dict):
             The format object for this dictionary.
         """
         self.format = fmt
+        self._reading_index = {}
+
+    def __setitem__(self, word, entry):
+        if word in self:
+            self._unindex(word, self[word])
+
+        super(BilingualDictionary, self).__setitem__(word, entry)
+        self._index(word, entry)
+
+    def __delitem__(self, word):
+        self._unindex(word, self[word])
+        super(BilingualDictionary, self).__delitem__(word)
+
+    def pop(self, word, *default):
+        if word in self:
+            self._unindex(word, self[word])
+
+        return super(BilingualDictionary, self).pop(word, *default)
+
+    def popitem(self):
+        word, entry = super(BilingualDictionary, self).popitem()
+        self._unindex(word, entry)
+        return word, entry
+
+    def setdefault(self, word, default=None):
+        if word in self:
+            return self[word]
+
+        self[word] = default
+        return default
+
+    def clear(self):
+        self._reading_index.clear()
+        super(BilingualDictionary, self).clear()
+
+    def __ior__(self, rhs_dictionary):
+        self.update(rhs_dictionary)
+        return self
+
+    def add_entry(self, entry):
+        """
+        Adds an entry to the dictionary, merging it into any homograph
+        which is already present. The homograph is replaced by a merged
+        copy rather than changed in place, since it may be shared with
+        another dictionary.
+        """
+        word = entry.word
+        existing = self.get(word)
+        if existing is not None:
+            merged = existing.copy()
+            merged.update(entry)
+            entry = merged
+
+        # The existing readings are already indexed, so skip __setitem__.
+        dict.__setitem__(self, word, entry)
+        self._index(word, entry)
 
     def update(self, rhs_dictionary, clash_policy=ClashPolicy.Overwrite):
-        "Merges another dictionary into this one, in-place."
+        """
+        Merges another dictionary into this one, in-place.
+
+        :param clash_policy:
+            What to do with words in both dictionaries. With
+            ``ClashPolicy.Overwrite``, the other dictionary's entry replaces
+            ours. With ``ClashPolicy.Merge``, the two are combined as
+            homographs, as by :meth:`DictionaryEntry.update`. Entries are
+            shared with the other dictionary, as for :py:meth:`dict.update`,
+            except where two are merged, which gives a copy of our entry's
+            class. Neither policy changes the other dictionary's entries.
+        """
+        items = rhs_dictionary
+        if hasattr(rhs_dictionary, 'keys'):
+            items = ((word, rhs_dictionary[word])
+                     for word in rhs_dictionary.keys())
+
         if clash_policy == ClashPolicy.Merge:
-            raise NotYetImplementedError
+            for word, entry in items:
+                self._merge(word, entry)
+        else:
+            for word, entry in items:
+                self[word] = entry
+
+    def words_by_reading(self, reading):
+        """
+        Returns a list of the words with the given reading, in the order
+        they were added. Katakana and hiragana readings are equivalent.
+        """
+        return list(self._reading_index.get(to_hiragana(reading), ()))
+
+    def __reduce__(self):
+        # Rebuild through __init__ and __setitem__, so that the index is
+        # restored along with the entries.
+        return (self.__class__, (self.format,), None, None,
+                iter(list(self.items())))
+
+    def _merge(self, word, entry):
+        existing = self.get(word)
+        if existing is None:
+            dict.__setitem__(self, word, entry)
+        else:
+            merged = existing.copy()
+            # update() pads the readings of its argument, so give it a
+            # throwaway entry.
+            merged.update(DictionaryEntry(word, entry.readings,
+                                          entry.senses))
+            dict.__setitem__(self, word, merged)
+
+        # The existing readings are already indexed.
+        self._index(word, entry)
+
+    def _index(self, word, entry):
+        index = self._reading_index
+        for reading in getattr(entry, 'readings', ()):
+            key = to_hiragana(reading)
+            words = index.get(key)
+            if words is None:
+                index[key] = words = _OrderedDict()
+            words[word] = None
 
-        return super(BilingualDictionary, self).update(rhs_dictionary)
+    def _unindex(self, word, entry):
+        index = self._reading_index
+        for reading in getattr(entry, 'readings', ()):
+            key = to_hiragana(reading)
+            words = index.get(key)
+            if words is not None and word in words:
+                del words[word]
+                if not words:
+                    del index[key]
 
 
 class DictionaryEntry(object):
@@ -47,7 +181,7 @@ class DictionaryEntry(object):
     A single entry in a dictionary, representing a word, it's reading,
     and its translation into senses.
     """
-    __slots__ = ('word', 'readings', 'senses')
+    __slots__ = ('word', 'readings', 'senses', '_codes')
 
     def __init__(self, word, readings, senses):
         "There should be either one reading, or one per sense."
@@ -55,6 +189,22 @@ class DictionaryEntry(object):
         self.word = word
         self.readings = readings
         self.senses = senses
+        self._codes = None
+
+    @property
+    def codes(self):
+        """
+        The dictionary codes in this entry's senses, as found by
+        :func:`split_by_codes.get_codes`, in a shared frozenset. They are
+        extracted on first use and then kept, so an entry whose senses are
+        changed other than by :meth:`update` should be built afresh.
+        """
+        codes = self._codes
+        if codes is None:
+            codes = self._codes = \
+                _split_by_codes().get_entry_codes(self.senses)
+
+        return codes
 
     def update(self, rhs_entry):
         """
@@ -80,6 +230,27 @@ class DictionaryEntry(object):
         self.readings += rhs_entry.readings
         self.senses += rhs_entry.senses
 
+        # Merge the codes, if both are already known.
+        codes = self._codes
+        rhs_codes = rhs_entry._codes
+        if codes is not None and rhs_codes is not None:
+            codes = _split_by_codes()._intern_codes(codes | rhs_codes)
+        else:
+            codes = None
+        self._codes = codes
+
+    def copy(self):
+        """
+        Returns a copy of this entry, of the same class, which can be
+        updated without changing this one.
+        """
+        entry = self.__class__.__new__(self.__class__)
+        entry.word = self.word
+        entry.readings = list(self.readings)
+        entry.senses = list(self.senses)
+        entry._codes = self._codes
+        return entry
+
     def senses_by_reading(self):
         "Returns a dictionary mapping reading to senses."
         result = {}
@@ -109,3 +280,121 @@ class DictionaryEntry(object):
 
     def __hash__(self):
         return hash(self.name, tuple(self.readings), tuple(self.senses))
+
+
+_split_by_codes_module = None
+
+
+def _split_by_codes():
+    # split_by_codes imports this module, so it is imported on first use;
+    # an import statement on every call would cost more than the lookup.
+    global _split_by_codes_module
+    if _split_by_codes_module is None:
+        from . import split_by_codes
+        _split_by_codes_module = split_by_codes
+
+    return _split_by_codes_module
+
+
+# The slots of DictionaryEntry, which CompactDictionaryEntry hides behind
+# properties.
+_readings_slot = DictionaryEntry.readings
+_senses_slot = DictionaryEntry.senses
+
+_SENSE_SEPARATOR = '\x1f'
+
+
+class CompactDictionaryEntry(DictionaryEntry):
+    """
+    A dictionary entry which takes much less memory than a
+    :class:`DictionaryEntry`, and otherwise behaves the same. Its readings
+    are run-length encoded, so that padding them to one per sense costs
+    nothing, and its senses are packed into a single string.
+
+    The readings and senses lists are built afresh each time they are read,
+    so they must be assigned to, not modified in place.
+
+    :param pool:
+        A dictionary used to intern readings, so that entries with the same
+        reading share a single string. It should be shared by all the
+        entries of a dictionary.
+    """
+    __slots__ = ('_runs',)
+
+    def __init__(self, word, readings, senses, pool=None):
+        assert len(readings) == 1 or len(readings) == len(senses)
+        if pool is not None:
+            readings = [pool.setdefault(r, r) for r in readings]
+
+        self.word = word
+        self.readings = readings
+        self.senses = senses
+
+    def copy(self):
+        # The packed fields are immutable, so they can be shared.
+        entry = self.__class__.__new__(self.__class__)
+        entry.word = self.word
+        _readings_slot.__set__(entry, _readings_slot.__get__(self))
+        _senses_slot.__set__(entry, _senses_slot.__get__(self))
+        entry._runs = self._runs
+        entry._codes = self._codes
+        return entry
+
+    @property
+    def codes(self):
+        codes = self._codes
+        if codes is None:
+            codes = self._codes = _split_by_codes().get_packed_codes(
+                _senses_slot.__get__(self) or '')
+
+        return codes
+
+    @property
+    def readings(self):
+        unique = _readings_slot.__get__(self)
+        if self._runs is None:
+            return list(unique)
+
+        readings = []
+        for reading, run in zip(unique, self._runs):
+            readings.extend([reading] * run)
+
+        return readings
+
+    @readings.setter
+    def readings(self, readings):
+        if len(readings) == 1:
+            _readings_slot.__set__(self, tuple(readings))
+            self._runs = None
+            return
+
+        unique = []
+        runs = []
+        for reading in readings:
+            if unique and unique[-1] == reading:
+                runs[-1] += 1
+            else:
+                unique.append(reading)
+                runs.append(1)
+
+        _readings_slot.__set__(self, tuple(unique))
+        self._runs = tuple(runs) if len(runs) < sum(runs) else None
+
+    @property
+    def senses(self):
+        packed = _senses_slot.__get__(self)
+        if packed is None:
+            return []
+
+        return packed.split(_SENSE_SEPARATOR)
+
+    @senses.setter
+    def senses(self, senses):
+        senses = list(senses)
+        for sense in senses:
+            if _SENSE_SEPARATOR in sense:
+                raise ValueError('sense contains a separator: %r' % sense)
+
+        packed = _SENSE_SEPARATOR.join(senses) if senses else None
+        _senses_slot.__set__(self, packed)
+        self._codes = None
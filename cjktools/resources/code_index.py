@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+#
+#  code_index.py
+#  cjktools
+#
+
+"""
+A bitmap index from the codes in dictionary senses, such as ``(v5)`` or
+``(arch)``, to the entries marked with them, with boolean queries such as
+``'v5 and vt and not arch'``.
+"""
+
+from __future__ import unicode_literals
+
+import re
+
+from cjktools.packed import to_bits, iter_bits
+
+from .split_by_codes import _known_codes
+
+_token_pattern = re.compile(r'\(|\)|[^\s()]+', re.UNICODE)
+
+_OPERATORS = ('and', 'or', 'not')
+
+
+class CodeIndex(object):
+    """
+    An index over the codes of a dictionary. Each entry is assigned one
+    bit, in the dictionary's order, and each code is stored as a single
+    integer with the bits of its entries set, so that a query is a few
+    bitwise operations over whole dictionaries. Entries are only fetched
+    from the dictionary as the results are iterated over.
+
+    :param dictionary:
+        A mapping from words to :class:`DictionaryEntry` objects, such as a
+        :class:`BilingualDictionary` or a :class:`DictionaryStore`. A store
+        is indexed from its table of codes, without loading any entries.
+    """
+
+    def __init__(self, dictionary):
+        self._dictionary = dictionary
+        code_words = getattr(dictionary, 'iter_code_words', None)
+        if code_words is not None:
+            self._words = list(dictionary)
+            word_ids = dict((w, i) for (i, w) in enumerate(self._words))
+            code_ids = dict((code, [word_ids[w] for w in words])
+                            for (code, words) in code_words())
+        else:
+            self._words = []
+            code_ids = {}
+            for word_id, (word, entry) in enumerate(dictionary.items()):
+                self._words.append(word)
+                for code in entry.codes:
+                    code_ids.setdefault(code, []).append(word_id)
+
+        self._code_bits = dict((code, to_bits(ids))
+                               for (code, ids) in code_ids.items())
+        self._all_bits = (1 << len(self._words)) - 1
+
+    def __len__(self):
+        """ The number of entries indexed. """
+        return len(self._words)
+
+    def codes(self):
+        """ Returns the codes which occur in the dictionary. """
+        return sorted(self._code_bits)
+
+    def count(self, query):
+        """ Returns the number of entries matching a query. """
+        return bin(self._evaluate(query)).count('1')
+
+    def words(self, query):
+        """ Returns the words matching a query, in dictionary order. """
+        words = self._words
+        return [words[i] for i in iter_bits(self._evaluate(query))]
+
+    def search(self, query):
+        """
+        Yields the entries matching a query, in dictionary order, fetching
+        each from the dictionary only when it is reached.
+
+        :param query:
+            A boolean expression over codes, with the operators ``and``,
+            ``or`` and ``not`` in increasing order of precedence, and
+            parentheses. For example, ``'(v5 or v1) and not arch'``.
+        """
+        dictionary = self._dictionary
+        for word in self.words(query):
+            yield dictionary[word]
+
+    def _evaluate(self, query):
+        """ Evaluates a query to the bitset of its entries. """
+        tokens = _token_pattern.findall(query)
+        tokens.reverse()
+        bits = self._parse_or(tokens)
+        if tokens:
+            raise ValueError('unexpected %r in query: %s' %
+                             (tokens[-1], query))
+
+        return bits
+
+    def _parse_or(self, tokens):
+        bits = self._parse_and(tokens)
+        while tokens and tokens[-1].lower() == 'or':
+            tokens.pop()
+            bits |= self._parse_and(tokens)
+
+        return bits
+
+    def _parse_and(self, tokens):
+        bits = self._parse_not(tokens)
+        while tokens and tokens[-1].lower() == 'and':
+            tokens.pop()
+            bits &= self._parse_not(tokens)
+
+        return bits
+
+    def _parse_not(self, tokens):
+        if not tokens:
+            raise ValueError('incomplete query')
+
+        token = tokens.pop()
+        if token.lower() == 'not':
+            return self._all_bits ^ self._parse_not(tokens)
+
+        if token == '(':
+            bits = self._parse_or(tokens)
+            if not tokens or tokens.pop() != ')':
+                raise ValueError('unbalanced parentheses in query')
+            return bits
+
+        if token.lower() in _OPERATORS or token == ')':
+            raise ValueError('unexpected %r in query' % token)
+
+        if token not in _known_codes:
+            raise ValueError('unknown code: %s' % token)
+
+        return self._code_bits.get(token, 0)
+
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#
+#  dict_diff.py
+#  cjktools
+#
+
+"""
+Differences between two releases of a line-based dictionary, such as EDICT
+or CEDICT, and their application to a dictionary which is already loaded or
+stored. Only the lines of headwords which have changed are parsed, so that
+updating to a new release costs in proportion to the changes, rather than
+to the size of the dictionary.
+"""
+
+from __future__ import unicode_literals
+
+from itertools import groupby
+from operator import itemgetter
+
+from cjktools.common import sopen
+
+from .auto_format import detect_format
+from .dict_store import patch_store
+
+
+class DictionaryDelta(object):
+    """
+    The changes from one release of a dictionary to the next.
+
+    :param added:
+        The entries for headwords only in the new release.
+
+    :param changed:
+        The new entries for headwords whose lines differ between releases.
+
+    :param removed:
+        The headwords only in the old release.
+    """
+
+    def __init__(self, added, changed, removed):
+        self.added = added
+        self.changed = changed
+        self.removed = removed
+
+    def __len__(self):
+        """ The number of headwords which differ. """
+        return len(self.added) + len(self.changed) + len(self.removed)
+
+    def __repr__(self):
+        return '<DictionaryDelta: %d added, %d changed, %d removed>' % (
+            len(self.added),
+            len(self.changed),
+            len(self.removed),
+        )
+
+    def apply(self, dictionary):
+        """
+        Updates a :class:`BilingualDictionary` loaded from the old release
+        in place, so that it matches the new release.
+        """
+        for word in self.removed:
+            dictionary.pop(word, None)
+
+        for entry in self.changed:
+            dictionary[entry.word] = entry
+
+        for entry in self.added:
+            dictionary[entry.word] = entry
+
+    def apply_to_store(self, filename):
+        """
+        Updates a store saved with :func:`dict_store.save_dictionary` from
+        the old release in place, so that it matches the new release.
+        """
+        patch_store(filename, self.changed + self.added, self.removed)
+
+
+def diff_dictionaries(old_istream, new_istream):
+    """
+    Compares two releases of a dictionary, returning the
+    :class:`DictionaryDelta` between them. The lines of each are grouped by
+    headword and sorted, and the two are then merged in a single pass.
+
+    :param old_istream:
+        The lines of the old release, including its header.
+
+    :param new_istream:
+        The lines of the new release, including its header.
+    """
+    old_lines = iter(old_istream)
+    new_lines = iter(new_istream)
+    old_format = detect_format(next(old_lines))
+    fmt = detect_format(next(new_lines))
+    if old_format.name != fmt.name:
+        raise ValueError('cannot compare a %s dictionary with a %s one' %
+                         (old_format.name, fmt.name))
+
+    added = []
+    changed = []
+    removed = []
+    for word, old, new in _merge(_iter_groups(old_lines, fmt),
+                                 _iter_groups(new_lines, fmt)):
+        if old is None:
+            added.append(_parse_group(new, fmt))
+        elif new is None:
+            removed.append(word)
+        elif old != new:
+            changed.append(_parse_group(new, fmt))
+
+    return DictionaryDelta(added, changed, removed)
+
+
+def diff_files(old_filename, new_filename):
+    """
+    Compares two releases of a dictionary, as for
+    :func:`diff_dictionaries`, given their filenames.
+    """
+    with sopen(old_filename, 'r') as old_istream:
+        with sopen(new_filename, 'r') as new_istream:
+            return diff_dictionaries(old_istream, new_istream)
+
+
+def _iter_groups(lines, fmt):
+    """
+    Yields each headword with its lines, in order of headword. Only the
+    headword of each line is parsed.
+    """
+    keyed = [(fmt.parse_word(line), line.rstrip('\n')) for line in lines]
+
+    # The sort is stable, so homographs keep their order in the file.
+    keyed.sort(key=itemgetter(0))
+    for word, group in groupby(keyed, itemgetter(0)):
+        yield word, [line for (_, line) in group]
+
+
+def _merge(old_groups, new_groups):
+    """
+    Merges two streams of (word, lines) pairs sorted by word, yielding
+    (word, old_lines, new_lines) with None for a side which lacks the word.
+    """
+    old = next(old_groups, None)
+    new = next(new_groups, None)
+    while old is not None or new is not None:
+        if new is None or (old is not None and old[0] < new[0]):
+            yield old[0], old[1], None
+            old = next(old_groups, None)
+        elif old is None or new[0] < old[0]:
+            yield new[0], None, new[1]
+            new = next(new_groups, None)
+        else:
+            yield old[0], old[1], new[1]
+            old = next(old_groups, None)
+            new = next(new_groups, None)
+
+
+def _parse_group(lines, fmt):
+    """ Parses the lines of a headword, merging homographs as on loading. """
+    entry = fmt.parse_line(lines[0])
+    for line in lines[1:]:
+        entry.update(fmt.parse_line(line))
+
+    return entry
@@ -16,7 +16,9 @@ from __future__ import unicode_literals
 import re
 
 from cjktools.errors import NotYetImplementedError
+from cjktools.parallel import map_chunks
 from .bilingual_dict import BilingualDictionary, DictionaryEntry
+from .bilingual_dict import CompactDictionaryEntry
 
 
 class UnknownFormatError(Exception):
@@ -54,19 +56,51 @@ class DictionaryFormat(object):
         "Parses a dictionary entry from the given line."
         raise NotYetImplementedError
 
-    def parse_dictionary(self, lines):
+    def parse_word(self, entry_line):
+        """
+        Returns the headword of the given line, which is the word of the
+        entry :meth:`parse_line` would return.
+        """
+        return self.parse_line(entry_line).word
+
+    def parse_dictionary(self, lines, processes=1, chunk_size=10000,
+                         compact=False):
         """
         Parses the given filename using this format, returning a
         dictionary object containing all the dictionary entries.
+
+        :param lines:
+            The lines of the dictionary, after any header.
+
+        :param processes:
+            The number of worker processes to parse with. If not 1, the
+            lines are split into chunks which are parsed in a process pool,
+            or :py:const:`None` to use every CPU. The entries are merged in
+            file order, so the result is identical to a serial parse.
+
+        :param chunk_size:
+            How many lines to send to a worker at a time.
+
+        :param compact:
+            If True, the entries are stored as
+            :class:`CompactDictionaryEntry` objects, which take much less
+            memory.
         """
-        b = BilingualDictionary(self)
-        for line in lines:
-            entry = self.parse_line(line)
+        if processes == 1:
+            entries = self.iter_entries(lines)
+        else:
+            entries = self._iter_entries_parallel(lines, processes,
+                                                  chunk_size)
+
+        if compact:
+            pool = {}
+            entries = (CompactDictionaryEntry(e.word, e.readings, e.senses,
+                                              pool)
+                       for e in entries)
 
-            if entry.word in b:
-                b[entry.word].update(entry)
-            else:
-                b[entry.word] = entry
+        b = BilingualDictionary(self)
+        for entry in entries:
+            b.add_entry(entry)
 
         return b
 
@@ -78,6 +112,16 @@ class DictionaryFormat(object):
         for line in lines:
             yield self.parse_line(line)
 
+    def _iter_entries_parallel(self, lines, processes, chunk_size):
+        """
+        Parses chunks of lines in a process pool, yielding the entries in
+        order.
+        """
+        for entries in map_chunks(_parse_chunk, lines, self,
+                                  processes=processes, chunk_size=chunk_size):
+            for word, readings, senses in entries:
+                yield DictionaryEntry(word, readings, senses)
+
 
 class RegexFormat(DictionaryFormat):
     """
@@ -116,3 +160,144 @@ class RegexFormat(DictionaryFormat):
             raise FormatError("No senses for word: %s" % word)
 
         return DictionaryEntry(word, readings, senses)
+
+
+class _SplitFormat(RegexFormat):
+    """
+    A format parsed with string methods rather than regular expressions.
+    Subclasses split the word from the rest of each line in
+    :meth:`_split_word`, and the reading from the senses in
+    :meth:`_split_reading`.
+    """
+
+    def parse_line(self, entry_line):
+        parts = self._split_word(entry_line)
+        if parts is None:
+            return RegexFormat.parse_line(self, entry_line)
+
+        word, rest = parts
+        reading, sense_line = self._split_reading(word, rest)
+        senses = [s for s in sense_line.split('/')[1:] if s]
+        if not senses:
+            raise FormatError("No senses for word: %s" % word)
+
+        return DictionaryEntry(word, [reading], senses)
+
+    def parse_word(self, entry_line):
+        parts = self._split_word(entry_line)
+        if parts is None:
+            return RegexFormat.parse_word(self, entry_line)
+
+        word, rest = parts
+        self._check_senses(word, rest)
+        return word
+
+    def _split_word(self, entry_line):
+        """
+        Splits a line into its word and the rest of the line, or returns
+        None if it must be left to the regular expressions.
+        """
+        raise NotYetImplementedError
+
+    def _split_reading(self, word, rest):
+        """
+        Splits the rest of a line into the word's reading and the text of
+        its senses.
+        """
+        raise NotYetImplementedError
+
+    def _check_senses(self, word, rest):
+        """
+        Raises a FormatError if the rest of a line has no senses, as
+        :meth:`parse_line` would, but without building them.
+        """
+        # Unless a slash comes before a closing bracket, and so may be in
+        # the reading, the senses begin at the first slash and the reading
+        # need not be split off.
+        slash = rest.find('/')
+        if slash < rest.find(']'):
+            rest = self._split_reading(word, rest)[1]
+            slash = rest.find('/')
+
+        # There are senses if any character after that slash is not one,
+        # that is if the last such character is.
+        if slash < 0 or len(rest.rstrip('/')) <= slash + 1:
+            raise FormatError("No senses for word: %s" % word)
+
+
+class EdictFormat(_SplitFormat):
+    """
+    The EDICT format, parsed with string methods rather than regular
+    expressions. It gives exactly the same entries as the equivalent
+    :class:`RegexFormat`, and falls back to it for any line it cannot
+    handle simply, including malformed ones.
+    """
+
+    def parse_word(self, entry_line):
+        # As _split_word(), inline, since diffing calls this on every line.
+        line = entry_line
+        if line.endswith('\n'):
+            line = line[:-1]
+
+        word, sep, rest = line.partition(' ')
+        if not word or not sep or '\n' in line:
+            return RegexFormat.parse_word(self, entry_line)
+
+        self._check_senses(word, rest)
+        return word
+
+    def _split_word(self, entry_line):
+        line = entry_line
+        if line.endswith('\n'):
+            line = line[:-1]
+
+        word, sep, rest = line.partition(' ')
+        if not word or not sep or '\n' in line:
+            return None
+
+        return word, rest
+
+    def _split_reading(self, word, rest):
+        if rest.startswith('['):
+            end = rest.find(']')
+            if end > 1 and rest[end + 1:end + 2] == ' ':
+                return rest[1:end].replace(' ', ''), rest[end + 2:]
+
+        return word, rest
+
+
+class CedictFormat(_SplitFormat):
+    """
+    The CEDICT format, parsed with string methods rather than regular
+    expressions, as for :class:`EdictFormat`.
+    """
+
+    def _split_word(self, entry_line):
+        line = entry_line
+        if line.endswith('\n'):
+            line = line[:-1]
+
+        traditional, sep, rest = line.partition(' ')
+        word, word_sep, rest = rest.partition(' ')
+        if not (traditional and sep and word and word_sep) or '\n' in line:
+            return None
+
+        return word, rest
+
+    def _split_reading(self, word, rest):
+        if rest.startswith('['):
+            end = rest.find(']')
+            if end > 1:
+                return rest[1:end].replace(' ', ''), rest[end + 1:]
+
+        return word, rest
+
+
+def _parse_chunk(dictionary_format, lines):
+    # Plain tuples are much cheaper to send back than entry objects.
+    entries = []
+    for line in lines:
+        entry = dictionary_format.parse_line(line)
+        entries.append((entry.word, entry.readings, entry.senses))
+
+    return entries
@@ -0,0 +1,367 @@
+# -*- coding: utf-8 -*-
+#
+#  dict_store.py
+#  cjktools
+#
+
+"""
+A persistent store for bilingual dictionaries in a local SQLite database.
+A dictionary is parsed once and saved with :func:`save_dictionary`; after
+that, a :class:`DictionaryStore` opens instantly and looks entries up lazily,
+so that many processes can share one dictionary without each holding all of
+it in memory.
+"""
+
+from __future__ import unicode_literals
+
+import os
+import sqlite3
+from itertools import groupby
+from operator import itemgetter
+from collections import OrderedDict
+
+from cjktools import smart_cache
+from cjktools.common import _Mapping, sopen
+from cjktools.scripts import to_hiragana
+
+from .auto_format import known_formats, load_dictionary
+from .bilingual_dict import DictionaryEntry
+from .split_by_codes import get_entry_codes
+
+SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE entry (
+    id INTEGER PRIMARY KEY,
+    word TEXT NOT NULL UNIQUE
+);
+CREATE TABLE reading (
+    entry_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    reading TEXT NOT NULL,
+    reading_key TEXT NOT NULL,
+    PRIMARY KEY (entry_id, position)
+);
+CREATE TABLE sense (
+    entry_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    sense TEXT NOT NULL,
+    PRIMARY KEY (entry_id, position)
+);
+CREATE TABLE sense_code (
+    entry_id INTEGER NOT NULL,
+    code TEXT NOT NULL,
+    PRIMARY KEY (code, entry_id)
+);
+"""
+
+_READING_INDEX = 'CREATE INDEX reading_index ON reading (reading_key)'
+
+
+def save_dictionary(dictionary, filename):
+    """
+    Saves a dictionary to a new SQLite database, replacing any existing file
+    of that name.
+
+    :param dictionary:
+        A :class:`BilingualDictionary`, or any mapping from words to
+        :class:`DictionaryEntry` objects.
+
+    :param filename:
+        The database file to write.
+    """
+    tmp_filename = filename + '.tmp'
+    if os.path.exists(tmp_filename):
+        os.remove(tmp_filename)
+
+    connection = sqlite3.connect(tmp_filename)
+    try:
+        connection.executescript(_SCHEMA)
+
+        meta = [('version', str(SCHEMA_VERSION))]
+        fmt = getattr(dictionary, 'format', None)
+        if fmt is not None:
+            meta.append(('format', fmt.name))
+        connection.executemany('INSERT INTO meta VALUES (?, ?)', meta)
+
+        _insert_entries(connection, enumerate(dictionary.values()))
+
+        # Indexing once all the rows are in is much faster.
+        connection.execute(_READING_INDEX)
+        connection.commit()
+    finally:
+        connection.close()
+
+    if os.path.exists(filename):
+        os.remove(filename)
+    os.rename(tmp_filename, filename)
+
+
+def patch_store(filename, entries, removed=()):
+    """
+    Updates a database written by :func:`save_dictionary` in place, in a
+    single transaction. Entries for words already in the store replace
+    them, keeping their position; other entries are added at the end.
+    Stores which are already open may have cached the replaced entries.
+
+    :param filename:
+        The database file to update.
+
+    :param entries:
+        The new or changed :class:`DictionaryEntry` objects.
+
+    :param removed:
+        The words to remove.
+    """
+    connection = sqlite3.connect(filename)
+    try:
+        for word in removed:
+            _delete_entry(connection, word)
+
+        next_id = connection.execute(
+            'SELECT COALESCE(MAX(id) + 1, 0) FROM entry').fetchone()[0]
+        rows = []
+        for entry in entries:
+            entry_id = _delete_entry(connection, entry.word)
+            if entry_id is None:
+                entry_id = next_id
+                next_id += 1
+
+            rows.append((entry_id, entry))
+
+        _insert_entries(connection, rows)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def get_store(dictionary_file, filename, cache_size=1024):
+    """
+    Opens the store for a dictionary file, first parsing the dictionary and
+    saving it if the store is missing, older than it, or was written by
+    another version of this module.
+
+    :param dictionary_file:
+        The dictionary to parse, in any format :mod:`auto_format` detects.
+
+    :param filename:
+        The location of the store.
+    """
+    if (smart_cache.needs_update(filename, [dictionary_file]) or
+            _store_version(filename) != SCHEMA_VERSION):
+        with sopen(dictionary_file, 'r') as istream:
+            save_dictionary(load_dictionary(istream), filename)
+
+    return DictionaryStore(filename, cache_size=cache_size)
+
+
+def _store_version(filename):
+    """ Returns the schema version of an existing store. """
+    connection = sqlite3.connect(filename)
+    try:
+        row = connection.execute(
+            "SELECT value FROM meta WHERE key = 'version'").fetchone()
+    except sqlite3.DatabaseError:
+        return None
+    finally:
+        connection.close()
+
+    return int(row[0]) if row is not None else None
+
+
+def _insert_entries(connection, entries):
+    """ Inserts the rows for a sequence of (id, entry) pairs. """
+    entry_rows = []
+    reading_rows = []
+    sense_rows = []
+    code_rows = []
+    for entry_id, entry in entries:
+        entry_rows.append((entry_id, entry.word))
+        for i, sense in enumerate(entry.senses):
+            sense_rows.append((entry_id, i, sense))
+
+        for i, reading in enumerate(entry.readings):
+            reading_rows.append((entry_id, i, reading, to_hiragana(reading)))
+
+        for code in entry.codes:
+            code_rows.append((entry_id, code))
+
+    connection.executemany('INSERT INTO entry VALUES (?, ?)', entry_rows)
+    connection.executemany('INSERT INTO reading VALUES (?, ?, ?, ?)',
+                           reading_rows)
+    connection.executemany('INSERT INTO sense VALUES (?, ?, ?)', sense_rows)
+    connection.executemany('INSERT INTO sense_code VALUES (?, ?)', code_rows)
+
+
+def _delete_entry(connection, word):
+    """ Deletes the rows for a word, returning its id or None. """
+    row = connection.execute('SELECT id FROM entry WHERE word = ?',
+                             (word,)).fetchone()
+    if row is None:
+        return None
+
+    entry_id = row[0]
+
+    # The codes table is keyed by code first, so delete from it by its
+    # full key rather than scanning it.
+    codes = get_entry_codes(sense for (sense,) in connection.execute(
+        'SELECT sense FROM sense WHERE entry_id = ?', (entry_id,)))
+    connection.executemany(
+        'DELETE FROM sense_code WHERE code = ? AND entry_id = ?',
+        [(code, entry_id) for code in codes],
+    )
+
+    for table in ('reading', 'sense'):
+        connection.execute('DELETE FROM %s WHERE entry_id = ?' % table,
+                           (entry_id,))
+    connection.execute('DELETE FROM entry WHERE id = ?', (entry_id,))
+    return entry_id
+
+
+class DictionaryStore(_Mapping):
+    """
+    A read-only mapping from words to :class:`DictionaryEntry` objects,
+    backed by a database written by :func:`save_dictionary`. Entries are
+    read from the database as they are needed, and the most recently used
+    are kept in memory.
+
+    A store may be passed to worker processes: each process opens its own
+    connection to the database on first use.
+
+    :param filename:
+        The database file to read.
+
+    :param cache_size:
+        The number of entries to keep in memory.
+    """
+
+    def __init__(self, filename, cache_size=1024):
+        if not os.path.exists(filename):
+            raise IOError('no such dictionary store: %s' % filename)
+
+        self.filename = filename
+        self.cache_size = cache_size
+        self._connection = None
+        self._pid = None
+        self._cache = OrderedDict()
+
+        meta = dict(self._execute('SELECT key, value FROM meta'))
+        if int(meta.get('version', 0)) != SCHEMA_VERSION:
+            raise ValueError('unsupported dictionary store version in %s' %
+                             filename)
+
+        self.format = None
+        for fmt in known_formats:
+            if fmt.name == meta.get('format'):
+                self.format = fmt
+
+    def __getitem__(self, word):
+        cache = self._cache
+        if word in cache:
+            entry = cache.pop(word)
+            cache[word] = entry
+            return entry
+
+        row = self._execute('SELECT id FROM entry WHERE word = ?',
+                            (word,)).fetchone()
+        if row is None:
+            raise KeyError(word)
+
+        entry = self._load_entry(row[0], word)
+        cache[word] = entry
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+        return entry
+
+    def __contains__(self, word):
+        if word in self._cache:
+            return True
+
+        return self._execute('SELECT 1 FROM entry WHERE word = ?',
+                             (word,)).fetchone() is not None
+
+    def __iter__(self):
+        for (word,) in self._execute('SELECT word FROM entry ORDER BY id'):
+            yield word
+
+    def __len__(self):
+        return self._execute('SELECT COUNT(*) FROM entry').fetchone()[0]
+
+    def words_by_reading(self, reading):
+        """
+        Returns a list of the words with the given reading. As for
+        :meth:`BilingualDictionary.words_by_reading`, katakana and hiragana
+        readings are equivalent.
+        """
+        return self._select_words(
+            'SELECT DISTINCT entry.word FROM reading '
+            'JOIN entry ON entry.id = reading.entry_id '
+            'WHERE reading.reading_key = ? ORDER BY entry.id',
+            to_hiragana(reading),
+        )
+
+    def words_by_code(self, code):
+        """
+        Returns a list of the words with a sense marked with the given
+        code, as found by :func:`split_by_codes.get_codes`.
+        """
+        return self._select_words(
+            'SELECT entry.word FROM sense_code '
+            'JOIN entry ON entry.id = sense_code.entry_id '
+            'WHERE sense_code.code = ? ORDER BY entry.id',
+            code,
+        )
+
+    def iter_code_words(self):
+        """
+        Yields ``(code, words)`` for every code in the store, in order of
+        code, with the words in the store's order. Only the table of codes
+        is read, so no entries are loaded.
+        """
+        rows = self._execute(
+            'SELECT sense_code.code, entry.word FROM sense_code '
+            'JOIN entry ON entry.id = sense_code.entry_id '
+            'ORDER BY sense_code.code, sense_code.entry_id'
+        )
+        for code, group in groupby(rows, itemgetter(0)):
+            yield code, [word for (_, word) in group]
+
+    def close(self):
+        """ Closes the connection to the database. """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_connection'] = None
+        state['_pid'] = None
+        state['_cache'] = OrderedDict()
+        return state
+
+    def _load_entry(self, entry_id, word):
+        readings = [r for (r,) in self._execute(
+            'SELECT reading FROM reading WHERE entry_id = ? ORDER BY position',
+            (entry_id,)
+        )]
+        senses = [s for (s,) in self._execute(
+            'SELECT sense FROM sense WHERE entry_id = ? ORDER BY position',
+            (entry_id,)
+        )]
+        return DictionaryEntry(word, readings, senses)
+
+    def _select_words(self, query, value):
+        return [word for (word,) in self._execute(query, (value,))]
+
+    def _execute(self, query, parameters=()):
+        # Connections cannot be shared with forked processes.
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(self.filename)
+            self._pid = os.getpid()
+
+        return self._connection.execute(query, parameters)
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+#
+#  dict_trie.py
+#  cjktools
+#
+
+"""
+A compact trie over dictionary headwords, for finding every word which
+starts at a position in a text, and for greedy longest-match tokenization
+of whole documents.
+"""
+
+from __future__ import unicode_literals
+
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+_TYPECODE = 'I'
+
+
+class DictionaryTrie(object):
+    """
+    A trie over a set of words, stored as sorted arrays rather than nested
+    dictionaries. Nodes are numbered breadth first, so that the children of
+    each node are contiguous, sorted by character, and found by bisection.
+
+    :param words:
+        The words to store. This may be any iterable of strings, such as a
+        :class:`BilingualDictionary`, or of :class:`DictionaryEntry`
+        objects, such as the stream from :func:`auto_format.iter_entries`.
+    """
+
+    def __init__(self, words):
+        words = sorted(set(getattr(w, 'word', w) for w in words) - {''})
+
+        # The code point of the edge into each node, with a dummy for the
+        # root, and whether each node ends a word.
+        labels = array(_TYPECODE, [0])
+        terminal = bytearray()
+
+        # The children of node i are nodes indptr[i] to indptr[i + 1].
+        indptr = array(_TYPECODE)
+
+        # Each node covers the range of sorted words sharing its prefix.
+        queue = deque([(0, len(words), 0)])
+        while queue:
+            lo, hi, depth = queue.popleft()
+            indptr.append(len(labels))
+            if lo < hi and len(words[lo]) == depth:
+                terminal.append(1)
+                lo += 1
+            else:
+                terminal.append(0)
+
+            while lo < hi:
+                char = words[lo][depth]
+                end = lo + 1
+                while end < hi and words[end][depth] == char:
+                    end += 1
+
+                labels.append(ord(char))
+                queue.append((lo, end, depth + 1))
+                lo = end
+
+        indptr.append(len(labels))
+
+        self._labels = labels
+        self._terminal = terminal
+        self._indptr = indptr
+        self._size = len(words)
+
+    def __len__(self):
+        return self._size
+
+    def __contains__(self, word):
+        end = len(word)
+        for match_end in self._match_ends(word, 0):
+            if match_end == end:
+                return True
+
+        return False
+
+    def prefixes(self, text, start=0):
+        """
+        Returns the words which occur in the text at the given position,
+        from shortest to longest.
+        """
+        return [text[start:end] for end in self._match_ends(text, start)]
+
+    def longest_prefix(self, text, start=0):
+        """
+        Returns the longest word which occurs in the text at the given
+        position, or None if there is none.
+        """
+        end = self._longest_end(text, start)
+        if end is None:
+            return None
+
+        return text[start:end]
+
+    def tokenize(self, text):
+        """
+        Splits a text into words by greedy longest match. Characters which
+        do not begin any word become tokens of their own.
+        """
+        tokens = []
+        n = len(text)
+        i = 0
+        while i < n:
+            end = self._longest_end(text, i) or i + 1
+            tokens.append(text[i:end])
+            i = end
+
+        return tokens
+
+    def _match_ends(self, text, start):
+        """ Yields the end of each word in the text at the given position. """
+        labels = self._labels
+        indptr = self._indptr
+        terminal = self._terminal
+        node = 0
+        for i in range(start, len(text)):
+            code = ord(text[i])
+            hi = indptr[node + 1]
+            node = bisect_left(labels, code, indptr[node], hi)
+            if node == hi or labels[node] != code:
+                return
+
+            if terminal[node]:
+                yield i + 1
+
+    def _longest_end(self, text, start):
+        # The same walk as _match_ends, inlined since tokenizing depends on
+        # it.
+        labels = self._labels
+        indptr = self._indptr
+        terminal = self._terminal
+        end = None
+        node = 0
+        for i in range(start, len(text)):
+            code = ord(text[i])
+            hi = indptr[node + 1]
+            node = bisect_left(labels, code, indptr[node], hi)
+            if node == hi or labels[node] != code:
+                break
+
+            if terminal[node]:
+                end = i + 1
+
+        return end
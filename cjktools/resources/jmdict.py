@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+#
+#  jmdict.py
+#  cjktools
+#
+
+"""
+A streaming loader for the JMdict XML dictionary, the canonical source from
+which EDICT is generated. The XML is parsed incrementally, and each entry is
+discarded once it has been converted, so memory use stays constant however
+large the dictionary. Entries are converted to :class:`DictionaryEntry`
+objects laid out as in EDICT, with one entry per kanji form, and part of
+speech and other codes at the start of each sense.
+"""
+
+from __future__ import unicode_literals
+
+import re
+
+import six
+
+try:
+    from xml.etree import cElementTree as ElementTree
+except ImportError:
+    from xml.etree import ElementTree
+
+from cjktools.common import sopen
+
+from .bilingual_dict import DictionaryEntry
+from .dict_format import DictionaryFormat
+
+_XML_LANG = '{http://www.w3.org/XML/1998/namespace}lang'
+
+# The priority codes which EDICT marks with (P).
+_COMMON_PRIORITIES = frozenset(['news1', 'ichi1', 'spec1', 'spec2', 'gai1'])
+
+_entity_pattern = re.compile(br'<!ENTITY\s+(\S+)\s+"([^"]*)">')
+
+
+def iter_entries(source, lang='eng'):
+    """
+    Iterates over the entries of a JMdict file.
+
+    :param source:
+        The filename of the dictionary, which may be compressed, or an
+        iterable of its lines.
+
+    :param lang:
+        The language of the glosses to use. Senses with no glosses in this
+        language are skipped.
+    """
+    if isinstance(source, six.string_types):
+        with sopen(source, 'rb', encoding=None) as istream:
+            for entry in _iter_entries(istream, lang):
+                yield entry
+    else:
+        for entry in _iter_entries(source, lang):
+            yield entry
+
+
+class JMdictFormat(DictionaryFormat):
+    """
+    The JMdict XML format, for use with :mod:`auto_format`. Since XML cannot
+    be split into independent lines, it is always parsed serially.
+    """
+    name = 'jmdict'
+
+    def __init__(self, lang='eng'):
+        self.lang = lang
+
+    def match_header(self, header_line):
+        return header_line.startswith('<?xml')
+
+    def iter_entries(self, lines):
+        return _iter_entries(lines, self.lang)
+
+    def _iter_entries_parallel(self, lines, processes, chunk_size):
+        return self.iter_entries(lines)
+
+
+def _iter_entries(lines, lang):
+    reader = _LineReader(lines)
+    root = None
+    # Python 2 only accepts native strings as event names.
+    events = (str('start'), str('end'))
+    for event, elem in ElementTree.iterparse(reader, events=events):
+        if root is None:
+            root = elem
+
+        if event == 'end' and elem.tag == 'entry':
+            for entry in _convert_entry(elem, reader.entities, lang):
+                yield entry
+
+            # Discard the entry, so that the tree never grows.
+            elem.clear()
+            root.clear()
+
+
+def _convert_entry(elem, entities, lang):
+    """ Converts a JMdict entry element into DictionaryEntry objects. """
+    kanji = [(k.findtext('keb'), _is_common(k, 'ke_pri'))
+             for k in elem.findall('k_ele')]
+    readings = []
+    for r_ele in elem.findall('r_ele'):
+        readings.append((
+            r_ele.findtext('reb'),
+            _is_common(r_ele, 're_pri'),
+            r_ele.find('re_nokanji') is not None,
+            [r.text for r in r_ele.findall('re_restr')],
+        ))
+
+    if not readings:
+        return
+
+    if not kanji:
+        reb, common = readings[0][:2]
+        senses = _convert_senses(elem, entities, lang, reb, reb, common)
+        if senses:
+            yield DictionaryEntry(reb, [reb], senses)
+        return
+
+    for keb, keb_common in kanji:
+        for reb, reb_common, no_kanji, restrictions in readings:
+            if not no_kanji and (not restrictions or keb in restrictions):
+                break
+        else:
+            continue
+
+        senses = _convert_senses(elem, entities, lang, keb, reb,
+                                 keb_common or reb_common)
+        if senses:
+            yield DictionaryEntry(keb, [reb], senses)
+
+
+def _convert_senses(elem, entities, lang, keb, reb, common):
+    """
+    Converts the senses of an entry which apply to the given kanji and
+    reading to EDICT-style sense strings.
+    """
+    applicable = []
+    for sense in elem.findall('sense'):
+        stagk = [s.text for s in sense.findall('stagk')]
+        stagr = [s.text for s in sense.findall('stagr')]
+        if (stagk and keb not in stagk) or (stagr and reb not in stagr):
+            continue
+
+        glosses = [g.text for g in sense.findall('gloss')
+                   if g.get(_XML_LANG, 'eng') == lang and g.text]
+        if glosses:
+            applicable.append((sense, glosses))
+
+    senses = []
+    for i, (sense, glosses) in enumerate(applicable):
+        prefix = []
+        pos = [_code(p.text, entities) for p in sense.findall('pos')]
+        if pos:
+            prefix.append('(%s)' % ','.join(pos))
+
+        if len(applicable) > 1:
+            prefix.append('(%d)' % (i + 1))
+
+        misc = [_code(m.text, entities)
+                for tag in ('field', 'misc', 'dial')
+                for m in sense.findall(tag)]
+        if misc:
+            prefix.append('(%s)' % ','.join(misc))
+
+        prefix.append(glosses[0])
+        senses.append(' '.join(prefix))
+        senses.extend(glosses[1:])
+
+    if senses and common:
+        senses.append('(P)')
+
+    return senses
+
+
+def _code(text, entities):
+    """ Recovers the entity name of an expanded entity, such as 'n'. """
+    return entities.get(text, text)
+
+
+def _is_common(elem, tag):
+    return any(p.text in _COMMON_PRIORITIES for p in elem.findall(tag))
+
+
+class _LineReader(object):
+    """
+    A file-like view of the lines of an XML document, which iterparse can
+    read from. As the document type definition passes, it collects the
+    entity declarations, mapping each expansion back to its name.
+    """
+
+    def __init__(self, lines):
+        self._lines = iter(lines)
+        self._in_dtd = True
+        self.entities = {}
+
+    def read(self, size=-1):
+        chunk = []
+        n_bytes = 0
+        for line in self._lines:
+            if isinstance(line, six.text_type):
+                line = line.encode('utf8')
+
+            if self._in_dtd:
+                self._scan_dtd(line)
+
+            chunk.append(line)
+            n_bytes += len(line)
+            if 0 <= size <= n_bytes:
+                break
+
+        return b''.join(chunk)
+
+    def _scan_dtd(self, line):
+        match = _entity_pattern.search(line)
+        if match:
+            name, value = match.groups()
+            self.entities[value.decode('utf8')] = name.decode('utf8')
+        elif line.lstrip().startswith(b']>'):
+            self._in_dtd = False
@@ -13,6 +13,7 @@ import re
 from itertools import chain
 
 from cjktools import scripts
+from cjktools import parallel
 from cjktools.common import sopen
 from cjktools.common import _ExitStack as ExitStack
 
@@ -91,9 +92,19 @@ class Kanjidic(dict):
     An interface to the kanjidic dictionary. Create a new instance to parse
     the dictionary. Has a nice getitem interface to get the details of a
     character.
+
+    :param kanjidic_files:
+        The kanjidic files to parse, defaulting to kanjidic and kanjd212
+        from the cjkdata pack.
+
+    :param processes:
+        The number of worker processes to parse with. By default the files
+        are parsed serially; if greater than one, or :py:const:`None` to use
+        every CPU, each file is split into line-aligned chunks which are
+        parsed in a process pool.
     """
 
-    def __init__(self, kanjidic_files=None):
+    def __init__(self, kanjidic_files=None, processes=1):
         super(Kanjidic, self).__init__
 
         if kanjidic_files is None:
@@ -102,6 +113,13 @@ class Kanjidic(dict):
                 cjkdata.get_resource('kanjd212'),
             ]
 
+        if processes != 1:
+            partials = parallel.parse_files(_parse_chunk, kanjidic_files,
+                                            processes=processes)
+            for partial in partials:
+                self.update(partial)
+            return
+
         with ExitStack() as stack:
             file_chain = (stack.enter_context(sopen(f, mode='r'))
                           for f in kanjidic_files)
@@ -124,73 +142,84 @@ class Kanjidic(dict):
         @param files: The files for kanjidic.
         """
         self._dictionary = {}
+        self.update(_parse_chunk(line_stream))
 
-        for line in line_stream:
-            if line.startswith('#'):
-                continue
-
-            entry = self._parse_line(line)
-            self[entry.kanji] = entry
-
-    def _parse_line(self, line):
-        "Parses a single line in the kanjdic file, returning an entry."
-        segment_pattern = re.compile('[^ {]+|{.*?}', re.UNICODE)
-        segments = segment_pattern.findall(line.strip())
-        segments.reverse()
-
-        kanji = segments.pop()
-        jis_code = int(segments.pop(), 16)
-        info = {
-            'kanji':        kanji,
-            'gloss':        [],
-            'on_readings':  [],
-            'kun_readings': [],
-            'jis_code':     jis_code
-        }
-
-        while segments:
-            s = segments.pop()
-
-            if s.startswith('{'):
-                info['gloss'].append(s[1:-1])
-
-            elif (scripts.script_type(s) != scripts.Script.Ascii or
-                  s.startswith('-')):
-                # It must be a reading.
-                char = s[0]
-                if char == '-':
-                    char = s[1]
-
-                if scripts.script_type(char) == scripts.Script.Katakana:
-                    info['on_readings'].append(s)
-                elif scripts.script_type(char) == scripts.Script.Hiragana:
-                    info['kun_readings'].append(s)
-                else:
-                    raise Exception("Unknown segment %s" % s)
-
-            elif s in ('T1', 'T2'):
-                continue
 
+def _parse_chunk(line_stream):
+    """
+    Parses a chunk of kanjidic lines into a kanji -> entry dictionary. This
+    is the unit of work for parallel parsing.
+    """
+    chunk = {}
+    for line in line_stream:
+        if line.startswith('#'):
+            continue
+
+        entry = _parse_line(line)
+        chunk[entry.kanji] = entry
+
+    return chunk
+
+
+def _parse_line(line):
+    "Parses a single line in the kanjdic file, returning an entry."
+    segment_pattern = re.compile('[^ {]+|{.*?}', re.UNICODE)
+    segments = segment_pattern.findall(line.strip())
+    segments.reverse()
+
+    kanji = segments.pop()
+    jis_code = int(segments.pop(), 16)
+    info = {
+        'kanji':        kanji,
+        'gloss':        [],
+        'on_readings':  [],
+        'kun_readings': [],
+        'jis_code':     jis_code
+    }
+
+    while segments:
+        s = segments.pop()
+
+        if s.startswith('{'):
+            info['gloss'].append(s[1:-1])
+
+        elif (scripts.script_type(s) != scripts.Script.Ascii or
+              s.startswith('-')):
+            # It must be a reading.
+            char = s[0]
+            if char == '-':
+                char = s[1]
+
+            if scripts.script_type(char) == scripts.Script.Katakana:
+                info['on_readings'].append(s)
+            elif scripts.script_type(char) == scripts.Script.Hiragana:
+                info['kun_readings'].append(s)
             else:
-                # handle various codes
-                code = s[0]
-                remainder = s[1:]
-                try:
-                    remainder = int(remainder)
-                except:
-                    pass
+                raise Exception("Unknown segment %s" % s)
+
+        elif s in ('T1', 'T2'):
+            continue
+
+        else:
+            # handle various codes
+            code = s[0]
+            remainder = s[1:]
+            try:
+                remainder = int(remainder)
+            except:
+                pass
 
-                info.setdefault(remappings.get(code, code), []).append(
-                    remainder)
+            info.setdefault(remappings.get(code, code), []).append(
+                remainder)
 
-        info['stroke_count'] = info['stroke_count'][0]
-        if 'frequency' in info:
-            info['frequency'] = info['frequency'][0]
+    info['stroke_count'] = info['stroke_count'][0]
+    if 'frequency' in info:
+        info['frequency'] = info['frequency'][0]
 
-        info['skip_code'] = tuple(int(i)
-                                  for i in info['skip_code'][0].split('-'))
+    info['skip_code'] = tuple(int(i)
+                              for i in info['skip_code'][0].split('-'))
 
-        return KanjidicEntry(**info)
+    return KanjidicEntry(**info)
 
 
 _cached_kanjidic = None
@@ -13,6 +13,11 @@ from __future__ import unicode_literals
 import re
 import codecs
 
+from six import iteritems, unichr
+
+from cjktools.common import get_stream_context
+
+from . import auto_format
 from . import zhuyin_table
 from . import cjkdata
 
@@ -28,20 +33,59 @@ tone_to_vowels = {
 
 _cached_pinyin_table = None
 _cached_pinyin_segmenter = None
+_cached_phrase_pinyin_table = None
 
 
 class PinyinFormatError(Exception):
     pass
 
 
+def _default_stream():
+    return codecs.open(cjkdata.get_resource('tables/gbk_pinyin_table'),
+                       'r', 'utf8')
+
+
+def _identity(char):
+    return char
+
+
+class _TranslationTable(dict):
+    """
+    A :py:meth:`str.translate` table from code points to their conversions,
+    which converts and remembers characters it has not seen before.
+    """
+    def __init__(self, convert):
+        self._convert = convert
+
+    def __missing__(self, code):
+        value = self._convert(unichr(code))
+        self[code] = value
+        return value
+
+
 class PinyinTable(dict):
-    """ A reader which converts Chinese hanzi to pinyin. """
-    def __init__(self):
-        self._segmenter = get_pinyin_segmenter()
+    """
+    A reader which converts Chinese hanzi to pinyin.
+
+    The conversion of each hanzi's default reading is precomputed when the
+    table is loaded, so converting a string is a single
+    :py:meth:`str.translate` call. Later changes to the table's entries are
+    not reflected in these precomputed readings.
+
+    :param istream:
+        A stream of text lines from a hanzi to pinyin table, defaulting to
+        the one in the cjkdata pack.
+
+    :param segmenter:
+        The :class:`PinyinSegmenter` to use, defaulting to the cached one.
+    """
+    def __init__(self, istream=None, segmenter=None):
+        if segmenter is None:
+            segmenter = get_pinyin_segmenter()
+        self._segmenter = segmenter
 
         # Load the table mapping hanzi to pinyin.
-        f = cjkdata.get_resource('tables/gbk_pinyin_table')
-        with codecs.open(f, 'r', 'utf8') as istream:
+        with get_stream_context(_default_stream, istream) as istream:
             for line in istream:
                 if line.startswith('#'):
                     continue
@@ -50,23 +94,46 @@ class PinyinTable(dict):
                 numeric_readings = tuple(entries[1:])
                 self[hanzi] = tuple(numeric_readings)
 
+        # Numeric syllables are a closed set, so each one is converted only
+        # once, however many hanzi share it.
+        self._syllables = {}
+
+        self._tone_marked = _TranslationTable(self.from_ascii)
+        self._numeric = _TranslationTable(_identity)
+        self._toneless = _TranslationTable(self.strip_tones)
+
+        converted = {}
+        for hanzi, numeric_readings in iteritems(self):
+            if len(hanzi) != 1 or not numeric_readings:
+                continue
+
+            numeric_reading = numeric_readings[0]
+            if numeric_reading not in converted:
+                converted[numeric_reading] = (
+                    self.from_ascii(numeric_reading),
+                    self.strip_tones(numeric_reading),
+                )
+
+            code = ord(hanzi)
+            self._numeric[code] = numeric_reading
+            (self._tone_marked[code],
+             self._toneless[code]) = converted[numeric_reading]
+
     def from_hanzi(self, hanzi_string, inline=True, use_tones=True):
         """ Convert all the hanzi in the given string to pinyin readings. """
-        if not use_tones:
-            inline = False
+        return hanzi_string.translate(self._hanzi_table(inline, use_tones))
 
-        result = []
-        for char in hanzi_string:
-            numeric_reading = self.get(char, (char,))[0]
-
-            if inline:
-                result.append(self.from_ascii(numeric_reading))
-            elif not use_tones:
-                result.append(self.strip_tones(numeric_reading))
-            else:
-                result.append(numeric_reading)
+    def from_hanzi_many(self, hanzi_strings, inline=True, use_tones=True):
+        """
+        Convert many strings of hanzi to pinyin readings, as for
+        :meth:`from_hanzi`.
 
-        return ''.join(result)
+        :return:
+            A list of the converted strings, in order.
+        """
+        table = self._hanzi_table(inline, use_tones)
+        return [hanzi_string.translate(table)
+                for hanzi_string in hanzi_strings]
 
     def from_ascii(self, ascii_pinyin):
         """
@@ -76,8 +143,7 @@ class PinyinTable(dict):
         standard_form = normalize(ascii_pinyin)
         chunks = self._segmenter.segment_pinyin(standard_form)
 
-        chunks = [self._apply_tone(p, t) for (p, t) in chunks]
-        return ''.join(chunks)
+        return ''.join(self._syllable_forms(p, t)[0] for (p, t) in chunks)
 
     def strip_tones(self, ascii_pinyin):
         """ Return the same ascii pinyin string, but without any tones. """
@@ -85,31 +151,178 @@ class PinyinTable(dict):
         chunks = self._segmenter.segment_pinyin(standard_form)
         return ''.join(p for (p, t) in chunks)
 
+    def _hanzi_table(self, inline, use_tones):
+        """
+        Returns the translation table from hanzi to pinyin readings for the
+        options of :meth:`from_hanzi`.
+        """
+        if not use_tones:
+            return self._toneless
+        elif inline:
+            return self._tone_marked
+
+        return self._numeric
+
+    def _syllable_forms(self, syllable, tone):
+        """
+        Returns the (tone-marked, toneless) forms of a syllable, memoized.
+        """
+        key = (syllable, tone)
+        forms = self._syllables.get(key)
+        if forms is None:
+            forms = (self._apply_tone(syllable, tone), syllable)
+            self._syllables[key] = forms
+
+        return forms
+
     def _apply_tone(self, syllable, tone):
         """ Apply a tone to a syllable. """
-        if tone == 5:
-            tone = 0
+        return apply_tone(syllable, tone)
 
-        results = []
-        results.append(syllable[0])
 
-        used_tone = False
-        for char in syllable[1:]:
-            if not used_tone and char in vowels:
-                results.append(tone_to_vowels[tone][vowels.index(char)])
-                used_tone = True
-            else:
-                results.append(char)
+class PinyinSegmenter(object):
+    """
+    Segments pinyin into syllables and tones. Syllables are found by longest
+    match against a trie of every pinyin syllable; characters which begin no
+    syllable are skipped.
+
+    :param istream:
+        The zhuyin/pinyin conversion table to take syllables from, defaulting
+        to the one in the cjkdata pack.
+    """
+    def __init__(self, istream=None):
+        self.replacement = '#'
 
-        return ''.join(results)
+        self._trie = {}
+        for pinyin in zhuyin_table.get_all_pinyin(istream):
+            node = self._trie
+            for char in pinyin:
+                node = node.setdefault(char, {})
 
+            # Handle special case of 儿 shortening from "er" to "r".
+            node[_END] = 'er' if pinyin == 'r' else pinyin
 
-class PinyinSegmenter(object):
-    def __init__(self):
+    def segment_pinyin(self, pinyin_string, score=None):
+        """
+        Segment the given pinyin string.
+
+        :param pinyin_string:
+            The pinyin to segment.
+
+        :param score:
+            By default, the longest syllable is taken at each position. If a
+            scoring function is given, the string is instead segmented by
+            dynamic programming: first to cover as many characters as
+            possible with syllables, then to maximise the total score. It is
+            called as ``score(pinyin, tone)`` for each candidate syllable,
+            and can resolve ambiguous splits such as xian against xi'an.
+
+        :return:
+            A tuple of ``(pinyin, tone)`` pairs, where the tone defaults to
+            0 for neutral.
+        """
+        pinyin_string = normalize(pinyin_string)
+
+        if score is not None:
+            return self._segment_best(pinyin_string, score)
+
+        result = []
+        i = 0
+        while i < len(pinyin_string):
+            matches = self._matches(pinyin_string, i)
+            if not matches:
+                if pinyin_string[i] == self.replacement:
+                    result.append(('', 0))
+                i += 1
+                continue
+
+            end, pinyin = matches[-1]
+            tone, i = self._read_tone(pinyin_string, end)
+            result.append((pinyin, tone))
+
+        return tuple(result)
+
+    def is_pinyin(self, symbol_string):
+        """ Returns True if the symbol string starts with pinyin. """
+        symbol_string = normalize(symbol_string)
+        return bool(symbol_string) and (
+            symbol_string[0] == self.replacement or
+            bool(self._matches(symbol_string, 0))
+        )
+
+    def _matches(self, pinyin_string, start):
+        """
+        Returns every syllable starting at the given position, as a list of
+        ``(end, pinyin)`` pairs from shortest to longest.
+        """
+        matches = []
+        node = self._trie
+        for i in range(start, len(pinyin_string)):
+            node = node.get(pinyin_string[i])
+            if node is None:
+                break
+
+            if _END in node:
+                matches.append((i + 1, node[_END]))
+
+        return matches
+
+    def _read_tone(self, pinyin_string, i):
+        """
+        Reads an optional tone number, returning it and the new position.
+        """
+        if i < len(pinyin_string) and pinyin_string[i] in _TONES:
+            return int(pinyin_string[i]), i + 1
+
+        return 0, i
+
+    def _segment_best(self, pinyin_string, score):
+        """ Segments by dynamic programming over every possible split. """
+        n = len(pinyin_string)
+
+        # best[i] holds (uncovered characters, negated score, end, segment)
+        # for the best segmentation of pinyin_string[i:], where segment is
+        # the first segment, or None if the character at i is skipped.
+        best = [None] * n + [(0, 0, n, None)]
+        for i in range(n - 1, -1, -1):
+            uncovered, cost = best[i + 1][:2]
+            if pinyin_string[i] == self.replacement:
+                best[i] = (uncovered, cost, i + 1, ('', 0))
+            else:
+                best[i] = (uncovered + 1, cost, i + 1, None)
+
+            # Longer syllables win ties, as in longest-match segmentation.
+            for end, pinyin in reversed(self._matches(pinyin_string, i)):
+                tone, end = self._read_tone(pinyin_string, end)
+                uncovered, cost = best[end][:2]
+                candidate = (uncovered, cost - score(pinyin, tone), end,
+                             (pinyin, tone))
+                if candidate[:2] < best[i][:2]:
+                    best[i] = candidate
+
+        result = []
+        i = 0
+        while i < n:
+            end, segment = best[i][2:]
+            if segment is not None:
+                result.append(segment)
+            i = end
+
+        return tuple(result)
+
+
+class RegexPinyinSegmenter(object):
+    """
+    A pinyin segmenter built on one large regular expression alternation
+    over every syllable. It gives the same results as
+    :class:`PinyinSegmenter`'s longest-match segmentation, but is slower to
+    build and to run, and is kept as a reference implementation.
+    """
+    def __init__(self, istream=None):
         self.replacement = '#'
 
         base_pattern = '(%s|%s)' % (
-            zhuyin_table.pinyin_regex_pattern(),
+            zhuyin_table.pinyin_regex_pattern(istream),
             self.replacement,
         )
         self.single_pattern = re.compile(base_pattern, re.UNICODE)
@@ -140,6 +353,142 @@ class PinyinSegmenter(object):
         return bool(self.string_pattern.match(normalize(symbol_string)))
 
 
+class PhrasePinyinTable(object):
+    """
+    Converts hanzi to pinyin a phrase at a time, so that polyphonic hanzi
+    such as 行, 长 and 重 take the reading of the word they occur in. Text
+    is matched left to right against a trie of the multi-character words in
+    a dictionary such as CEDICT, taking the longest word at each position;
+    hanzi outside any word fall back to the :class:`PinyinTable`.
+
+    :param dictionary:
+        A mapping from words to :class:`DictionaryEntry` objects, such as a
+        :class:`BilingualDictionary`. The first reading of each word is
+        used, in lower case.
+
+    :param pinyin_table:
+        The :class:`PinyinTable` to fall back to, defaulting to the cached
+        one.
+    """
+    def __init__(self, dictionary, pinyin_table=None):
+        if pinyin_table is None:
+            pinyin_table = get_pinyin_table()
+        self.pinyin_table = pinyin_table
+
+        self._trie = {}
+        for word, entry in iteritems(dictionary):
+            if len(word) < 2 or not entry.readings:
+                continue
+
+            node = self._trie
+            for char in word:
+                node = node.setdefault(char, {})
+
+            # CEDICT writes ü as u:, and capitalises the readings of proper
+            # nouns, which the fallback table never does.
+            node[_END] = entry.readings[0].replace('u:', 'v').lower()
+
+        self._readings = {}
+
+    def from_hanzi(self, hanzi_string, inline=True, use_tones=True):
+        """
+        Convert all the hanzi in the given string to pinyin readings, with
+        the same options as :meth:`PinyinTable.from_hanzi`.
+        """
+        result = []
+        trie = self._trie
+        fallback = self.pinyin_table.from_hanzi
+
+        # The start of the text not yet covered by a dictionary word.
+        uncovered = 0
+        i = 0
+        n = len(hanzi_string)
+        while i < n:
+            node = trie.get(hanzi_string[i])
+            if node is None:
+                i += 1
+                continue
+
+            end = None
+            j = i + 1
+            while node is not None:
+                if _END in node:
+                    end = j
+                    reading = node[_END]
+
+                if j == n:
+                    break
+
+                node = node.get(hanzi_string[j])
+                j += 1
+
+            if end is None:
+                i += 1
+                continue
+
+            if uncovered < i:
+                result.append(fallback(hanzi_string[uncovered:i],
+                                       inline=inline, use_tones=use_tones))
+            result.append(self._convert(reading, inline, use_tones))
+            i = uncovered = end
+
+        if uncovered < n:
+            result.append(fallback(hanzi_string[uncovered:], inline=inline,
+                                   use_tones=use_tones))
+
+        return ''.join(result)
+
+    def from_hanzi_many(self, hanzi_strings, inline=True, use_tones=True):
+        """
+        Convert many strings of hanzi to pinyin readings, as for
+        :meth:`from_hanzi`.
+
+        :return:
+            A list of the converted strings, in order.
+        """
+        return [self.from_hanzi(hanzi_string, inline=inline,
+                                use_tones=use_tones)
+                for hanzi_string in hanzi_strings]
+
+    def _convert(self, numeric_reading, inline, use_tones):
+        """ Converts a word's numeric reading, memoized. """
+        key = (numeric_reading, inline and use_tones, use_tones)
+        reading = self._readings.get(key)
+        if reading is None:
+            if not use_tones:
+                reading = self.pinyin_table.strip_tones(numeric_reading)
+            elif inline:
+                reading = self.pinyin_table.from_ascii(numeric_reading)
+            else:
+                reading = numeric_reading.replace(' ', '')
+            self._readings[key] = reading
+
+        return reading
+
+
+_END = None
+_TONES = '012345'
+
+
+def apply_tone(syllable, tone):
+    """ Apply a tone to a syllable, marking it on the first vowel. """
+    if tone == 5:
+        tone = 0
+
+    results = []
+    results.append(syllable[0])
+
+    used_tone = False
+    for char in syllable[1:]:
+        if not used_tone and char in vowels:
+            results.append(tone_to_vowels[tone][vowels.index(char)])
+            used_tone = True
+        else:
+            results.append(char)
+
+    return ''.join(results)
+
+
 def normalize(ascii_pinyin):
     """ Normalises common pinyin variants to canonical form."""
     normal_version = ascii_pinyin.lower().replace(' ', '')
@@ -167,3 +516,17 @@ def get_pinyin_segmenter():
         _cached_pinyin_segmenter = PinyinSegmenter()
 
     return _cached_pinyin_segmenter
+
+
+def get_phrase_pinyin_table():
+    """ Get or construct a cached phrase pinyin table, using CEDICT."""
+    global _cached_phrase_pinyin_table
+
+    if _cached_phrase_pinyin_table is None:
+        with codecs.open(cjkdata.get_resource('dict/ce_cedict'), 'r',
+                         'utf8') as istream:
+            cedict = auto_format.load_dictionary(istream)
+
+        _cached_phrase_pinyin_table = PhrasePinyinTable(cedict)
+
+    return _cached_phrase_pinyin_table
@@ -9,14 +9,26 @@
 Based on the radkfile, a dictionary mapping character to bag of radicals.
 """
 
+import os
 import sys
+from itertools import chain
+import mmap
+import struct
+import bisect
+import operator
+from array import array
+from functools import reduce
 
 from cjktools import maps
+from cjktools import parallel
+from cjktools.packed import iter_bits, select_bits, array_view
+from cjktools import smart_cache
 from cjktools.common import get_stream_context, stream_codec
+from cjktools.common import _Mapping as Mapping
 
 from . import cjkdata
 
-from six import text_type
+from six import text_type, string_types, iteritems, unichr
 
 
 def _default_stream():
@@ -29,12 +41,27 @@ class RadkDict(dict):
 
     :param istream:
         The radkfile to parse.
+
+    :param processes:
+        The number of worker processes to parse with. If not 1, the radkfile
+        is split at radical header lines and the pieces parsed in a process
+        pool; ``istream`` must then be a filename or :py:const:`None`.
     """
 
-    def __init__(self, istream=None):
+    def __init__(self, istream=None, processes=1):
         """
 
         """
+        if processes != 1:
+            if istream is None:
+                istream = cjkdata.get_resource('radkfile')
+            elif not isinstance(istream, string_types):
+                raise ValueError('parallel parsing requires a filename')
+
+            self._build(parallel.parse_files(_parse_radk_lines, [istream],
+                                             processes=processes,
+                                             boundary=b'$'))
+            return
 
         with get_stream_context(_default_stream, istream) as istream:
             self._parse_radkfile(stream_codec(istream))
@@ -46,31 +73,24 @@ class RadkDict(dict):
         :param line_stream:
             A stream yielding the  lines in the radkfile to parse.
         """
-        radical_to_kanji = {}
-        radical_to_stroke_count = {}
-
-        current_radical = None
-        stroke_count = None
-
-        for line in line_stream:
-            line = line.rstrip()
-            if line.startswith('#'):
-                # found a comment line
-                continue
+        self._build([_parse_radk_lines(line_stream)])
 
-            if line.startswith('$'):
-                # found a line with a new radical
-                parts = line.split()
-                if len(parts) not in (3, 4):
-                    raise Exception('format error parsing radkfile')
+    def _build(self, partials):
+        """
+        Merges partial parses of the radkfile, populating the current
+        dictionary.
 
-                dollar, current_radical, stroke_count = parts[:3]
-                radical_to_stroke_count[current_radical] = int(stroke_count)
-                continue
+        :param partials:
+            A sequence of ``(radical_to_kanji, radical_to_stroke_count)``
+            pairs, in file order.
+        """
+        radical_to_kanji = {}
+        radical_to_stroke_count = {}
 
-            # found a line of kanji
-            kanji = line.strip()
-            radical_to_kanji.setdefault(current_radical, []).extend(kanji)
+        for partial_kanji, partial_stroke_count in partials:
+            for radical, kanji in iteritems(partial_kanji):
+                radical_to_kanji.setdefault(radical, []).extend(kanji)
+            radical_to_stroke_count.update(partial_stroke_count)
 
         self.update(maps.invert_mapping(radical_to_kanji))
         maps.map_dict(tuple, self, in_place=True)
@@ -86,6 +106,349 @@ class RadkDict(dict):
 
         return cls._cached
 
+    def compile(self, filename):
+        """
+        Writes a compact binary form of this dictionary, which can be loaded
+        by :class:`CompiledRadkDict`. Radicals and kanji are interned as
+        integer ids, and both directions of the mapping are stored as
+        compressed sparse row adjacency arrays.
+
+        The file is written to a temporary name and renamed into place, so
+        that processes loading it never see a partial file.
+
+        :param filename:
+            Where to write the compiled dictionary.
+        """
+        for char in chain(self.radical_to_stroke_count, self):
+            if len(char) != 1:
+                raise ValueError('cannot compile multi-character radical '
+                                 'or kanji: %s' % char)
+
+        radicals = sorted(self.radical_to_stroke_count)
+        kanji = sorted(self)
+        radical_ids = dict((r, i) for (i, r) in enumerate(radicals))
+        kanji_ids = dict((k, i) for (i, k) in enumerate(kanji))
+
+        radical_kanji = [self.radical_to_kanji.get(r, ()) for r in radicals]
+        kanji_radicals = [self[k] for k in kanji]
+
+        sections = [
+            array(_TYPECODE, map(ord, radicals)),
+            array(_TYPECODE, (self.radical_to_stroke_count[r]
+                              for r in radicals)),
+            array(_TYPECODE, map(ord, kanji)),
+        ]
+        sections.extend(_to_csr(radical_kanji, kanji_ids))
+        sections.extend(_to_csr(kanji_radicals, radical_ids))
+
+        header = _HEADER.pack(_MAGIC, _VERSION, _BYTE_ORDER_MARK,
+                              len(radicals), len(kanji),
+                              len(sections[-1]))
+
+        tmp_filename = '%s.%d.tmp' % (filename, os.getpid())
+        with open(tmp_filename, 'wb') as ostream:
+            ostream.write(header)
+            for section in sections:
+                section.tofile(ostream)
+
+        os.rename(tmp_filename, filename)
+
+
+class CompiledRadkDict(Mapping):
+    """
+    A read-only :class:`RadkDict` backed by a file written by
+    :meth:`RadkDict.compile`. The file is memory-mapped rather than read, so
+    every process which loads the same file shares one copy of it in the
+    page cache, and loading costs almost nothing.
+
+    Like :class:`RadkDict`, it maps kanji to tuples of radicals, and has
+    ``radical_to_kanji`` and ``radical_to_stroke_count`` attributes.
+
+    :param filename:
+        The compiled dictionary to load.
+    """
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as istream:
+            self._mmap = mmap.mmap(istream.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+
+        (magic, version, byte_order_mark, n_radicals, n_kanji,
+         n_edges) = _HEADER.unpack_from(self._mmap)
+
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError('not a compiled radkfile: %s' % filename)
+
+        if byte_order_mark != _BYTE_ORDER_MARK:
+            raise ValueError('compiled radkfile has the wrong byte order: '
+                             '%s' % filename)
+
+        offset = _HEADER.size
+        sizes = [n_radicals, n_radicals, n_kanji,
+                 n_radicals + 1, n_edges, n_kanji + 1, n_edges]
+        sections = []
+        for size in sizes:
+            section, offset = array_view(self._mmap, offset, size, _TYPECODE)
+            sections.append(section)
+
+        (radicals, radical_stroke_counts, kanji, radical_indptr,
+         radical_indices, kanji_indptr, kanji_indices) = sections
+
+        self._kanji_to_radicals = _CSRMapping(kanji, kanji_indptr,
+                                              kanji_indices, radicals)
+        self.radical_to_kanji = _CSRMapping(radicals, radical_indptr,
+                                            radical_indices, kanji)
+        self.radical_to_stroke_count = dict(
+            (unichr(r), stroke_count)
+            for (r, stroke_count) in zip(radicals, radical_stroke_counts)
+        )
+
+    def __getitem__(self, kanji):
+        return self._kanji_to_radicals[kanji]
+
+    def __contains__(self, kanji):
+        return kanji in self._kanji_to_radicals
+
+    def __iter__(self):
+        return iter(self._kanji_to_radicals)
+
+    def __len__(self):
+        return len(self._kanji_to_radicals)
+
+
+def get_compiled(filename):
+    """
+    Loads a compiled radkfile, first compiling the radkfile from the cjkdata
+    pack if the file is missing or older than it.
+
+    :param filename:
+        The location of the compiled radkfile.
+    """
+    if smart_cache.needs_update(filename, [cjkdata.get_resource('radkfile')]):
+        RadkDict().compile(filename)
+
+    return CompiledRadkDict(filename)
+
+
+class _CSRMapping(Mapping):
+    """
+    A read-only mapping from characters to tuples of characters, stored as
+    compressed sparse row arrays of code points.
+    """
+
+    def __init__(self, keys, indptr, indices, values):
+        self._keys = keys
+        self._indptr = indptr
+        self._indices = indices
+        self._values = values
+
+    def _key_id(self, key):
+        if len(key) != 1:
+            raise KeyError(key)
+
+        code = ord(key)
+        i = bisect.bisect_left(self._keys, code)
+        if i == len(self._keys) or self._keys[i] != code:
+            raise KeyError(key)
+
+        return i
+
+    def __getitem__(self, key):
+        i = self._key_id(key)
+        values = self._values
+        return tuple(
+            unichr(values[j])
+            for j in self._indices[self._indptr[i]:self._indptr[i + 1]]
+        )
+
+    def __contains__(self, key):
+        try:
+            self._key_id(key)
+        except (KeyError, TypeError):
+            return False
+
+        return True
+
+    def __iter__(self):
+        return (unichr(k) for k in self._keys)
+
+    def __len__(self):
+        return len(self._keys)
+
+
+_MAGIC = b'CJKRADK\0'
+_VERSION = 1
+_BYTE_ORDER_MARK = 0x01020304
+_HEADER = struct.Struct('=8s5I')
+_TYPECODE = 'I'
+
+
+def _to_csr(rows, column_ids):
+    """
+    Converts a list of rows of column names to compressed sparse row form,
+    as a pair of ``(indptr, indices)`` arrays.
+    """
+    indptr = array(_TYPECODE, [0])
+    indices = array(_TYPECODE)
+    for row in rows:
+        indices.extend(column_ids[c] for c in row)
+        indptr.append(len(indices))
+
+    return indptr, indices
+
+
+class RadicalIndex(object):
+    """
+    A bitset index over a :class:`RadkDict`, for finding the kanji which
+    contain every one of a set of radicals, as a radical picker does on each
+    selection. Each kanji is assigned one bit, in order of stroke count, and
+    each radical is stored as a single integer with the bits of its kanji
+    set, so that a search is a handful of bitwise ANDs. Each kanji likewise
+    stores its own radicals as a bitset, so that the radicals which could
+    still be selected are the union over the matching kanji alone.
+
+    :param radk_dict:
+        The :class:`RadkDict` to index.
+
+    :param kanji_stroke_count:
+        A mapping from kanji to stroke count, used to order the results.
+        Defaults to the stroke counts in the cached :class:`Kanjidic`. Kanji
+        without a stroke count are placed last.
+    """
+
+    def __init__(self, radk_dict, kanji_stroke_count=None):
+        if kanji_stroke_count is None:
+            from .kanjidic import Kanjidic
+            kanji_stroke_count = dict(
+                (kanji, entry.stroke_count)
+                for (kanji, entry) in iteritems(Kanjidic.get_cached())
+            )
+
+        unknown = float('inf')
+        self.kanji = tuple(sorted(
+            radk_dict,
+            key=lambda k: (kanji_stroke_count.get(k, unknown), k),
+        ))
+        kanji_to_bit = dict((k, 1 << i) for (i, k) in enumerate(self.kanji))
+
+        radical_to_stroke_count = radk_dict.radical_to_stroke_count
+        self.radicals = tuple(sorted(
+            radical_to_stroke_count,
+            key=lambda r: (radical_to_stroke_count[r], r),
+        ))
+
+        self._radical_bits = {}
+        for radical, kanji in iteritems(radk_dict.radical_to_kanji):
+            if radical is None:
+                continue
+
+            bits = 0
+            for k in kanji:
+                bits |= kanji_to_bit[k]
+            self._radical_bits[radical] = bits
+
+        self._radical_to_bit = dict((r, 1 << i)
+                                    for (i, r) in enumerate(self.radicals))
+        self._kanji_radicals = []
+        for k in self.kanji:
+            bits = 0
+            for radical in radk_dict[k]:
+                bits |= self._radical_to_bit.get(radical, 0)
+            self._kanji_radicals.append(bits)
+
+        self._all_bits = (1 << len(self.kanji)) - 1
+
+        # Searches on no or one radical are the most common and the most
+        # expensive, since they match the most kanji, so they are done once
+        # up front.
+        self._cache = {}
+        for radicals in chain([()], ((r,) for r in self.radicals)):
+            radicals = frozenset(radicals)
+            self._cache[radicals] = self._search(radicals)
+
+    @classmethod
+    def get_cached(cls):
+        """ Returns a memory-cached index of the cached :class:`RadkDict`. """
+        cached = getattr(cls, '_cached', None)
+        if cached is None:
+            cached = cls(RadkDict.get_cached())
+            cls._cached = cached
+
+        return cached
+
+    def search(self, radicals):
+        """
+        Finds the kanji containing all of the given radicals.
+
+        :param radicals:
+            A sequence of radicals.
+
+        :return:
+            A ``(kanji, radicals)`` pair of tuples. The first holds the
+            matching kanji ordered by stroke count, the second the further
+            radicals which occur in at least one of those kanji, ordered by
+            stroke count, i.e. those which could still be selected.
+        """
+        radicals = frozenset(radicals)
+        result = self._cache.get(radicals)
+        if result is None:
+            result = self._search(radicals)
+
+        return result
+
+    def _search(self, radicals):
+        """ Performs a search on a set of radicals, without the cache. """
+        bits = self._all_bits
+        query_bits = 0
+        for radical in radicals:
+            bits &= self._radical_bits.get(radical, 0)
+            query_bits |= self._radical_to_bit.get(radical, 0)
+
+        kanji_ids = list(iter_bits(bits))
+        remaining_bits = reduce(operator.or_,
+                                map(self._kanji_radicals.__getitem__,
+                                    kanji_ids),
+                                0) & ~query_bits
+
+        return (
+            tuple(map(self.kanji.__getitem__, kanji_ids)),
+            select_bits(self.radicals, remaining_bits),
+        )
+
+
+def _parse_radk_lines(line_stream):
+    """
+    Parses lines of the radkfile, returning a ``(radical_to_kanji,
+    radical_to_stroke_count)`` pair.
+    """
+    radical_to_kanji = {}
+    radical_to_stroke_count = {}
+
+    current_radical = None
+    stroke_count = None
+
+    for line in line_stream:
+        line = line.rstrip()
+        if line.startswith('#'):
+            # found a comment line
+            continue
+
+        if line.startswith('$'):
+            # found a line with a new radical
+            parts = line.split()
+            if len(parts) not in (3, 4):
+                raise Exception('format error parsing radkfile')
+
+            dollar, current_radical, stroke_count = parts[:3]
+            radical_to_stroke_count[current_radical] = int(stroke_count)
+            continue
+
+        # found a line of kanji
+        kanji = line.strip()
+        radical_to_kanji.setdefault(current_radical, []).extend(kanji)
+
+    return radical_to_kanji, radical_to_stroke_count
+
 
 def print_radicals(kanji_list):
     """ Print out each kanji and the radicals it contains. """
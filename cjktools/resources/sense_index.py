@@ -0,0 +1,230 @@
+# -*- coding: utf-8 -*-
+#
+#  sense_index.py
+#  cjktools
+#
+
+"""
+An inverted index over the senses of a bilingual dictionary, for reverse
+lookup: finding the headwords whose translations contain some words.
+Queries may require all their terms, any of them, or exact phrases, and
+results are ranked by TF-IDF.
+"""
+
+from __future__ import unicode_literals
+
+import re
+import math
+import heapq
+from array import array
+from bisect import bisect_left, bisect_right
+
+from six.moves import cPickle as pickle
+
+from .split_by_codes import _code_pattern, _known_codes
+
+VERSION = 1
+
+_DOC_TYPECODE = 'I'
+_POSITION_TYPECODE = 'H'
+
+_token_pattern = re.compile(r"[^\W_]+(?:'[^\W_]+)*", re.UNICODE)
+_phrase_pattern = re.compile(r'"([^"]*)"')
+
+
+def tokenize(sense):
+    """
+    Splits the text of a sense into lower-case words, ignoring dictionary
+    codes such as ``(n)`` and sense numbers such as ``(1)``.
+    """
+    return [t.lower() for t in _token_pattern.findall(_strip_codes(sense))]
+
+
+def _strip_codes(sense):
+    def replace(match):
+        codes = match.group(1).split(',')
+        if all(c in _known_codes or c.isdigit() for c in codes):
+            return ' '
+
+        return match.group(0)
+
+    return _code_pattern.sub(replace, sense)
+
+
+class SenseIndex(object):
+    """
+    An inverted index from the words in dictionary senses to the senses
+    which contain them. Each sense is a document, and each word's postings
+    are kept as compact arrays of document ids and positions.
+
+    :param entries:
+        :class:`DictionaryEntry` objects to index, for example a
+        :class:`BilingualDictionary`'s values or the stream from
+        :func:`auto_format.iter_entries`. More can be added later with
+        :meth:`add_entry`.
+    """
+
+    def __init__(self, entries=None):
+        self._words = []
+        self._word_ids = {}
+        self._doc_words = array(_DOC_TYPECODE)
+        self._doc_postings = {}
+        self._position_postings = {}
+        self._doc_freqs = {}
+
+        if entries is not None:
+            for entry in entries:
+                self.add_entry(entry)
+
+    def __len__(self):
+        """ The number of senses indexed. """
+        return len(self._doc_words)
+
+    def add_entry(self, entry):
+        """ Adds the senses of a dictionary entry to the index. """
+        word_id = self._word_ids.get(entry.word)
+        if word_id is None:
+            word_id = self._word_ids[entry.word] = len(self._words)
+            self._words.append(entry.word)
+
+        doc_postings = self._doc_postings
+        position_postings = self._position_postings
+        doc_freqs = self._doc_freqs
+        for sense in entry.senses:
+            doc = len(self._doc_words)
+            self._doc_words.append(word_id)
+            for position, term in enumerate(tokenize(sense)):
+                docs = doc_postings.get(term)
+                if docs is None:
+                    docs = doc_postings[term] = array(_DOC_TYPECODE)
+                    position_postings[term] = array(_POSITION_TYPECODE)
+
+                if not docs or docs[-1] != doc:
+                    doc_freqs[term] = doc_freqs.get(term, 0) + 1
+
+                docs.append(doc)
+                position_postings[term].append(position)
+
+    def search(self, query, operator='and', limit=None):
+        """
+        Finds the headwords with a sense matching the query, best first.
+
+        :param query:
+            Words to search for. Quoted phrases, such as
+            ``'"tooth decay"'``, must occur in a sense exactly.
+
+        :param operator:
+            ``'and'`` if a sense must match every word and phrase of the
+            query, or ``'or'`` if any will do.
+
+        :param limit:
+            The maximum number of results.
+
+        :return:
+            A list of ``(word, score)`` pairs, ranked by the TF-IDF score of
+            each word's best matching sense.
+        """
+        if operator not in ('and', 'or'):
+            raise ValueError('unknown operator: %s' % operator)
+
+        phrases = [tokenize(p) for p in _phrase_pattern.findall(query)]
+        terms = tokenize(_phrase_pattern.sub(' ', query))
+
+        clauses = [self._term_docs(t) for t in terms]
+        clauses.extend(self._phrase_docs(p) for p in phrases if p)
+        if not clauses:
+            return []
+
+        if operator == 'and':
+            clauses.sort(key=len)
+            docs = clauses[0]
+            for clause in clauses[1:]:
+                docs = docs.intersection(clause)
+        else:
+            docs = set().union(*clauses)
+
+        scores = self._score(docs, terms + [t for p in phrases for t in p])
+
+        best = {}
+        for doc, score in scores.items():
+            word_id = self._doc_words[doc]
+            if score > best.get(word_id, -1.0):
+                best[word_id] = score
+
+        def key(item):
+            return (-item[1], item[0])
+
+        if limit is None:
+            ranked = sorted(best.items(), key=key)
+        else:
+            ranked = heapq.nsmallest(limit, best.items(), key=key)
+
+        return [(self._words[word_id], score) for (word_id, score) in ranked]
+
+    def save(self, filename):
+        """ Saves the index to a file, to be read with :meth:`load`. """
+        with open(filename, 'wb') as ostream:
+            pickle.dump((VERSION, self.__dict__), ostream,
+                        pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, filename):
+        """ Loads an index saved with :meth:`save`. """
+        with open(filename, 'rb') as istream:
+            version, state = pickle.load(istream)
+
+        if version != VERSION:
+            raise ValueError('unsupported sense index version in %s' %
+                             filename)
+
+        index = cls.__new__(cls)
+        index.__dict__.update(state)
+        return index
+
+    def _term_docs(self, term):
+        return set(self._doc_postings.get(term, ()))
+
+    def _phrase_docs(self, phrase):
+        """ The documents containing the words of a phrase in order. """
+        docs = None
+        for offset, term in enumerate(phrase):
+            # Each occurrence is keyed by where the phrase would start.
+            starts = set(zip(
+                self._doc_postings.get(term, ()),
+                (p - offset for p in self._position_postings.get(term, ())),
+            ))
+            docs = starts if docs is None else docs.intersection(starts)
+            if not docs:
+                break
+
+        return set(doc for (doc, start) in docs)
+
+    def _score(self, docs, terms):
+        """ Scores documents by the TF-IDF of the query terms. """
+        n_docs = len(self._doc_words)
+        scores = dict.fromkeys(docs, 0.0)
+        for term in set(terms):
+            postings = self._doc_postings.get(term)
+            if not postings:
+                continue
+
+            if len(scores) * 8 < len(postings):
+                # Postings are sorted, so count a few documents' occurrences
+                # by bisection.
+                counts = {}
+                for doc in scores:
+                    count = (bisect_right(postings, doc) -
+                             bisect_left(postings, doc))
+                    if count:
+                        counts[doc] = count
+            else:
+                counts = {}
+                for doc in postings:
+                    if doc in scores:
+                        counts[doc] = counts.get(doc, 0) + 1
+
+            idf = math.log(float(n_docs) / self._doc_freqs[term])
+            for doc, count in counts.items():
+                scores[doc] += (1 + math.log(count)) * idf
+
+        return scores
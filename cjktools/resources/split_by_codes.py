@@ -4,13 +4,17 @@
 #  cjktools
 #
 
+import os
 import re
 from collections import defaultdict
 
 import six
 
 from cjktools.common import _NullContextWrapper as NullContextWrapper
-from .auto_format import iter_entries
+from cjktools.common import sopen
+from cjktools.parallel import map_chunks
+from .auto_format import iter_entries, detect_format
+from .bilingual_dict import _SENSE_SEPARATOR
 
 
 def load_coded_dictionary(file_or_stream):
@@ -26,18 +30,17 @@ def load_coded_dictionary(file_or_stream):
         for entry in iter_entries(file_or_stream):
             word = entry.word
 
-            # Merge any word entries with the same graphical form.
+            # Merge any word entries with the same graphical form. Their
+            # codes are merged along with them, rather than found again.
+            codes = entry.codes
             if word in word_to_entry:
                 e = word_to_entry[word]
                 e.update(entry)
                 entry = e
+                codes = entry.codes
             else:
                 word_to_entry[word] = entry
 
-            codes = set()
-            for sense in entry.senses:
-                codes.update(get_codes(sense))
-
             # Create a subset of the dictionary for each code.
             for code in codes:
                 # Note that overwriting is ok, since we already merged any
@@ -53,10 +56,102 @@ def iter_coded_entries(filename):
     parsed codes, in (entry, code_list) pairs.
     """
     for entry in iter_entries(filename):
-        codes = set()
-        for sense in entry.senses:
-            codes.update(get_codes(sense))
-        yield entry, codes
+        yield entry, set(entry.codes)
+
+
+def split_dictionary(file_or_stream, output_dir, suffix='', processes=1,
+                     chunk_size=10000):
+    """
+    Splits a dictionary by the codes within it in a single pass, writing
+    the lines marked with each code to a file named after the code. Each
+    file starts with the dictionary's header, so that it can be loaded like
+    the original. Codes are found per line, so a homograph's line is only
+    written to the files of its own codes.
+
+    Files are named by :func:`get_code_filename`, so that codes differing
+    only in case, such as ``uK`` and ``uk``, are written to distinct files
+    even on case-insensitive file systems.
+
+    :param file_or_stream:
+        The dictionary's filename, which may be compressed, or its lines.
+
+    :param output_dir:
+        The directory to write to.
+
+    :param suffix:
+        Appended to each filename, such as ``'.gz'`` to compress the files.
+
+    :param processes:
+        The number of worker processes to parse with, or :py:const:`None` to
+        use every CPU.
+
+    :param chunk_size:
+        How many lines to send to a worker at a time.
+
+    :return:
+        A dictionary from each code to the number of lines written for it.
+    """
+    if isinstance(file_or_stream, (six.text_type, six.string_types)):
+        file_or_stream = sopen(file_or_stream, 'r')
+    else:
+        file_or_stream = NullContextWrapper(file_or_stream)
+
+    with file_or_stream as file_or_stream:
+        lines = iter(file_or_stream)
+        header = next(lines)
+        fmt = detect_format(header)
+        if not header.endswith('\n'):
+            header += '\n'
+
+        outputs = {}
+        counts = defaultdict(int)
+        try:
+            for by_code in map_chunks(_split_lines, lines, fmt,
+                                      processes=processes,
+                                      chunk_size=chunk_size):
+                for code, code_lines in by_code.items():
+                    ostream = outputs.get(code)
+                    if ostream is None:
+                        filename = os.path.join(output_dir,
+                                                get_code_filename(code) +
+                                                suffix)
+                        ostream = outputs[code] = sopen(filename, 'w')
+                        ostream.write(header)
+
+                    # One write per code per chunk.
+                    ostream.write(''.join(code_lines))
+                    counts[code] += len(code_lines)
+        finally:
+            for ostream in outputs.values():
+                ostream.close()
+
+    return dict(counts)
+
+
+def get_code_filename(code):
+    """
+    Returns the name of the file :func:`split_dictionary` writes a code's
+    lines to. Each uppercase letter is written as an underscore followed by
+    the lowercase letter, so ``uK`` is written to ``u_k``, which cannot
+    clash with ``uk`` however the file system treats case.
+    """
+    return _uppercase_pattern.sub(lambda m: '_' + m.group().lower(), code)
+
+
+_uppercase_pattern = re.compile('[A-Z]')
+
+
+def _split_lines(fmt, lines):
+    code_lines = defaultdict(list)
+    for line in lines:
+        codes = fmt.parse_line(line).codes
+        if not line.endswith('\n'):
+            line += '\n'
+
+        for code in codes:
+            code_lines[code].append(line)
+
+    return dict(code_lines)
 
 
 _code_pattern = re.compile(
@@ -81,10 +176,54 @@ _known_codes = set(
 
 def get_codes(sense):
     "Returns the dictionary codes found in the given line."
-    matches = _code_pattern.findall(sense)
-    codes = set()
-    for match in matches:
-        for code in match.split(','):
-            if code in _known_codes:
-                codes.add(code)
+    if '(' not in sense:
+        return set()
+
+    return set(_groups_codes(tuple(_code_pattern.findall(sense))))
+
+
+def get_entry_codes(senses):
+    """
+    Returns the dictionary codes found in any of the given senses, as a
+    frozenset shared with every other entry which has the same codes. This
+    is what :attr:`DictionaryEntry.codes` holds.
+    """
+    return get_packed_codes(_SENSE_SEPARATOR.join(senses))
+
+
+def get_packed_codes(packed_senses):
+    """
+    As :func:`get_entry_codes`, for senses joined into one string as a
+    :class:`CompactDictionaryEntry` holds them.
+    """
+    # Codes cannot contain the separator, so one scan finds the groups of
+    # every sense.
+    return _groups_codes(tuple(_code_pattern.findall(packed_senses)))
+
+
+# The codes of each sequence of parenthesised groups seen, such as
+# ('v5k,vt', '1', 'P'). A dictionary has few distinct sequences, so most are
+# found here instead of being split and checked against the known codes.
+_codes_cache = {}
+_CODES_CACHE_SIZE = 100000
+
+# Shared instances of each set of codes.
+_code_sets = {}
+
+
+def _groups_codes(groups):
+    codes = _codes_cache.get(groups)
+    if codes is None:
+        codes = _intern_codes(frozenset(
+            c for group in groups for c in group.split(',')
+            if c in _known_codes
+        ))
+        if len(_codes_cache) < _CODES_CACHE_SIZE:
+            _codes_cache[groups] = codes
+
     return codes
+
+
+def _intern_codes(codes):
+    """ Returns the shared instance of a frozenset of codes. """
+    return _code_sets.setdefault(codes, codes)
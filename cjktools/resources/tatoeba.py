@@ -12,18 +12,29 @@ data tarballs, made available `here <https://tatoeba.org/eng/downloads>`_ into
 convenient Python objects.
 """
 
+import os
 import re
+import mmap
+import struct
 import itertools
+from array import array
+from bisect import bisect_left
 
-from datetime import datetime
-from collections import defaultdict, Mapping
+from datetime import datetime, timedelta
+from collections import defaultdict
 
-from six import raise_from, iteritems
+from six import raise_from, iteritems, integer_types
 from six import PY2
 
 import csv
 
+from cjktools import smart_cache
+from cjktools.packed import array_view
 from cjktools.common import sopen, _NullContextWrapper
+from cjktools.common import _Mapping as Mapping
+
+# Python 2 has no 'q' array, but its longs are 64 bits on most platforms.
+_INT64 = 'l' if PY2 else 'q'
 
 
 class TatoebaDict(Mapping):
@@ -59,10 +70,11 @@ class TatoebaReader(TatoebaDict):
 
         :param csv_kwargs:
             By default, the kwargs passed to :py:func:`csv.reader` are those for
-            a standard Tatoeba file. You can pass additional keyword arguments
-            here.
+            a standard Tatoeba file, which is tab-separated and not quoted, so
+            that quotation marks are read as part of the text. You can pass
+            additional keyword arguments here.
         """
-        reader_kwargs = dict(delimiter='\t')
+        reader_kwargs = dict(delimiter='\t', quoting=csv.QUOTE_NONE)
         reader_kwargs.update(csv_kwargs)
 
         if PY2:
@@ -108,9 +120,15 @@ class TatoebaSentenceReader(TatoebaReader):
     Optionally, you may pass a :py:class:`set` of language codes to the
     constructor's ``languages`` parameter to load only the subset of the
     sentences with those language codes.
+
+    For the full corpus, pass ``compact=True`` to store the sentences in
+    columns of packed arrays rather than Python objects, which takes a
+    fraction of the memory. Lookups are then by binary search, and each
+    sentence is decoded when it is accessed.
     """
-    def __init__(self, sentences, languages=None):
+    def __init__(self, sentences, languages=None, compact=False):
         self.languages = languages
+        self.compact = compact
         self.sentences = sentences
 
     def language(self, sent_id):
@@ -126,12 +144,11 @@ class TatoebaSentenceReader(TatoebaReader):
         :return:
             Returns a string indicating the language of the sentence.
         """
-        for lang, sent_id_set in iteritems(self._language_dict):
-            if sent_id in sent_id_set:
-                return lang
-
-        raise InvalidIDError('No language found '
-                             'for sentence id {}'.format(sent_id))
+        try:
+            return self._sentence_languages[sent_id]
+        except KeyError as e:
+            raise_from(InvalidIDError('No language found '
+                                      'for sentence id {}'.format(sent_id)), e)
 
     def sentence(self, sent_id):
         """
@@ -202,8 +219,12 @@ class TatoebaSentenceReader(TatoebaReader):
             raise InvalidFileError('Invalid sentences file, files'
                                    'must have either 3 or 6 columns.')
 
-        # Prepare output dictionaries
-        language_dict = defaultdict(set)
+        # Prepare output dictionaries. Each sentence's language is stored
+        # rather than a set of sentences for each language, so that looking
+        # one up is a single dictionary access. There are few languages, so
+        # their codes are interned.
+        language_codes = {}
+        sentence_languages = {}
         sentence_dict = {}
 
         if sentences_detailed:
@@ -211,6 +232,9 @@ class TatoebaSentenceReader(TatoebaReader):
         else:
             detailed_info_dict = None
 
+        if self.compact:
+            columns = _SentenceColumns(sentences_detailed)
+
         # Read in all rows
         for row in itertools.chain([first_row], sentence_gen):
             if self.filter_row(row):
@@ -223,20 +247,36 @@ class TatoebaSentenceReader(TatoebaReader):
 
             sent_id = int(sent_id)
 
-            language_dict[lang].add(sent_id)
-            sentence_dict[sent_id] = text
-
             if sentences_detailed:
                 uname, d_added, d_modified = row[3:6]
 
                 uname = None if uname == r'\N' else uname
                 d_added, d_modified = map(self.parse_date,
                                           (d_added, d_modified))
+                details = (uname, d_added, d_modified)
+            else:
+                details = None
+
+            if self.compact:
+                columns.append(sent_id, lang, text, details)
+                continue
+
+            sentence_languages[sent_id] = language_codes.setdefault(lang,
+                                                                    lang)
+            sentence_dict[sent_id] = text
 
-                detailed_info_dict[sent_id] = (uname, d_added, d_modified)
+            if sentences_detailed:
+                detailed_info_dict[sent_id] = details
+
+        if self.compact:
+            columns.finish()
+            sentence_dict = columns
+            sentence_languages = columns.languages
+            detailed_info_dict = columns.details
 
         # Assign the read dictionaries
-        self._language_dict = dict(language_dict)
+        self._sentence_languages = sentence_languages
+        self._language_sets = None
         self._sentence_dict = sentence_dict
         self._detailed_info_dict = detailed_info_dict
 
@@ -247,6 +287,21 @@ class TatoebaSentenceReader(TatoebaReader):
         """
         return self._sentence_dict.keys()
 
+    @property
+    def _language_dict(self):
+        """
+        A dictionary from each language to the set of its sentence ids,
+        built on first use.
+        """
+        if self._language_sets is None:
+            language_sets = defaultdict(set)
+            for sent_id, lang in iteritems(self._sentence_languages):
+                language_sets[lang].add(sent_id)
+
+            self._language_sets = dict(language_sets)
+
+        return self._language_sets
+
     @property
     def _base_dict(self):
         return self._sentence_dict
@@ -269,6 +324,405 @@ class TatoebaSentenceReader(TatoebaReader):
                                            self.sentences)
 
 
+class TatoebaLazySentenceReader(TatoebaSentenceReader):
+    """
+    A :class:`TatoebaSentenceReader` which reads each sentence from the file
+    only when it is accessed, for when only a few of the sentences in the
+    full corpus are needed.
+
+    The first time a file is opened, it is scanned once for the id, language
+    and byte offset of each row, and this index is written next to it. The
+    index is then memory-mapped along with the file itself, so that opening
+    the corpus again is almost instant, and memory is used only for the
+    sentences which are touched. The index is rebuilt whenever the file is
+    changed.
+
+    Since rows are parsed only on access, :func:`filter_row` is not applied.
+
+    :param sentences:
+        The filename of an uncompressed sentences file, of either format.
+
+    :param languages:
+        If passed, a :py:class:`set` of the language codes of the sentences
+        to load.
+
+    :param index_file:
+        Where to keep the index, by default the sentences filename with
+        ``.idx`` appended.
+    """
+    def __init__(self, sentences, languages=None, index_file=None):
+        self.languages = languages
+        self.index_file = index_file
+        self.sentences = sentences
+
+    @property
+    def sentences(self):
+        """
+        The filename of the sentences being read.
+        """
+        return self._sentences_src
+
+    @sentences.setter
+    def sentences(self, src):
+        if getattr(src, 'read', None) is not None:
+            raise ValueError('TatoebaLazySentenceReader needs a filename, '
+                             'not a file object')
+
+        self._sentences_src = src
+
+        index_file = self.index_file
+        if index_file is None:
+            index_file = src + '.idx'
+
+        index = None
+        if not smart_cache.needs_update(index_file, [src]):
+            index = _load_sentence_index(index_file, os.path.getsize(src))
+
+        if index is None:
+            _write_sentence_index(src, index_file)
+            index = _load_sentence_index(index_file, os.path.getsize(src))
+
+        rows = _SentenceOffsets(src, index, self.parse_date, self.languages)
+
+        self._sentence_languages = rows.languages
+        self._language_sets = None
+        self._sentence_dict = rows
+        self._detailed_info_dict = rows.details
+
+
+class _SentenceColumns(Mapping):
+    """
+    The sentences of a :class:`TatoebaSentenceReader` stored in columns: a
+    sorted array of ids, the UTF-8 text of every sentence in one buffer
+    with an array of offsets into it, small integer language codes, and,
+    for detailed files, interned usernames and dates as integer seconds.
+
+    This is a mapping from id to sentence text; :attr:`languages` and
+    :attr:`details` are mappings from id to language and to details.
+    """
+
+    def __init__(self, detailed):
+        self.ids = array(_INT64)
+        self.offsets = array(_INT64, [0])
+        self.text = bytearray()
+        self.language_codes = array('H')
+        self.language_names = []
+        self._language_ids = {}
+
+        self.detailed = detailed
+        if detailed:
+            self.username_codes = array('l')
+            self.usernames = []
+            self._username_ids = {}
+            self.dates_added = array(_INT64)
+            self.dates_modified = array(_INT64)
+
+        self.languages = _SentenceColumn(self, self.language)
+        self.details = _SentenceColumn(self, self.detail) if detailed else None
+
+    def append(self, sent_id, lang, text, details=None):
+        self.ids.append(sent_id)
+        self.text.extend(text.encode('utf-8'))
+        self.offsets.append(len(self.text))
+
+        code = self._language_ids.get(lang)
+        if code is None:
+            code = self._language_ids[lang] = len(self.language_names)
+            self.language_names.append(lang)
+        self.language_codes.append(code)
+
+        if self.detailed:
+            uname, d_added, d_modified = details
+            if uname is None:
+                code = -1
+            else:
+                code = self._username_ids.get(uname)
+                if code is None:
+                    code = self._username_ids[uname] = len(self.usernames)
+                    self.usernames.append(uname)
+            self.username_codes.append(code)
+            self.dates_added.append(_pack_date(d_added))
+            self.dates_modified.append(_pack_date(d_modified))
+
+    def finish(self):
+        """ Sorts the columns by id, once every sentence is appended. """
+        self._language_ids = None
+        self._username_ids = None
+
+        ids = self.ids
+        if all(ids[i] < ids[i + 1] for i in range(len(ids) - 1)):
+            return
+
+        order = sorted(range(len(ids)), key=ids.__getitem__)
+
+        # Later rows replace earlier ones with the same id, as they would
+        # in a dictionary.
+        unique = []
+        for i in order:
+            if unique and ids[unique[-1]] == ids[i]:
+                unique[-1] = i
+            else:
+                unique.append(i)
+
+        offsets = self.offsets
+        text = bytearray()
+        new_offsets = array(_INT64, [0])
+        for i in unique:
+            text.extend(self.text[offsets[i]:offsets[i + 1]])
+            new_offsets.append(len(text))
+
+        self.text = text
+        self.offsets = new_offsets
+        self.ids = _permute(ids, unique)
+        self.language_codes = _permute(self.language_codes, unique)
+        if self.detailed:
+            self.username_codes = _permute(self.username_codes, unique)
+            self.dates_added = _permute(self.dates_added, unique)
+            self.dates_modified = _permute(self.dates_modified, unique)
+
+    def index(self, sent_id):
+        """ Returns the row of a sentence id, or raises KeyError. """
+        ids = self.ids
+        if isinstance(sent_id, integer_types):
+            i = bisect_left(ids, sent_id)
+            if i < len(ids) and ids[i] == sent_id:
+                return i
+
+        raise KeyError(sent_id)
+
+    def language(self, i):
+        return self.language_names[self.language_codes[i]]
+
+    def detail(self, i):
+        code = self.username_codes[i]
+        return (self.usernames[code] if code >= 0 else None,
+                _unpack_date(self.dates_added[i]),
+                _unpack_date(self.dates_modified[i]))
+
+    def __getitem__(self, sent_id):
+        i = self.index(sent_id)
+        return self.text[self.offsets[i]:self.offsets[i + 1]].decode('utf-8')
+
+    def __contains__(self, sent_id):
+        try:
+            self.index(sent_id)
+        except KeyError:
+            return False
+
+        return True
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class _SentenceColumn(Mapping):
+    """ A mapping from sentence id to one column of a _SentenceColumns. """
+
+    def __init__(self, columns, getter):
+        self._columns = columns
+        self._getter = getter
+
+    def __getitem__(self, sent_id):
+        return self._getter(self._columns.index(sent_id))
+
+    def __iter__(self):
+        return iter(self._columns)
+
+    def __len__(self):
+        return len(self._columns)
+
+
+def _permute(values, order):
+    return array(values.typecode, (values[i] for i in order))
+
+
+# Dates are packed as whole seconds since the epoch, with None stored as
+# the smallest integer.
+_EPOCH = datetime(1970, 1, 1)
+_NO_DATE = -2 ** 63
+
+
+def _pack_date(dt):
+    if dt is None:
+        return _NO_DATE
+
+    delta = dt - _EPOCH
+    return delta.days * 86400 + delta.seconds
+
+
+def _unpack_date(seconds):
+    if seconds == _NO_DATE:
+        return None
+
+    return _EPOCH + timedelta(seconds=seconds)
+
+
+class _SentenceOffsets(_SentenceColumns):
+    """
+    The sentences of a :class:`TatoebaLazySentenceReader`: the columns of
+    its index, with the byte offset of each row in the memory-mapped
+    sentences file in place of its text and details, which are parsed from
+    the row on access.
+    """
+
+    def __init__(self, filename, index, parse_date, languages=None):
+        detailed, ids, offsets, language_codes, language_names = index
+        if languages is not None:
+            keep = set(i for (i, lang) in enumerate(language_names)
+                       if lang in languages)
+            rows = [i for (i, code) in enumerate(language_codes)
+                    if code in keep]
+            ids = array(_INT64, (ids[i] for i in rows))
+            offsets = array(_INT64, (offsets[i] for i in rows))
+            language_codes = array('H', (language_codes[i] for i in rows))
+
+        self.ids = ids
+        self.offsets = offsets
+        self.language_codes = language_codes
+        self.language_names = language_names
+        self.detailed = detailed
+        self._parse_date = parse_date
+
+        with open(filename, 'rb') as istream:
+            self._mmap = mmap.mmap(istream.fileno(), 0,
+                                   access=mmap.ACCESS_READ)
+
+        self.languages = _SentenceColumn(self, self.language)
+        self.details = _SentenceColumn(self, self.detail) if detailed else None
+
+    def row(self, i):
+        """ Parses the columns of a row of the file. """
+        start = self.offsets[i]
+        end = self._mmap.find(b'\n', start)
+        if end < 0:
+            end = len(self._mmap)
+
+        line = self._mmap[start:end].decode('utf-8')
+        return line.rstrip('\r').split('\t')
+
+    def detail(self, i):
+        uname, d_added, d_modified = self.row(i)[3:6]
+        return (None if uname == r'\N' else uname,
+                self._parse_date(d_added),
+                self._parse_date(d_modified))
+
+    def __getitem__(self, sent_id):
+        return self.row(self.index(sent_id))[2]
+
+
+# The index of a sentences file holds a header, the sorted ids of its rows,
+# their byte offsets and their language codes, followed by the names of the
+# languages. The size of the sentences file is recorded so that an index
+# which is out of date can be spotted even if its modification time is not.
+_INDEX_MAGIC = b'CJKTATO\0'
+_INDEX_VERSION = 1
+_INDEX_BYTE_ORDER_MARK = 0x01020304
+_INDEX_HEADER = struct.Struct('=8s4I2Q')
+
+
+def _write_sentence_index(filename, index_file):
+    """
+    Scans a sentences file for the id, language and byte offset of each of
+    its rows, and writes them to an index file.
+    """
+    ids = array(_INT64)
+    offsets = array(_INT64)
+    language_codes = array('H')
+    language_names = []
+    language_ids = {}
+    n_columns = None
+
+    offset = 0
+    with open(filename, 'rb') as istream:
+        for line in istream:
+            start = offset
+            offset += len(line)
+            if not line.strip():
+                continue
+
+            if n_columns is None:
+                n_columns = line.rstrip(b'\r\n').count(b'\t') + 1
+                if n_columns not in (3, 6):
+                    raise InvalidFileError('Invalid sentences file, files '
+                                           'must have either 3 or 6 columns.')
+
+            sent_id, lang = line.split(b'\t', 2)[:2]
+            code = language_ids.get(lang)
+            if code is None:
+                code = language_ids[lang] = len(language_names)
+                language_names.append(lang)
+
+            ids.append(int(sent_id))
+            offsets.append(start)
+            language_codes.append(code)
+
+    if n_columns is None:
+        raise InvalidFileError('Empty sentences file: %s' % filename)
+
+    # Rows are kept in the order of their ids, with later rows replacing
+    # earlier ones with the same id, as for the other readers.
+    if any(ids[i] >= ids[i + 1] for i in range(len(ids) - 1)):
+        unique = []
+        for i in sorted(range(len(ids)), key=ids.__getitem__):
+            if unique and ids[unique[-1]] == ids[i]:
+                unique[-1] = i
+            else:
+                unique.append(i)
+
+        ids = _permute(ids, unique)
+        offsets = _permute(offsets, unique)
+        language_codes = _permute(language_codes, unique)
+
+    header = _INDEX_HEADER.pack(_INDEX_MAGIC, _INDEX_VERSION,
+                                _INDEX_BYTE_ORDER_MARK, int(n_columns == 6),
+                                len(language_names), offset, len(ids))
+
+    tmp_filename = '%s.%d.tmp' % (index_file, os.getpid())
+    with open(tmp_filename, 'wb') as ostream:
+        ostream.write(header)
+        for section in (ids, offsets, language_codes):
+            section.tofile(ostream)
+        ostream.write(b'\n'.join(language_names))
+
+    os.rename(tmp_filename, index_file)
+
+
+def _load_sentence_index(index_file, file_size):
+    """
+    Memory-maps an index written by :func:`_write_sentence_index`, returning
+    ``(detailed, ids, offsets, language_codes, language_names)``, or None if
+    it was written by another version or for a file of another size.
+    """
+    with open(index_file, 'rb') as istream:
+        buf = mmap.mmap(istream.fileno(), 0, access=mmap.ACCESS_READ)
+
+    if len(buf) < _INDEX_HEADER.size:
+        return None
+
+    (magic, version, byte_order_mark, detailed, n_languages, size,
+     n_rows) = _INDEX_HEADER.unpack_from(buf)
+
+    if (magic != _INDEX_MAGIC or version != _INDEX_VERSION or
+            byte_order_mark != _INDEX_BYTE_ORDER_MARK or size != file_size):
+        return None
+
+    offset = _INDEX_HEADER.size
+    sections = []
+    for typecode in (_INT64, _INT64, 'H'):
+        section, offset = array_view(buf, offset, n_rows, typecode)
+        sections.append(section)
+
+    ids, offsets, language_codes = sections
+    language_names = buf[offset:].decode('utf-8').split('\n')
+    if len(language_names) != n_languages:
+        return None
+
+    return bool(detailed), ids, offsets, language_codes, language_names
+
+
 class TatoebaLinksReader(TatoebaReader):
     def __init__(self, links, sentence_ids=None, sentence_ids_filter='both'):
         """
@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+#
+#  transliterate.py
+#  cjktools
+#
+
+"""
+A streaming pipeline for transliterating whole files of Chinese text from
+hanzi to pinyin or zhuyin. Lines are sent in chunks to a pool of worker
+processes, each holding its own preloaded tables, and written back out in
+their original order. It can also be run from the command line::
+
+    python -m cjktools.resources.transliterate corpus.txt.gz corpus.pinyin
+"""
+
+from __future__ import unicode_literals, print_function
+
+import re
+import sys
+import time
+import argparse
+
+from six import unichr
+
+from cjktools.common import sopen
+from cjktools.parallel import map_chunks
+
+from .pinyin_table import get_pinyin_table, get_phrase_pinyin_table
+from .zhuyin_table import ZhuyinTable
+
+SCRIPTS = ('pinyin', 'zhuyin')
+TONE_STYLES = ('marks', 'numbers', 'none')
+
+_ZHUYIN_TONE_MARKS = dict((ord(mark), None) for mark in 'ˉˊˇˋ˙')
+
+
+class Transliterator(object):
+    """
+    Converts lines of hanzi to pinyin or zhuyin. Only runs of hanzi with a
+    reading in the pinyin table are converted; everything else, such as
+    spaces, punctuation and Latin text, is passed through unchanged in every
+    style.
+
+    :param script:
+        The script to write, either ``'pinyin'`` or ``'zhuyin'``.
+
+    :param tones:
+        How to write tones: ``'marks'`` for tone marks, ``'numbers'`` for
+        numeric pinyin, or ``'none'`` to omit them. Zhuyin cannot be written
+        with numbers.
+
+    :param pinyin_table:
+        The :class:`PinyinTable` or :class:`PhrasePinyinTable` to convert
+        hanzi with, defaulting to the cached :class:`PinyinTable`.
+
+    :param zhuyin_table:
+        The :class:`ZhuyinTable` to convert pinyin to zhuyin with, defaulting
+        to the cached one.
+    """
+
+    def __init__(self, script='pinyin', tones='marks', pinyin_table=None,
+                 zhuyin_table=None):
+        if script not in SCRIPTS:
+            raise ValueError('unknown script: %s' % script)
+
+        if tones not in TONE_STYLES:
+            raise ValueError('unknown tone style: %s' % tones)
+
+        if script == 'zhuyin' and tones == 'numbers':
+            raise ValueError('zhuyin cannot be written with tone numbers')
+
+        if pinyin_table is None:
+            pinyin_table = get_pinyin_table()
+
+        if script == 'zhuyin' and zhuyin_table is None:
+            zhuyin_table = ZhuyinTable.get_cached()
+
+        self.script = script
+        self.tones = tones
+        self.pinyin_table = pinyin_table
+        self.zhuyin_table = zhuyin_table
+
+        # A PhrasePinyinTable falls back to a PinyinTable, whose hanzi it
+        # also reads.
+        self._hanzi_pattern = _hanzi_pattern(
+            getattr(pinyin_table, 'pinyin_table', pinyin_table)
+        )
+
+    def __call__(self, hanzi_string):
+        """ Transliterates a string of hanzi. """
+        return self._hanzi_pattern.sub(self._convert_run, hanzi_string)
+
+    def _convert_run(self, match):
+        """ Transliterates a run of hanzi, all of which have readings. """
+        hanzi_string = match.group()
+        if self.script == 'pinyin':
+            return self.pinyin_table.from_hanzi(
+                hanzi_string,
+                inline=(self.tones == 'marks'),
+                use_tones=(self.tones != 'none'),
+            )
+
+        numeric = self.pinyin_table.from_hanzi(hanzi_string, inline=False)
+        zhuyin = self.zhuyin_table.to_zhuyin(numeric)
+        if self.tones == 'none':
+            zhuyin = zhuyin.translate(_ZHUYIN_TONE_MARKS)
+
+        return zhuyin
+
+
+def _hanzi_pattern(pinyin_table):
+    """
+    Builds a pattern matching runs of the hanzi which have a reading in a
+    :class:`PinyinTable`, as a character class of ranges of code points.
+    """
+    codes = sorted(ord(hanzi) for (hanzi, readings) in pinyin_table.items()
+                   if len(hanzi) == 1 and readings)
+
+    ranges = []
+    for code in codes:
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+
+    char_class = ''.join(
+        re.escape(unichr(start)) if start == end else
+        '%s-%s' % (re.escape(unichr(start)), re.escape(unichr(end)))
+        for (start, end) in ranges
+    )
+    if not char_class:
+        # Nothing has a reading, so nothing is converted.
+        return re.compile(r'(?!)')
+
+    return re.compile('[%s]+' % char_class, re.UNICODE)
+
+
+def transliterate_lines(lines, transliterator=None, processes=1,
+                        chunk_size=1000):
+    """
+    Transliterates a stream of lines, yielding the results in order. Line
+    endings are not included in the results.
+
+    :param lines:
+        An iterable of lines of hanzi.
+
+    :param transliterator:
+        The :class:`Transliterator` to use, defaulting to tone-marked pinyin.
+
+    :param processes:
+        The number of worker processes, defaulting to the number of CPUs if
+        :py:const:`None`. Each worker is sent its own copy of the
+        transliterator and its tables once, when it starts.
+
+    :param chunk_size:
+        How many lines to send to a worker at a time.
+    """
+    if transliterator is None:
+        transliterator = Transliterator()
+
+    lines = (line.rstrip('\r\n') for line in lines)
+    for converted in map_chunks(_transliterate_chunk, lines, transliterator,
+                                processes=processes, chunk_size=chunk_size):
+        for line in converted:
+            yield line
+
+
+def transliterate_file(input_file, output_file, transliterator=None,
+                       processes=None, chunk_size=1000):
+    """
+    Transliterates a whole file, line by line. Either file may be
+    compressed, as with :func:`cjktools.common.sopen`, or ``'-'`` for
+    standard input or output.
+
+    :return:
+        The number of lines transliterated.
+    """
+    n_lines = 0
+    with sopen(input_file, 'r') as istream:
+        with sopen(output_file, 'w') as ostream:
+            for line in transliterate_lines(istream, transliterator,
+                                            processes=processes,
+                                            chunk_size=chunk_size):
+                ostream.write(line)
+                ostream.write('\n')
+                n_lines += 1
+
+    return n_lines
+
+
+def _transliterate_chunk(transliterator, lines):
+    return [transliterator(line) for line in lines]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description='Transliterate a file of Chinese text from hanzi to '
+                    'pinyin or zhuyin.'
+    )
+    parser.add_argument('input_file',
+                        help='the file to read, or - for standard input')
+    parser.add_argument('output_file',
+                        help='the file to write, or - for standard output')
+    parser.add_argument('--script', choices=SCRIPTS, default='pinyin')
+    parser.add_argument('--tones', choices=TONE_STYLES, default='marks')
+    parser.add_argument('--phrases', action='store_true',
+                        help='read polyphonic hanzi by CEDICT phrases')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--chunk-size', type=int, default=1000,
+                        help='lines sent to a worker at a time')
+    args = parser.parse_args(argv)
+
+    table = None
+    if args.phrases:
+        table = get_phrase_pinyin_table()
+
+    transliterator = Transliterator(script=args.script, tones=args.tones,
+                                    pinyin_table=table)
+
+    start = time.time()
+    n_lines = transliterate_file(args.input_file, args.output_file,
+                                 transliterator, processes=args.processes,
+                                 chunk_size=args.chunk_size)
+    elapsed = time.time() - start
+
+    print('%d lines in %.2fs (%.0f lines/s)' % (
+        n_lines, elapsed, n_lines / elapsed if elapsed else 0),
+        file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -8,6 +8,8 @@
 An interface to the zhuyin <-> pinyin table.
 """
 
+from __future__ import unicode_literals
+
 from functools import partial
 
 from . import cjkdata
@@ -28,59 +30,235 @@ def parse_lines(istream):
             yield line.rstrip().split()
 
 
-def zhuyin_to_pinyin_table(istream=None):
-    """ Returns a dictionary mapping zhuyin to pinyin. """
-    with _get_stream_context(istream) as stream:
-        table = {}
-        for zhuyin, pinyin in parse_lines(stream):
-            table[zhuyin] = pinyin
+class ZhuyinTable(object):
+    """
+    The zhuyin <-> pinyin table, parsed once. As well as both mappings and
+    the inventory of syllables, it converts whole strings between pinyin and
+    zhuyin, with tones, in a single longest-match pass.
 
-    return table
+    :param istream:
+        The conversion table to parse, defaulting to the one in the cjkdata
+        pack.
+    """
 
+    def __init__(self, istream=None):
+        with _get_stream_context(istream) as stream:
+            rows = list(parse_lines(stream))
 
-def pinyin_to_zhuyin_table(istream=None):
-    """ Returns a dictionary mapping zhuyin to pinyin. """
-    with _get_stream_context(istream) as istream:
-        table = {}
-        for zhuyin, pinyin in parse_lines(istream):
-            table[pinyin] = zhuyin
+        self.zhuyin_to_pinyin = dict((z, p) for (z, p) in rows)
+        self.pinyin_to_zhuyin = dict((p, z) for (z, p) in rows)
+        self.all_pinyin = ['r'] + [p for (z, p) in rows]
+        self.all_zhuyin = [z for (z, p) in rows]
 
-    return table
+        # Sort from longest to shortest, so as to make maximum matches
+        # whenever possible.
+        self.pinyin_regex_pattern = '(%s)([0-5]?)' % '|'.join(
+            sorted(self.all_pinyin, key=len, reverse=True)
+        )
+        self.zhuyin_regex_pattern = '(%s)[%s]?' % (
+            '|'.join(sorted(self.all_zhuyin, key=len, reverse=True)),
+            _ZHUYIN_TONE_MARKS,
+        )
 
+        pinyin_to_zhuyin = dict(self.pinyin_to_zhuyin)
+        if 'r' not in pinyin_to_zhuyin and 'er' in pinyin_to_zhuyin:
+            # The erhua suffix.
+            pinyin_to_zhuyin['r'] = pinyin_to_zhuyin['er']
 
-def get_all_pinyin(istream=None):
-    """ Returns a list of all pinyin """
-    with _get_stream_context(istream) as istream:
-        all_pinyin = ['r']
+        self._pinyin_trie = _build_trie(pinyin_to_zhuyin)
+        self._zhuyin_trie = _build_trie(self.zhuyin_to_pinyin)
+        self._marked_vowels = _marked_vowels()
 
-        for zhuyin, pinyin in parse_lines(istream):
-            all_pinyin.append(pinyin)
+    @classmethod
+    def get_cached(cls):
+        """ Returns a memory-cached table parsed from the cjkdata pack. """
+        cached = getattr(cls, '_cached', None)
+        if cached is None:
+            cached = cls()
+            cls._cached = cached
 
-    return all_pinyin
+        return cached
 
+    def to_zhuyin(self, pinyin_string):
+        """
+        Converts the pinyin in a string to zhuyin. Tones may be given as
+        numbers (``bei3jing1``) or tone marks (``běijīng``), and become
+        zhuyin tone marks; the neutral tone is only marked when given
+        explicitly as 5 or 0. Text which is not pinyin is left unchanged.
+        """
+        result = []
+        n = len(pinyin_string)
+        i = 0
+        while i < n:
+            match = self._match_pinyin(pinyin_string, i)
+            if match is None:
+                result.append(pinyin_string[i])
+                i += 1
+                continue
 
-def pinyin_regex_pattern(istream=None):
-    """ Returns a pinyin regex pattern, with optional tone number. """
-    all_pinyin = get_all_pinyin(istream)
+            i, zhuyin, tone = match
+            if i < n and pinyin_string[i] in _DIGIT_TONES:
+                tone = _DIGIT_TONES[pinyin_string[i]]
+                i += 1
 
-    # Sort from longest to shortest, so as to make maximum matches whenever
-    # possible.
-    all_pinyin = sorted(all_pinyin, key=len, reverse=True)
+            result.append(zhuyin + _TONE_TO_ZHUYIN_MARK[tone])
 
-    # Build a generic pattern for a single pinyin with an optional tone.
-    pattern = '(%s)([0-5]?)' % '|'.join(all_pinyin)
+            # Apostrophes only separate syllables.
+            if i < n and pinyin_string[i] == "'":
+                i += 1
 
-    return pattern
+        return ''.join(result)
 
+    def to_pinyin(self, zhuyin_string, tone_marks=True):
+        """
+        Converts the zhuyin in a string to pinyin. Text which is not zhuyin
+        is left unchanged.
 
-def zhuyin_regex_pattern(istream=None):
-    """ Returns a zhuyin regex pattern. """
-    with _get_stream_context(istream) as istream:
-        all_pinyin = []
+        :param zhuyin_string:
+            The string to convert.
+
+        :param tone_marks:
+            If True, tones are marked on the vowels of the pinyin (``bēi``),
+            otherwise they are appended as numbers (``bei1``).
+        """
+        from .pinyin_table import apply_tone
+
+        result = []
+        n = len(zhuyin_string)
+        i = 0
+        while i < n:
+            start = i
+            neutral = zhuyin_string[i] == _NEUTRAL_MARK
+            if neutral:
+                # The neutral tone mark is traditionally written first.
+                i += 1
+
+            match = _longest_match(self._zhuyin_trie, zhuyin_string, i)
+            if match is None:
+                result.append(zhuyin_string[start])
+                i = start + 1
+                continue
+
+            i, pinyin = match
+            tone = 5 if neutral else 1
+            if i < n and zhuyin_string[i] in _ZHUYIN_MARK_TO_TONE:
+                tone = _ZHUYIN_MARK_TO_TONE[zhuyin_string[i]]
+                i += 1
+
+            if tone_marks:
+                result.append(apply_tone(pinyin, tone))
+            else:
+                result.append('%s%d' % (pinyin, tone))
+
+        return ''.join(result)
+
+    def _match_pinyin(self, pinyin_string, start):
+        """
+        Finds the longest pinyin syllable at the given position, ignoring
+        case and tone marks. Returns ``(end, zhuyin, tone)``, or None.
+        """
+        match = None
+        tone = 0
+        marked_vowels = self._marked_vowels
+        node = self._pinyin_trie
+        for i in range(start, len(pinyin_string)):
+            char = pinyin_string[i]
+            if char in marked_vowels:
+                char, char_tone = marked_vowels[char]
+                tone = tone or char_tone
+            else:
+                char = char.lower()
+                if char == 'v':
+                    char = 'ü'
+
+            node = node.get(char)
+            if node is None:
+                break
+
+            if _END in node:
+                match = (i + 1, node[_END], tone)
+
+        return match
+
+
+def _build_trie(mapping):
+    """ Builds a character trie over a mapping's keys. """
+    trie = {}
+    for key, value in mapping.items():
+        node = trie
+        for char in key:
+            node = node.setdefault(char, {})
+        node[_END] = value
+
+    return trie
+
+
+def _longest_match(trie, string, start):
+    """
+    Finds the longest key of a trie at the given position, returning
+    ``(end, value)``, or None.
+    """
+    match = None
+    node = trie
+    for i in range(start, len(string)):
+        node = node.get(string[i])
+        if node is None:
+            break
+
+        if _END in node:
+            match = (i + 1, node[_END])
 
-        for zhuyin, pinyin in parse_lines(istream):
-            all_pinyin.append(pinyin)
+    return match
 
-    pattern = '(%s)[0-4]?' % '|'.join(all_pinyin)
 
-    return pattern
+def _marked_vowels():
+    """ Maps each tone-marked pinyin vowel to its plain vowel and tone. """
+    from .pinyin_table import vowels, tone_to_vowels
+
+    marked = {}
+    for tone in (1, 2, 3, 4):
+        for vowel, marked_vowel in zip(vowels, tone_to_vowels[tone]):
+            marked[marked_vowel] = (vowel, tone)
+            marked[marked_vowel.upper()] = (vowel, tone)
+
+    return marked
+
+
+_END = None
+_NEUTRAL_MARK = '˙'
+_ZHUYIN_TONE_MARKS = 'ˉˊˇˋ˙'
+_ZHUYIN_MARK_TO_TONE = {'ˉ': 1, 'ˊ': 2, 'ˇ': 3, 'ˋ': 4, '˙': 5}
+_TONE_TO_ZHUYIN_MARK = {0: '', 1: '', 2: 'ˊ', 3: 'ˇ', 4: 'ˋ', 5: '˙'}
+_DIGIT_TONES = {'0': 5, '1': 1, '2': 2, '3': 3, '4': 4, '5': 5}
+
+
+def _get_table(istream=None):
+    if istream is None:
+        return ZhuyinTable.get_cached()
+
+    return ZhuyinTable(istream)
+
+
+def zhuyin_to_pinyin_table(istream=None):
+    """ Returns a dictionary mapping zhuyin to pinyin. """
+    return dict(_get_table(istream).zhuyin_to_pinyin)
+
+
+def pinyin_to_zhuyin_table(istream=None):
+    """ Returns a dictionary mapping zhuyin to pinyin. """
+    return dict(_get_table(istream).pinyin_to_zhuyin)
+
+
+def get_all_pinyin(istream=None):
+    """ Returns a list of all pinyin """
+    return list(_get_table(istream).all_pinyin)
+
+
+def pinyin_regex_pattern(istream=None):
+    """ Returns a pinyin regex pattern, with optional tone number. """
+    return _get_table(istream).pinyin_regex_pattern
+
+
+def zhuyin_regex_pattern(istream=None):
+    """ Returns a zhuyin regex pattern, with optional tone mark. """
+    return _get_table(istream).zhuyin_regex_pattern
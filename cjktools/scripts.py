@@ -59,6 +59,10 @@ class ScriptMapping:
         self.ord_diff = ord(self.to_start) - ord(self.from_start)
         assert ((ord(self.from_end) - ord(self.from_start)) <=
                 (ord(self.to_end) - ord(self.to_start)))
+        self._table = dict(
+            (code, code + self.ord_diff)
+            for code in range(ord(self.from_start), ord(self.from_end) + 1)
+        )
 
     def __call__(self, j_string):
         """
@@ -66,6 +70,9 @@ class ScriptMapping:
         Any characters which don't match the input script are passed through
         unchanged.
         """
+        if isinstance(j_string, text_type):
+            return j_string.translate(self._table)
+
         result = []
         for char in j_string:
             if self.from_start <= char <= self.from_end:
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+#  test_alternation_index.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cjktools.resources.auto_format import iter_entries, load_dictionary
+from cjktools.resources.alternation_index import (AlternationIndex,
+                                                  reading_segmentations)
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(AlternationIndexTestCase),
+    ))
+    return test_suite
+
+EDICT_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+学生 [がくせい] /(n) student/
+学校 [がっこう] /(n) school/
+本棚 [ほんだな] /(n) bookshelf/
+山 [やま] /(n) mountain/
+山 [さん] /(n) mount/
+ラーメン /(n) ramen/
+"""  # nopep8
+
+
+class AlternationIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = AlternationIndex(
+            load_dictionary(to_unicode_stream(EDICT_SAMPLE))
+        )
+
+    def test_segmentations(self):
+        self.assertEqual(list(reading_segmentations('学生', 'がくせい')),
+                         [('が', 'くせい'), ('がく', 'せい'),
+                          ('がくせ', 'い')])
+        self.assertEqual(list(reading_segmentations('山', 'やま')), [])
+        self.assertEqual(list(reading_segmentations('学生', 'ガクセイ')), [])
+        self.assertEqual(
+            len(list(reading_segmentations('一二三', 'いちにさん', 3))),
+            6,
+        )
+
+    def test_exact(self):
+        self.assertEqual(self.index.lookup('がくせい'), ['学生'])
+        self.assertEqual(self.index.lookup('やま'), ['山'])
+        self.assertEqual(self.index.lookup('さん'), ['山'])
+        self.assertEqual(self.index.lookup('らーめん'), ['ラーメン'])
+        self.assertEqual(self.index.lookup('はし'), [])
+
+    def test_variants(self):
+        # Sound euphony.
+        self.assertEqual(self.index.lookup('がっせい'), ['学生'])
+        self.assertEqual(self.index.lookup('がくこう'), ['学校'])
+        # Sequential voicing.
+        self.assertEqual(self.index.lookup('がくぜい'), ['学生'])
+        self.assertEqual(self.index.lookup('がっごう'), ['学校'])
+        self.assertEqual(self.index.lookup('ほんたな'), ['本棚'])
+        # Katakana queries are normalised.
+        self.assertEqual(self.index.lookup('ガッセイ'), ['学生'])
+        self.assertIn('ホンタナ', self.index)
+
+    def test_entry_stream(self):
+        index = AlternationIndex(
+            iter_entries(to_unicode_stream(EDICT_SAMPLE))
+        )
+        self.assertEqual(len(index), len(self.index))
+        self.assertEqual(index.lookup('さん'), ['山'])
+
+    def test_save(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'alternations.idx')
+            self.index.save(filename)
+            loaded = AlternationIndex.load(filename)
+            self.assertEqual(loaded.lookup('がっせい'), ['学生'])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
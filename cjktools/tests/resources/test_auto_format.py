@@ -7,16 +7,21 @@
 from __future__ import unicode_literals
 import unittest
 
+import random
+
 from cjktools.resources.auto_format import detect_format, load_dictionary
+from cjktools.resources.auto_format import known_formats
 from cjktools.resources.bilingual_dict import BilingualDictionary
-from cjktools.resources.dict_format import UnknownFormatError
+from cjktools.resources.dict_format import UnknownFormatError, FormatError
+from cjktools.resources.dict_format import RegexFormat
 
 from .._common import to_unicode_stream
 
 
 def suite():
     test_suite = unittest.TestSuite((
-        unittest.makeSuite(AutoFormatTestCase)
+        unittest.makeSuite(AutoFormatTestCase),
+        unittest.makeSuite(FastFormatTestCase),
     ))
     return test_suite
 
@@ -93,11 +98,112 @@ class AutoFormatTestCase(unittest.TestCase):
         d = load_dictionary(self.je_edict)
         self.assertEqual(d['齧歯目'].senses_by_reading(), expected)
 
+    def test_edict_compact(self):
+        "Tests that a compact parse gives the same entries."
+        d = load_dictionary(to_unicode_stream(EDICT_SAMPLE), compact=True)
+        self._check_lookup(
+            d,
+            u'齲歯',
+            [u'うし']*4 + [u'むしば']*4,
+            ['(n,adj-no) cavity', 'tooth decay', 'decayed tooth',
+                'caries']*2,
+        )
+        self.assertEqual(d.words_by_reading('むしば'), ['齲歯'])
+
+    def test_edict_parallel(self):
+        "Tests that a parallel parse matches a serial one."
+        serial = load_dictionary(to_unicode_stream(EDICT_SAMPLE))
+        lines = iter(to_unicode_stream(EDICT_SAMPLE))
+        dict_format = detect_format(next(lines))
+
+        # Chunks of one line split the homographs between workers.
+        parallel = dict_format.parse_dictionary(lines, processes=2,
+                                                chunk_size=1)
+
+        self.assertEqual(list(parallel), list(serial))
+        for word in serial:
+            self.assertEqual(parallel[word].readings, serial[word].readings)
+            self.assertEqual(parallel[word].senses, serial[word].senses)
+
     def _check_lookup(self, dictionary, key, readings, senses):
         entry = dictionary[key]
         self.assertEqual(entry.readings, readings)
         self.assertEqual(entry.senses, senses)
 
 
+class FastFormatTestCase(unittest.TestCase):
+    """
+    Checks that the hand-written EDICT and CEDICT parsers agree with their
+    regular expressions.
+    """
+    LINES = [
+        '齲歯 [うし] /(n,adj-no) cavity/tooth decay/\n',
+        '齲歯 /(n,adj-no) cavity//tooth decay/',
+        'ラーメン [] /(n) ramen/\n',
+        '上野 [うえの]/Ueno (loc)/\n',
+        '上野 [うえ の] /Ueno (loc)/\r\n',
+        '上野 [うえの] \n',
+        '上野\n',
+        '上野 [う/え] /\n',
+        '上野 [う/え] /Ueno/\n',
+        ' 上野 /Ueno/\n',
+        '北京 北京 [Bei3 jing1] /Beijing/\n',
+        '北京 北京 /Beijing/capital of China/\n',
+        '北京 北京 [Bei3 jing1]/Beijing\n',
+        '北京 北京 [Bei3 jing1 /Beijing/\n',
+        '北京 北京  /Beijing/\n',
+        '北京 /Beijing/\n',
+        '北京 北京 [Bei3/jing1] /\n',
+        '北京 北京 [Bei3/jing1]/Beijing/\n',
+        'a [b\nc] /d/\n',
+    ]
+
+    def setUp(self):
+        self.formats = [f for f in known_formats
+                        if isinstance(f, RegexFormat) and
+                        type(f) is not RegexFormat]
+
+    def _check(self, fast_format, line):
+        regex_format = RegexFormat(
+            fast_format.name,
+            fast_format.header_pattern.pattern,
+            fast_format.line_pattern.pattern,
+            fast_format.sense_pattern.pattern,
+        )
+        results = []
+        for f in (regex_format, fast_format):
+            try:
+                entry = f.parse_line(line)
+                results.append((entry.word, entry.readings, entry.senses))
+                self.assertEqual(f.parse_word(line), entry.word)
+            except FormatError:
+                results.append(FormatError)
+                with self.assertRaises(FormatError):
+                    f.parse_word(line)
+
+        self.assertEqual(results[0], results[1],
+                         '%s differs on %r' % (fast_format.name, line))
+
+    def test_selected(self):
+        names = set(f.name for f in self.formats)
+        self.assertEqual(names, set(['edict', 'cedict']))
+        header = EDICT_SAMPLE.splitlines()[0]
+        self.assertIsNot(type(detect_format(header)), RegexFormat)
+
+    def test_lines(self):
+        for fast_format in self.formats:
+            for line in self.LINES:
+                self._check(fast_format, line)
+
+    def test_random_lines(self):
+        rng = random.Random(0)
+        alphabet = ' ' * 4 + '[]/' * 2 + 'abあ' + '\r\n'
+        for fast_format in self.formats:
+            for i in range(2000):
+                line = ''.join(rng.choice(alphabet)
+                               for j in range(rng.randint(0, 16)))
+                self._check(fast_format, line)
+
+
 if __name__ == "__main__":
     unittest.TextTestRunner(verbosity=1).run(suite())
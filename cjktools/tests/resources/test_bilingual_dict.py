@@ -6,11 +6,10 @@
 
 from __future__ import unicode_literals
 
+import pickle
 import unittest
 from cjktools.resources import bilingual_dict
 
-from cjktools.errors import NotYetImplementedError
-
 from cjktools.resources.dict_format import RegexFormat
 
 edict_fmt = RegexFormat(
@@ -46,10 +45,234 @@ class BilingualDictTest(unittest.TestCase):
 
     def testClashPolicyMerge(self):
         d1 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d1.add_entry(edict_fmt.parse_line('齲歯 [うし] /cavity/caries/'))
+        d1.add_entry(edict_fmt.parse_line('歯 [は] /tooth/'))
 
-        d1['a'] = 2
-        d2 = {'a': 4, 'b': 1}
+        d2 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d2.add_entry(edict_fmt.parse_line('齲歯 [むしば] /tooth decay/'))
+        d2.add_entry(edict_fmt.parse_line('虫歯 [むしば] /cavity/'))
+        original = d1['齲歯']
+
+        d1.update(d2, clash_policy=bilingual_dict.ClashPolicy.Merge)
+
+        self.assertEqual(sorted(d1), ['歯', '虫歯', '齲歯'])
+        self.assertEqual(d1['齲歯'].readings, ['うし', 'うし', 'むしば'])
+        self.assertEqual(d1['齲歯'].senses,
+                         ['cavity', 'caries', 'tooth decay'])
+        self.assertEqual(d1.words_by_reading('むしば'), ['齲歯', '虫歯'])
+
+        # Neither input entry is changed.
+        self.assertEqual(original.senses, ['cavity', 'caries'])
+        self.assertEqual(d2['齲歯'].readings, ['むしば'])
+
+    def testClashPolicyMergeKeepsSource(self):
+        d1 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d1.add_entry(edict_fmt.parse_line('歯 [は] /tooth/'))
+
+        d2 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d2.add_entry(edict_fmt.parse_line('虫歯 [むしば] /cavity/'))
+        d2.add_entry(edict_fmt.parse_line('歯 [し] /teeth/'))
+
+        d1.update(d2, clash_policy=bilingual_dict.ClashPolicy.Merge)
+        d1.add_entry(edict_fmt.parse_line('虫歯 [ちゅうし] /decay/'))
+        d1.add_entry(edict_fmt.parse_line('歯 [よわい] /age/'))
+
+        self.assertEqual(d1['虫歯'].senses, ['cavity', 'decay'])
+        self.assertEqual(d2['虫歯'].readings, ['むしば'])
+        self.assertEqual(d2['虫歯'].senses, ['cavity'])
+        self.assertEqual(d2['歯'].readings, ['し'])
+        self.assertEqual(d2['歯'].senses, ['teeth'])
+
+    def testClashPolicyMergeCompact(self):
+        pool = {}
+
+        def compact(line):
+            entry = edict_fmt.parse_line(line)
+            return bilingual_dict.CompactDictionaryEntry(
+                entry.word, entry.readings, entry.senses, pool)
+
+        d1 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d1.add_entry(compact('齲歯 [うし] /cavity/'))
+        d2 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d2.add_entry(compact('齲歯 [むしば] /tooth decay/'))
+        d2.add_entry(compact('虫歯 [むしば] /cavity/'))
+
+        d1.update(d2, clash_policy=bilingual_dict.ClashPolicy.Merge)
+
+        for word in ('齲歯', '虫歯'):
+            self.assertIsInstance(d1[word],
+                                  bilingual_dict.CompactDictionaryEntry)
+        self.assertEqual(d1['齲歯'].readings, ['うし', 'むしば'])
+        self.assertEqual(d1['齲歯'].senses, ['cavity', 'tooth decay'])
+        self.assertEqual(d2['齲歯'].senses, ['tooth decay'])
+
+    def testClashPolicyMergeWithoutClashes(self):
+        d1 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d1.add_entry(edict_fmt.parse_line('歯 [は] /tooth/'))
+        d2 = {'虫歯': edict_fmt.parse_line('虫歯 [むしば] /cavity/')}
+
+        d1.update(d2, clash_policy=bilingual_dict.ClashPolicy.Merge)
+
+        self.assertEqual(sorted(d1), ['歯', '虫歯'])
+        self.assertEqual(d1.words_by_reading('むしば'), ['虫歯'])
+
+        # Entries without a clash are shared, not copied.
+        self.assertIs(d1['虫歯'], d2['虫歯'])
+
+    def testAddEntryKeepsSharedEntry(self):
+        d1 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d2 = bilingual_dict.BilingualDictionary(edict_fmt)
+        d2.add_entry(edict_fmt.parse_line('虫歯 [むしば] /cavity/'))
+        d1.update(d2)
+
+        d1.add_entry(edict_fmt.parse_line('虫歯 [ちゅうし] /decay/'))
+
+        self.assertEqual(d1['虫歯'].senses, ['cavity', 'decay'])
+        self.assertEqual(d1.words_by_reading('ちゅうし'), ['虫歯'])
+        self.assertEqual(d2['虫歯'].senses, ['cavity'])
+        self.assertEqual(d2.words_by_reading('ちゅうし'), [])
+
+
+class ReadingIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.d = bilingual_dict.BilingualDictionary(edict_fmt)
+        for line in ['齲歯 [うし] /cavity/',
+                     '齲歯 [むしば] /cavity/',
+                     '虫歯 [むしば] /cavity/',
+                     'ムシバ /bug/']:
+            self.d.add_entry(edict_fmt.parse_line(line))
+
+    def testLookup(self):
+        self.assertEqual(self.d.words_by_reading('むしば'),
+                         ['齲歯', '虫歯', 'ムシバ'])
+        self.assertEqual(self.d.words_by_reading('ムシバ'),
+                         ['齲歯', '虫歯', 'ムシバ'])
+        self.assertEqual(self.d.words_by_reading('うし'), ['齲歯'])
+        self.assertEqual(self.d.words_by_reading('は'), [])
+
+    def testOverwrite(self):
+        self.d['虫歯'] = edict_fmt.parse_line('虫歯 [ちゅうし] /cavity/')
+        self.assertEqual(self.d.words_by_reading('むしば'),
+                         ['齲歯', 'ムシバ'])
+        self.assertEqual(self.d.words_by_reading('ちゅうし'), ['虫歯'])
+
+        del self.d['齲歯']
+        self.assertEqual(self.d.words_by_reading('むしば'), ['ムシバ'])
+        self.assertEqual(self.d.words_by_reading('うし'), [])
+
+    def testUpdate(self):
+        other = {'虫歯': edict_fmt.parse_line('虫歯 [ちゅうし] /cavity/'),
+                 '歯': edict_fmt.parse_line('歯 [は] /tooth/')}
+        self.d.update(other)
+        self.assertEqual(self.d.words_by_reading('むしば'),
+                         ['齲歯', 'ムシバ'])
+        self.assertEqual(self.d.words_by_reading('は'), ['歯'])
+
+    def testSetdefault(self):
+        entry = edict_fmt.parse_line('歯 [は] /tooth/')
+        self.assertIs(self.d.setdefault('歯', entry), entry)
+        self.assertEqual(self.d.words_by_reading('は'), ['歯'])
+
+        other = edict_fmt.parse_line('歯 [し] /tooth/')
+        self.assertIs(self.d.setdefault('歯', other), entry)
+        self.assertEqual(self.d.words_by_reading('し'), [])
+
+    def testPop(self):
+        self.assertEqual(self.d.pop('虫歯').word, '虫歯')
+        self.assertEqual(self.d.words_by_reading('むしば'),
+                         ['齲歯', 'ムシバ'])
+        self.assertIsNone(self.d.pop('虫歯', None))
+
+    def testPopitem(self):
+        words = []
+        while self.d:
+            word, entry = self.d.popitem()
+            self.assertEqual(entry.word, word)
+            words.append(word)
+
+        self.assertEqual(sorted(words), sorted(['齲歯', '虫歯', 'ムシバ']))
+        for reading in ('むしば', 'うし'):
+            self.assertEqual(self.d.words_by_reading(reading), [])
+
+    def testInplaceOr(self):
+        d = self.d
+        d |= {'虫歯': edict_fmt.parse_line('虫歯 [ちゅうし] /cavity/')}
+        self.assertIs(d, self.d)
+        self.assertEqual(d.words_by_reading('むしば'), ['齲歯', 'ムシバ'])
+        self.assertEqual(d.words_by_reading('ちゅうし'), ['虫歯'])
+
+    def testClear(self):
+        self.d.clear()
+        self.assertEqual(self.d.words_by_reading('むしば'), [])
+
+        self.d.add_entry(edict_fmt.parse_line('歯 [は] /tooth/'))
+        self.assertEqual(self.d.words_by_reading('は'), ['歯'])
+
+    def testPickle(self):
+        copy = pickle.loads(pickle.dumps(self.d, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.format.name, 'edict')
+        self.assertEqual(copy.words_by_reading('むしば'),
+                         ['齲歯', '虫歯', 'ムシバ'])
+
+
+class CompactEntryTest(unittest.TestCase):
+    def testCopy(self):
+        for entry_class in (bilingual_dict.DictionaryEntry,
+                            bilingual_dict.CompactDictionaryEntry):
+            entry = entry_class('歯', ['は', 'し'], ['(n) tooth', 'teeth'])
+            copy = entry.copy()
+            self.assertIs(type(copy), entry_class)
+            self.assertEqual(copy.codes, frozenset(['n']))
+
+            copy.update(entry_class('歯', ['よわい'], ['age']))
+            self.assertEqual(copy.readings, ['は', 'し', 'よわい'])
+            self.assertEqual(entry.readings, ['は', 'し'])
+            self.assertEqual(entry.senses, ['(n) tooth', 'teeth'])
+
+    def testReadings(self):
+        for readings, senses in [(['a'], ['x', 'y']),
+                                 (['a', 'a'], ['x', 'y']),
+                                 (['a', 'b'], ['x', 'y']),
+                                 (['a', 'a', 'b', 'a'], list('wxyz'))]:
+            entry = bilingual_dict.CompactDictionaryEntry('w', readings,
+                                                          senses)
+            self.assertEqual(entry.readings, readings)
+            self.assertEqual(entry.senses, senses)
+
+    def testInterning(self):
+        pool = {}
+        a = bilingual_dict.CompactDictionaryEntry('a', [''.join('はし')],
+                                                  ['x'], pool)
+        b = bilingual_dict.CompactDictionaryEntry('b', [''.join('はし')],
+                                                  ['y'], pool)
+        self.assertIs(a.readings[0], b.readings[0])
+
+    def testUpdate(self):
+        line_a = '齲歯 [うし] /(n,adj-no) cavity/tooth decay/'
+        line_b = '齲歯 [むしば] /(n,adj-no) cavity/caries/(P)/'
+        expected = edict_fmt.parse_line(line_a)
+        expected.update(edict_fmt.parse_line(line_b))
+
+        for rhs_class in (bilingual_dict.DictionaryEntry,
+                          bilingual_dict.CompactDictionaryEntry):
+            entry = edict_fmt.parse_line(line_a)
+            entry = bilingual_dict.CompactDictionaryEntry(
+                entry.word, entry.readings, entry.senses)
+            rhs = edict_fmt.parse_line(line_b)
+            entry.update(rhs_class(rhs.word, rhs.readings, rhs.senses))
+
+            self.assertEqual(entry.readings, expected.readings)
+            self.assertEqual(entry.senses, expected.senses)
+            self.assertEqual(entry.senses_by_reading(),
+                             expected.senses_by_reading())
+
+    def testSeparator(self):
+        with self.assertRaises(ValueError):
+            bilingual_dict.CompactDictionaryEntry('w', ['r'], ['a\x1fb'])
 
-        with self.assertRaises(NotYetImplementedError):
-            clash_policy = bilingual_dict.ClashPolicy.Merge
-            d1.update(d2, clash_policy=clash_policy)
+    def testPickle(self):
+        entry = bilingual_dict.CompactDictionaryEntry(
+            'w', ['a', 'a', 'b'], ['x', 'y', 'z'])
+        copy = pickle.loads(pickle.dumps(entry, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(copy.readings, entry.readings)
+        self.assertEqual(copy.senses, entry.senses)
@@ -0,0 +1,105 @@
+# -*- coding: utf-8 -*-
+#
+#  test_code_index.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cjktools.resources.auto_format import load_dictionary
+from cjktools.resources.code_index import CodeIndex
+from cjktools.resources.dict_store import DictionaryStore, save_dictionary
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(CodeIndexTestCase),
+        unittest.makeSuite(StoreCodeIndexTestCase),
+    ))
+    return test_suite
+
+EDICT_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+書く [かく] /(v5k,vt) to write/(P)/
+歩く [あるく] /(v5k,vi) to walk/(P)/
+食べる [たべる] /(v1,vt) to eat/(P)/
+賜う [たまう] /(v5u,vt) (arch) to give/
+齲歯 [うし] /(n,adj-no) cavity/
+齲歯 [むしば] /(n,adj-no) (uk) tooth decay/
+"""  # nopep8
+
+
+class CodeIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dictionary = load_dictionary(to_unicode_stream(EDICT_SAMPLE))
+        self.index = CodeIndex(self.dictionary)
+
+    def test_codes(self):
+        self.assertEqual(len(self.index), 5)
+        self.assertEqual(self.index.codes(),
+                         ['adj-no', 'arch', 'n', 'uk', 'v1', 'v5k', 'v5u',
+                          'vi', 'vt'])
+
+    def test_queries(self):
+        # Words come in dictionary order, which Python 2 dicts do not keep.
+        def words(query):
+            return sorted(self.index.words(query))
+
+        self.assertEqual(words('vt'), sorted(['書く', '食べる', '賜う']))
+        self.assertEqual(words('vt and not arch'), sorted(['書く', '食べる']))
+        self.assertEqual(words('v5k or v1'), sorted(['書く', '歩く', '食べる']))
+        self.assertEqual(words('(v5k OR v5u) AND NOT vi'),
+                         sorted(['書く', '賜う']))
+        self.assertEqual(words('not vt and not vi'), ['齲歯'])
+        self.assertEqual(words('vi or vt and arch'), sorted(['歩く', '賜う']))
+        self.assertEqual(words('not (vi or vt) and uk'), ['齲歯'])
+        self.assertEqual(words('v5r'), [])
+        self.assertEqual(self.index.count('vt or vi'), 4)
+
+    def test_dictionary_order(self):
+        self.assertEqual(self.index.words('vt or vi or n'),
+                         list(self.dictionary))
+
+    def test_search(self):
+        entries = list(self.index.search('n and uk'))
+        self.assertEqual(len(entries), 1)
+        self.assertIs(entries[0], self.dictionary['齲歯'])
+
+    def test_bad_queries(self):
+        for query in ('', 'vt and', 'not', '(vt or vi', 'vt vi', 'vt)',
+                      'and vt', 'noun'):
+            with self.assertRaises(ValueError):
+                self.index.words(query)
+
+
+class StoreCodeIndexTestCase(CodeIndexTestCase):
+    """ Runs the same tests on an index of a DictionaryStore. """
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        filename = os.path.join(self.tmp_dir, 'edict.sqlite')
+        save_dictionary(load_dictionary(to_unicode_stream(EDICT_SAMPLE)),
+                        filename)
+        self.dictionary = DictionaryStore(filename)
+        self.index = CodeIndex(self.dictionary)
+
+    def test_no_entries_loaded(self):
+        self.assertEqual(len(self.dictionary._cache), 0)
+
+    def test_search(self):
+        entries = list(self.index.search('n and uk'))
+        self.assertEqual([e.word for e in entries], ['齲歯'])
+
+    def tearDown(self):
+        self.dictionary.close()
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+#  test_dict_diff.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cjktools.resources.auto_format import load_dictionary
+from cjktools.resources.dict_diff import diff_dictionaries, diff_files
+from cjktools.resources.dict_store import DictionaryStore, save_dictionary
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(DictionaryDiffTestCase),
+    ))
+    return test_suite
+
+OLD_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+齧歯目 [げっしもく] /(n) (1) Rodentia/(adj-no) (2) rat-like/rodential/
+齲歯 [うし] /(n,adj-no) cavity/tooth decay/decayed tooth/caries/
+齲歯 [むしば] /(n,adj-no) cavity/tooth decay/decayed tooth/caries/
+虫歯 [むしば] /(n) cavity/
+歯 [は] /(n) tooth/
+"""  # nopep8
+
+NEW_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+齧歯目 [げっしもく] /(n) (1) Rodentia/(adj-no) (2) rat-like/rodential/
+齲歯 [うし] /(n,adj-no) cavity/tooth decay/decayed tooth/caries/
+齲歯 [むしば] /(n,adj-no) cavity/tooth decay/caries/
+歯 [は] /(n) tooth/
+歯医者 [はいしゃ] /(n) dentist/(P)/
+"""  # nopep8
+
+CEDICT_SAMPLE = \
+"""# CEDICT
+中國 中国 [Zhong1 guo2] /China/Middle Kingdom/
+"""  # nopep8
+
+
+class DictionaryDiffTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.delta = diff_dictionaries(to_unicode_stream(OLD_SAMPLE),
+                                       to_unicode_stream(NEW_SAMPLE))
+
+    def test_delta(self):
+        self.assertEqual(len(self.delta), 3)
+        self.assertEqual([e.word for e in self.delta.added], ['歯医者'])
+        self.assertEqual(self.delta.removed, ['虫歯'])
+
+        changed, = self.delta.changed
+        self.assertEqual(changed.word, '齲歯')
+        self.assertEqual(changed.readings, 4 * ['うし'] + 3 * ['むしば'])
+        self.assertEqual(changed.senses[-1], 'caries')
+
+    def test_identical(self):
+        delta = diff_dictionaries(to_unicode_stream(NEW_SAMPLE),
+                                  to_unicode_stream(NEW_SAMPLE))
+        self.assertEqual(len(delta), 0)
+
+    def test_apply(self):
+        dictionary = load_dictionary(to_unicode_stream(OLD_SAMPLE))
+        self.delta.apply(dictionary)
+
+        expected = load_dictionary(to_unicode_stream(NEW_SAMPLE))
+        self._assert_same(dictionary, expected)
+        self.assertEqual(dictionary.words_by_reading('むしば'), ['齲歯'])
+        self.assertEqual(dictionary.words_by_reading('はいしゃ'), ['歯医者'])
+
+    def test_apply_to_store(self):
+        filename = os.path.join(self.tmp_dir, 'edict.sqlite')
+        save_dictionary(load_dictionary(to_unicode_stream(OLD_SAMPLE)),
+                        filename)
+        self.delta.apply_to_store(filename)
+
+        store = DictionaryStore(filename)
+        expected = load_dictionary(to_unicode_stream(NEW_SAMPLE))
+        self._assert_same(store, expected)
+        self.assertEqual(store.words_by_reading('むしば'), ['齲歯'])
+        self.assertEqual(store.words_by_code('n'),
+                         ['齧歯目', '齲歯', '歯', '歯医者'])
+        self.assertEqual(store.words_by_code('adj-no'), ['齧歯目', '齲歯'])
+        store.close()
+
+    def test_files(self):
+        old_filename = os.path.join(self.tmp_dir, 'edict.old')
+        new_filename = os.path.join(self.tmp_dir, 'edict.new')
+        for filename, sample in ((old_filename, OLD_SAMPLE),
+                                 (new_filename, NEW_SAMPLE)):
+            with open(filename, 'wb') as ostream:
+                ostream.write(sample.encode('utf8'))
+
+        delta = diff_files(old_filename, new_filename)
+        self.assertEqual(repr(delta),
+                         '<DictionaryDelta: 1 added, 1 changed, 1 removed>')
+
+    def test_mismatched_formats(self):
+        with self.assertRaises(ValueError):
+            diff_dictionaries(to_unicode_stream(OLD_SAMPLE),
+                              to_unicode_stream(CEDICT_SAMPLE))
+
+    def _assert_same(self, dictionary, expected):
+        self.assertEqual(sorted(dictionary), sorted(expected))
+        for word, entry in expected.items():
+            self.assertEqual(dictionary[word].readings, entry.readings)
+            self.assertEqual(dictionary[word].senses, entry.senses)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+#
+#  test_dict_store.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import pickle
+import shutil
+import sqlite3
+import tempfile
+import unittest
+
+from cjktools.resources.auto_format import load_dictionary
+from cjktools.resources.dict_store import (DictionaryStore, save_dictionary,
+                                           get_store)
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(DictionaryStoreTestCase),
+    ))
+    return test_suite
+
+EDICT_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+齧歯目 [げっしもく] /(n) (1) Rodentia/(adj-no) (2) rat-like/rodential/
+齲歯 [うし] /(n,adj-no) cavity/tooth decay/decayed tooth/caries/
+齲歯 [むしば] /(n,adj-no) cavity/tooth decay/decayed tooth/caries/
+虫歯 [むしば] /(n) cavity/
+"""  # nopep8
+
+
+class DictionaryStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'edict.sqlite')
+        self.dictionary = load_dictionary(to_unicode_stream(EDICT_SAMPLE))
+        save_dictionary(self.dictionary, self.filename)
+        self.store = DictionaryStore(self.filename, cache_size=2)
+
+    def test_entries(self):
+        self.assertEqual(self.store.format.name, 'edict')
+        self.assertEqual(len(self.store), len(self.dictionary))
+        self.assertEqual(list(self.store), list(self.dictionary))
+
+        for word, entry in self.dictionary.items():
+            self.assertIn(word, self.store)
+            self.assertEqual(self.store[word].readings, entry.readings)
+            self.assertEqual(self.store[word].senses, entry.senses)
+
+        self.assertNotIn('歯', self.store)
+        with self.assertRaises(KeyError):
+            self.store['歯']
+
+    def test_cache(self):
+        entry = self.store['虫歯']
+        self.assertIs(self.store['虫歯'], entry)
+
+        for word in self.dictionary:
+            self.store[word]
+
+        self.assertEqual(len(self.store._cache), 2)
+
+    def test_indexes(self):
+        # Words come in the order they were saved in, which is dictionary
+        # order, and so not insertion order on Python 2.
+        self.assertEqual(sorted(self.store.words_by_reading('むしば')),
+                         sorted(['齲歯', '虫歯']))
+        self.assertEqual(self.store.words_by_reading('は'), [])
+        self.assertEqual(sorted(self.store.words_by_code('adj-no')),
+                         sorted(['齧歯目', '齲歯']))
+        self.assertEqual(sorted(self.store.words_by_code('n')),
+                         sorted(['齧歯目', '齲歯', '虫歯']))
+
+    def test_iter_code_words(self):
+        code_words = dict(self.store.iter_code_words())
+        self.assertEqual(sorted(code_words['adj-no']),
+                         sorted(['齧歯目', '齲歯']))
+        self.assertEqual(sorted(code_words['n']),
+                         sorted(['齧歯目', '齲歯', '虫歯']))
+        for code, words in code_words.items():
+            self.assertEqual(words, self.store.words_by_code(code))
+        self.assertEqual(len(self.store._cache), 0)
+
+    def test_kana_readings(self):
+        # Katakana and hiragana readings are equivalent, as in the
+        # dictionary the store was saved from.
+        for reading in ('むしば', 'ムシバ', 'げっしもく', 'ゲッシモク'):
+            self.assertEqual(sorted(self.store.words_by_reading(reading)),
+                             sorted(self.dictionary.words_by_reading(reading)))
+
+        self.assertEqual(sorted(self.store.words_by_reading('ムシバ')),
+                         sorted(['齲歯', '虫歯']))
+        self.assertEqual(self.store['虫歯'].readings, ['むしば'])
+
+    def test_pickle(self):
+        self.store['虫歯']
+        copy = pickle.loads(pickle.dumps(self.store))
+        self.assertEqual(len(copy._cache), 0)
+        self.assertEqual(copy['虫歯'].senses, ['(n) cavity'])
+
+    def test_get_store(self):
+        dictionary_file = os.path.join(self.tmp_dir, 'edict')
+        with open(dictionary_file, 'wb') as ostream:
+            ostream.write(EDICT_SAMPLE.encode('utf8'))
+
+        filename = os.path.join(self.tmp_dir, 'cached.sqlite')
+        store = get_store(dictionary_file, filename)
+        self.assertEqual(list(store), list(self.dictionary))
+        store.close()
+
+        # A store from another version is rebuilt, however new it is.
+        connection = sqlite3.connect(filename)
+        connection.execute("UPDATE meta SET value = '1' "
+                           "WHERE key = 'version'")
+        connection.commit()
+        connection.close()
+
+        store = get_store(dictionary_file, filename)
+        self.assertEqual(sorted(store.words_by_reading('ムシバ')),
+                         sorted(['齲歯', '虫歯']))
+        store.close()
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
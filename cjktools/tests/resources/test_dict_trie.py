@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+#  test_dict_trie.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import pickle
+import unittest
+
+from cjktools.resources.auto_format import iter_entries, load_dictionary
+from cjktools.resources.dict_trie import DictionaryTrie
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(DictionaryTrieTestCase),
+    ))
+    return test_suite
+
+EDICT_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+東 [ひがし] /(n) east/
+東京 [とうきょう] /(n) Tokyo/
+東京都 [とうきょうと] /(n) Tokyo Metropolis/
+京都 [きょうと] /(n) Kyoto/
+都 [みやこ] /(n) capital/
+に /(prt) to/
+行く [いく] /(v5k-s) to go/
+"""  # nopep8
+
+
+class DictionaryTrieTestCase(unittest.TestCase):
+    def setUp(self):
+        self.trie = DictionaryTrie(
+            load_dictionary(to_unicode_stream(EDICT_SAMPLE))
+        )
+
+    def test_build_from_entries(self):
+        trie = DictionaryTrie(iter_entries(to_unicode_stream(EDICT_SAMPLE)))
+        self.assertEqual(len(trie), 7)
+        self.assertEqual(trie.prefixes('東京都'), ['東', '東京', '東京都'])
+
+    def test_contains(self):
+        self.assertEqual(len(self.trie), 7)
+        for word in ['東', '東京', '東京都', '京都', 'に']:
+            self.assertIn(word, self.trie)
+
+        for word in ['東京に', '京', '', 'x']:
+            self.assertNotIn(word, self.trie)
+
+    def test_prefixes(self):
+        text = '東京都に行く'
+        self.assertEqual(self.trie.prefixes(text), ['東', '東京', '東京都'])
+        self.assertEqual(self.trie.prefixes(text, 1), ['京都'])
+        self.assertEqual(self.trie.prefixes(text, 2), ['都'])
+        self.assertEqual(self.trie.prefixes(text, 4), ['行く'])
+        self.assertEqual(self.trie.prefixes(text, 6), [])
+
+    def test_longest_prefix(self):
+        self.assertEqual(self.trie.longest_prefix('東京に'), '東京')
+        self.assertEqual(self.trie.longest_prefix('西京'), None)
+
+    def test_tokenize(self):
+        self.assertEqual(self.trie.tokenize('東京都に行く'),
+                         ['東京都', 'に', '行く'])
+        self.assertEqual(self.trie.tokenize('京都へ行く。'),
+                         ['京都', 'へ', '行く', '。'])
+        self.assertEqual(self.trie.tokenize(''), [])
+
+    def test_pickle(self):
+        trie = pickle.loads(pickle.dumps(self.trie))
+        self.assertEqual(trie.tokenize('東京都に行く'),
+                         ['東京都', 'に', '行く'])
+
+    def test_empty(self):
+        trie = DictionaryTrie([])
+        self.assertEqual(len(trie), 0)
+        self.assertEqual(trie.tokenize('東京'), ['東', '京'])
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
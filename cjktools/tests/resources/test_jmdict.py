@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+#
+#  test_jmdict.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from cjktools.resources import jmdict
+from cjktools.resources.auto_format import load_dictionary, detect_format
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(JMdictTestCase),
+    ))
+    return test_suite
+
+JMDICT_SAMPLE = \
+"""<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE JMdict [
+<!ELEMENT JMdict (entry*)>
+<!ENTITY n "noun (common) (futsuumeishi)">
+<!ENTITY adj-no "nouns which may take the genitive case particle `no'">
+<!ENTITY uk "word usually written using kana alone">
+<!ENTITY int "interjection (kandoushi)">
+]>
+<JMdict>
+<entry>
+<ent_seq>1000000</ent_seq>
+<r_ele>
+<reb>ああ</reb>
+<re_pri>spec1</re_pri>
+</r_ele>
+<sense>
+<pos>&int;</pos>
+<gloss>Ah!</gloss>
+<gloss>Oh!</gloss>
+<gloss xml:lang="ger">ach!</gloss>
+</sense>
+</entry>
+<entry>
+<ent_seq>1001000</ent_seq>
+<k_ele>
+<keb>虫歯</keb>
+<ke_pri>ichi1</ke_pri>
+</k_ele>
+<k_ele>
+<keb>齲歯</keb>
+</k_ele>
+<r_ele>
+<reb>むしば</reb>
+<re_pri>ichi1</re_pri>
+</r_ele>
+<r_ele>
+<reb>うし</reb>
+<re_restr>齲歯</re_restr>
+</r_ele>
+<sense>
+<pos>&n;</pos>
+<pos>&adj-no;</pos>
+<gloss>cavity</gloss>
+<gloss>tooth decay</gloss>
+</sense>
+<sense>
+<stagk>齲歯</stagk>
+<misc>&uk;</misc>
+<gloss>caries</gloss>
+<gloss xml:lang="ger">Karies</gloss>
+</sense>
+</entry>
+</JMdict>
+"""  # nopep8
+
+
+class JMdictTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def test_entries(self):
+        entries = list(jmdict.iter_entries(to_unicode_stream(JMDICT_SAMPLE)))
+        self.assertEqual([e.word for e in entries], ['ああ', '虫歯', '齲歯'])
+
+        ah, mushiba, ushi = entries
+        self.assertEqual(ah.readings, ['ああ'])
+        self.assertEqual(ah.senses, ['(int) Ah!', 'Oh!', '(P)'])
+
+        self.assertEqual(mushiba.readings, ['むしば'])
+        self.assertEqual(mushiba.senses,
+                         ['(n,adj-no) cavity', 'tooth decay', '(P)'])
+
+        # The second sense is restricted to 齲歯, whose first reading is
+        # still むしば.
+        self.assertEqual(ushi.readings, ['むしば'])
+        self.assertEqual(ushi.senses, ['(n,adj-no) (1) cavity', 'tooth decay',
+                                       '(2) (uk) caries', '(P)'])
+
+    def test_lang(self):
+        entries = list(jmdict.iter_entries(to_unicode_stream(JMDICT_SAMPLE),
+                                           lang='ger'))
+        self.assertEqual([(e.word, e.senses) for e in entries],
+                         [('ああ', ['(int) ach!', '(P)']),
+                          ('齲歯', ['(uk) Karies', '(P)'])])
+
+    def test_files(self):
+        filename = os.path.join(self.tmp_dir, 'JMdict_e')
+        with open(filename, 'wb') as ostream:
+            ostream.write(JMDICT_SAMPLE.encode('utf8'))
+
+        gz_filename = filename + '.gz'
+        with gzip.open(gz_filename, 'wb') as ostream:
+            ostream.write(JMDICT_SAMPLE.encode('utf8'))
+
+        expected = [e.word for e in
+                    jmdict.iter_entries(to_unicode_stream(JMDICT_SAMPLE))]
+        for f in (filename, gz_filename):
+            self.assertEqual([e.word for e in jmdict.iter_entries(f)],
+                             expected)
+
+    def test_load_dictionary(self):
+        header = JMDICT_SAMPLE.splitlines()[0]
+        self.assertEqual(detect_format(header).name, 'jmdict')
+
+        dictionary = load_dictionary(to_unicode_stream(JMDICT_SAMPLE))
+        self.assertEqual(sorted(dictionary), ['ああ', '虫歯', '齲歯'])
+        self.assertEqual(dictionary.words_by_reading('むしば'),
+                         ['虫歯', '齲歯'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
@@ -5,13 +5,18 @@
 
 from __future__ import unicode_literals
 
+import os
+import shutil
+import tempfile
 import unittest
+
 from cjktools.resources.kanjidic import Kanjidic
 
 
 def suite():
     test_suite = unittest.TestSuite((
-        unittest.makeSuite(KanjidicTestCase)
+        unittest.makeSuite(KanjidicTestCase),
+        unittest.makeSuite(KanjidicParallelTestCase),
     ))
     return test_suite
 
@@ -45,5 +50,33 @@ class KanjidicTestCase(unittest.TestCase):
         self.assertIn('こ', self.kd[key].all_readings)
 
 
+SAMPLE = \
+"""# KANJIDIC sample
+冊 3A7D U518a N50 B13 S5 G6 F1253 P4-5-1 Yce4 サツ サク ふみ {tome} {volume}
+悪 3028 U60aa N1775 B61 S11 G3 F530 P2-4-7 Ye4 アク オ わる.い {bad} {evil}
+粉 4A34 U7c89 N3492 B119 S10 G5 F1136 P1-6-4 Yfen3 フン デシメートル こ こな {flour}
+"""  # nopep8
+
+
+class KanjidicParallelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'kanjidic')
+        with open(self.filename, 'wb') as ostream:
+            ostream.write(SAMPLE.encode('utf8'))
+
+    def test_parallel_matches_serial(self):
+        serial = Kanjidic([self.filename])
+        parallel = Kanjidic([self.filename, self.filename], processes=2)
+
+        self.assertEqual(sorted(serial), sorted(parallel))
+        self.assertEqual(parallel['冊'].skip_code, (4, 5, 1))
+        self.assertEqual(parallel['悪'].frequency, 530)
+        self.assertIn('こ', parallel['粉'].all_readings)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
 if __name__ == "__main__":
     unittest.TextTestRunner(verbosity=1).run(suite())
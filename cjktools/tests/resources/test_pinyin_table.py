@@ -7,12 +7,20 @@
 from __future__ import unicode_literals
 
 import unittest
-from cjktools.resources import pinyin_table
+
+from six.moves import StringIO
+
+from cjktools.resources import pinyin_table, auto_format
+
+from .._common import to_string_stream
 
 
 def suite():
     test_suite = unittest.TestSuite((
-        unittest.makeSuite(PinyinTableTestCase)
+        unittest.makeSuite(PinyinTableTestCase),
+        unittest.makeSuite(PinyinSegmenterTestCase),
+        unittest.makeSuite(PinyinTableSampleTestCase),
+        unittest.makeSuite(PhrasePinyinTableTestCase),
     ))
     return test_suite
 
@@ -96,5 +104,147 @@ class PinyinTableTestCase(unittest.TestCase):
         pass
 
 
+SYLLABLES = ('an bu cheng da dai de den er feng ge hang jin liu lü ni niu qi '
+             'sha shang wang wei wo xi xian xing xu xue yi yin zhe zou '
+             'lu').split()
+
+HANZI_SAMPLE = \
+"""# hanzi to pinyin
+一 yi1 yi2
+代 dai4
+风 feng1
+流 liu2
+行 xing2 hang2
+银 yin2
+走 zou3
+"""  # nopep8
+
+CEDICT_SAMPLE = \
+"""# CEDICT sample
+銀行 银行 [yin2 hang2] /bank/
+行走 行走 [xing2 zou3] /to walk/
+行 行 [xing2] /to walk/
+行 行 [hang2] /row/
+一代 一代 [yi1 dai4] /generation/
+綠 绿 [lu:4] /green/
+大興 大兴 [Da4 xing1] /Daxing district of Beijing/
+"""  # nopep8
+
+
+def syllable_table():
+    return to_string_stream('\n'.join('X %s' % p for p in SYLLABLES))
+
+
+class PinyinSegmenterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.segmenter = pinyin_table.PinyinSegmenter(syllable_table())
+        self.regex_segmenter = pinyin_table.RegexPinyinSegmenter(
+            syllable_table()
+        )
+
+    def test_matches_regex_segmenter(self):
+        for pinyin in ['woshangdaxue', 'wo1shang2da3xue4',
+                       'cheng2zhewei2wang2', 'yi1ge4jin4r', 'yi1lv4xu',
+                       'shangqi3bu4', 'deniu2', "xi'an", 'xian1', 'Da6x#u',
+                       'hello world', '']:
+            self.assertEqual(self.segmenter.segment_pinyin(pinyin),
+                             self.regex_segmenter.segment_pinyin(pinyin))
+
+            for start in range(len(pinyin)):
+                self.assertEqual(
+                    self.segmenter.is_pinyin(pinyin[start:]),
+                    self.regex_segmenter.is_pinyin(pinyin[start:]),
+                )
+
+    def test_scored_segmentation(self):
+        fewest = lambda pinyin, tone: -1
+        most = lambda pinyin, tone: 1
+
+        self.assertEqual(self.segmenter.segment_pinyin('xian1', fewest),
+                         (('xian', 1),))
+        self.assertEqual(self.segmenter.segment_pinyin('xian1', most),
+                         (('xi', 0), ('an', 1)))
+        self.assertEqual(self.segmenter.segment_pinyin("xi'an", fewest),
+                         (('xi', 0), ('an', 0)))
+
+    def test_scored_garden_path(self):
+        self.assertEqual(
+            self.segmenter.segment_pinyin('deniu2', lambda p, t: 0),
+            (('de', 0), ('niu', 2))
+        )
+
+
+class PinyinTableSampleTestCase(unittest.TestCase):
+    def setUp(self):
+        segmenter = pinyin_table.PinyinSegmenter(syllable_table())
+        self.table = pinyin_table.PinyinTable(StringIO(HANZI_SAMPLE),
+                                              segmenter=segmenter)
+
+    def test_from_hanzi(self):
+        self.assertEqual(self.table['一'], ('yi1', 'yi2'))
+        self.assertEqual(self.table.from_hanzi('一代风流'), 'yīdàifēnglíu')
+        self.assertEqual(self.table.from_hanzi('一代风流', inline=False),
+                         'yi1dai4feng1liu2')
+        self.assertEqual(self.table.from_hanzi('一代风流', use_tones=False),
+                         'yidaifengliu')
+
+    def test_from_hanzi_unknown(self):
+        # Characters missing from the table are treated as ascii pinyin.
+        self.assertEqual(self.table.from_hanzi('一，代x'), 'yīdài')
+        self.assertEqual(self.table.from_hanzi('一，', inline=False), 'yi1，')
+
+    def test_from_hanzi_many(self):
+        self.assertEqual(self.table.from_hanzi_many(['一代', '风流']),
+                         ['yīdài', 'fēnglíu'])
+        self.assertEqual(
+            self.table.from_hanzi_many(['一代', '风流'], use_tones=False),
+            ['yidai', 'fengliu']
+        )
+
+
+class PhrasePinyinTableTestCase(unittest.TestCase):
+    def setUp(self):
+        segmenter = pinyin_table.PinyinSegmenter(syllable_table())
+        table = pinyin_table.PinyinTable(StringIO(HANZI_SAMPLE),
+                                         segmenter=segmenter)
+        cedict = auto_format.load_dictionary(StringIO(CEDICT_SAMPLE))
+        self.phrases = pinyin_table.PhrasePinyinTable(cedict,
+                                                      pinyin_table=table)
+
+    def test_polyphones(self):
+        self.assertEqual(self.phrases.pinyin_table.from_hanzi('银行'),
+                         'yínxíng')
+        self.assertEqual(self.phrases.from_hanzi('银行'), 'yínháng')
+        self.assertEqual(self.phrases.from_hanzi('行走'), 'xíngzǒu')
+        self.assertEqual(self.phrases.from_hanzi('银行行走'),
+                         'yínhángxíngzǒu')
+
+    def test_fallback(self):
+        self.assertEqual(self.phrases.from_hanzi('风银行流'),
+                         'fēngyínhánglíu')
+        self.assertEqual(self.phrases.from_hanzi('行'), 'xíng')
+        self.assertEqual(self.phrases.from_hanzi('一代风'), 'yīdàifēng')
+        self.assertEqual(self.phrases.from_hanzi(''), '')
+
+    def test_options(self):
+        self.assertEqual(self.phrases.from_hanzi('风银行', inline=False),
+                         'feng1yin2hang2')
+        self.assertEqual(self.phrases.from_hanzi('风银行', use_tones=False),
+                         'fengyinhang')
+        self.assertEqual(
+            self.phrases.from_hanzi_many(['银行', '行走'], use_tones=False),
+            ['yinhang', 'xingzou']
+        )
+
+    def test_proper_nouns(self):
+        # CEDICT capitalises the readings of proper nouns, but the output
+        # should not depend on which word matched.
+        self.assertEqual(self.phrases.from_hanzi('大兴', inline=False),
+                         'da4xing1')
+        self.assertEqual(self.phrases.from_hanzi('大兴'), 'dàxīng')
+        self.assertEqual(self.phrases.from_hanzi('大兴', use_tones=False),
+                         'daxing')
+
+
 if __name__ == "__main__":
     unittest.TextTestRunner(verbosity=1).run(suite())
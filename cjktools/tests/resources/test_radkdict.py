@@ -4,15 +4,22 @@
 #  cjktools
 #
 
+import os
+import shutil
+import tempfile
 import unittest
 from six.moves import StringIO
+from six import text_type
 
-from cjktools.resources.radkdict import RadkDict
+from cjktools.resources.radkdict import RadkDict, RadicalIndex
+from cjktools.resources.radkdict import CompiledRadkDict
 
 
 def suite():
     test_suite = unittest.TestSuite((
-        unittest.makeSuite(RadkdictTestCase)
+        unittest.makeSuite(RadkdictTestCase),
+        unittest.makeSuite(RadicalIndexTestCase),
+        unittest.makeSuite(CompiledRadkDictTestCase),
     ))
     return test_suite
 
@@ -44,6 +51,29 @@ class RadkdictTestCase(unittest.TestCase):
                                  u'冊'])
         self.assertEqual(radicals, expected_radicals)
 
+    def test_parallel_parse(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'radkfile')
+            with open(filename, 'wb') as ostream:
+                if isinstance(SAMPLE, text_type):
+                    ostream.write(SAMPLE.encode('utf8'))
+                else:
+                    ostream.write(SAMPLE)
+
+            serial = RadkDict(StringIO(SAMPLE))
+            rkd = RadkDict(filename, processes=2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual(set(rkd[u'偏']), set(serial[u'偏']))
+        self.assertEqual(rkd.radical_to_stroke_count,
+                         serial.radical_to_stroke_count)
+
+    def test_parallel_parse_needs_filename(self):
+        with self.assertRaises(ValueError):
+            RadkDict(StringIO(SAMPLE), processes=2)
+
     def test_get_cached(self):
         rd = RadkDict.get_cached()
 
@@ -53,5 +83,93 @@ class RadkdictTestCase(unittest.TestCase):
         self.assertIs(rd, rd2)
 
 
+INDEX_SAMPLE = \
+"""
+$ 一 1
+偏言
+$ 口 3
+言語右
+$ 二 2
+言語
+$ 尸 3
+偏
+"""  # nopep8
+
+
+class RadicalIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        stroke_counts = {u'偏': 11, u'言': 7, u'語': 14, u'右': 5}
+        self.index = RadicalIndex(RadkDict(StringIO(INDEX_SAMPLE)),
+                                  kanji_stroke_count=stroke_counts)
+
+    def test_single_radical(self):
+        kanji, radicals = self.index.search([u'口'])
+        self.assertEqual(kanji, (u'右', u'言', u'語'))
+        self.assertEqual(radicals, (u'一', u'二'))
+
+    def test_multiple_radicals(self):
+        kanji, radicals = self.index.search([u'口', u'一'])
+        self.assertEqual(kanji, (u'言',))
+        self.assertEqual(radicals, (u'二',))
+
+    def test_repeated_radicals(self):
+        self.assertEqual(self.index.search([u'口', u'口']),
+                         self.index.search([u'口']))
+        self.assertEqual(self.index.search([u'口', u'一', u'口']),
+                         ((u'言',), (u'二',)))
+
+    def test_no_radicals(self):
+        kanji, radicals = self.index.search([])
+        self.assertEqual(kanji, (u'右', u'言', u'偏', u'語'))
+        self.assertEqual(radicals, self.index.radicals)
+
+    def test_no_match(self):
+        self.assertEqual(self.index.search([u'口', u'尸']), ((), ()))
+        self.assertEqual(self.index.search([u'木']), ((), ()))
+
+
+class CompiledRadkDictTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.filename = os.path.join(self.tmp_dir, 'radkfile.bin')
+        self.rkd = RadkDict(StringIO(INDEX_SAMPLE))
+        self.rkd.compile(self.filename)
+        self.compiled = CompiledRadkDict(self.filename)
+
+    def test_kanji_to_radicals(self):
+        self.assertEqual(len(self.compiled), len(self.rkd))
+        for kanji, radicals in self.rkd.items():
+            self.assertIn(kanji, self.compiled)
+            self.assertEqual(self.compiled[kanji], radicals)
+
+        self.assertNotIn(u'木', self.compiled)
+        with self.assertRaises(KeyError):
+            self.compiled[u'木']
+
+    def test_radical_to_kanji(self):
+        self.assertEqual(self.compiled.radical_to_stroke_count,
+                         self.rkd.radical_to_stroke_count)
+        for radical, kanji in self.rkd.radical_to_kanji.items():
+            if radical is not None:
+                self.assertEqual(self.compiled.radical_to_kanji[radical],
+                                 tuple(kanji))
+
+    def test_radical_index(self):
+        stroke_counts = {u'偏': 11, u'言': 7, u'語': 14, u'右': 5}
+        index = RadicalIndex(self.compiled, kanji_stroke_count=stroke_counts)
+        self.assertEqual(index.search([u'口', u'一']), ((u'言',), (u'二',)))
+
+    def test_invalid_file(self):
+        filename = os.path.join(self.tmp_dir, 'invalid.bin')
+        with open(filename, 'wb') as ostream:
+            ostream.write(b'\0' * 64)
+
+        with self.assertRaises(ValueError):
+            CompiledRadkDict(filename)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
 if __name__ == "__main__":
     unittest.TextTestRunner(verbosity=1).run(suite())
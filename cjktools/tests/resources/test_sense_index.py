@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+#
+#  test_sense_index.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cjktools.resources.auto_format import iter_entries
+from cjktools.resources.sense_index import SenseIndex, tokenize
+
+from .._common import to_unicode_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(SenseIndexTestCase),
+    ))
+    return test_suite
+
+EDICT_SAMPLE = \
+"""　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English Electronic Dictionary Files/
+齧歯目 [げっしもく] /(n) (1) Rodentia/(adj-no) (2) rat-like/rodential/
+齲歯 [うし] /(n,adj-no) cavity/tooth decay/decayed tooth/caries/
+歯 [は] /(n) tooth/teeth/
+虫 [むし] /(n) insect/bug/
+虫歯 [むしば] /(n) cavity/tooth decay/
+"""  # nopep8
+
+
+class SenseIndexTestCase(unittest.TestCase):
+    def setUp(self):
+        self.index = SenseIndex(iter_entries(to_unicode_stream(EDICT_SAMPLE)))
+
+    def _words(self, *args, **kwargs):
+        return [word for (word, score) in self.index.search(*args, **kwargs)]
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize('(n,adj-no) Cavity'), ['cavity'])
+        self.assertEqual(tokenize('(adj-no) (2) rat-like'), ['rat', 'like'])
+        self.assertEqual(tokenize('(of a car) wheel'),
+                         ['of', 'a', 'car', 'wheel'])
+
+    def test_and(self):
+        self.assertEqual(len(self.index), 13)
+        self.assertEqual(sorted(self._words('tooth')),
+                         ['歯', '虫歯', '齲歯'])
+        self.assertEqual(sorted(self._words('tooth decay')),
+                         ['虫歯', '齲歯'])
+        self.assertEqual(self._words('tooth insect'), [])
+        self.assertEqual(self._words('unknown'), [])
+        self.assertEqual(self._words(''), [])
+
+    def test_or(self):
+        self.assertEqual(sorted(self._words('insect cavity', operator='or')),
+                         ['虫', '虫歯', '齲歯'])
+        with self.assertRaises(ValueError):
+            self.index.search('tooth', operator='xor')
+
+    def test_phrase(self):
+        self.assertEqual(sorted(self._words('"tooth decay"')),
+                         ['虫歯', '齲歯'])
+        self.assertEqual(self._words('"decay tooth"'), [])
+        self.assertEqual(self._words('"decayed tooth"'), ['齲歯'])
+
+    def test_ranking(self):
+        # A rarer term scores higher than a common one.
+        results = self.index.search('tooth insect', operator='or')
+        self.assertEqual(results[0][0], '虫')
+        self.assertEqual(len(self.index.search('tooth', limit=2)), 2)
+
+    def test_save(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(tmp_dir, 'senses.idx')
+            self.index.save(filename)
+            loaded = SenseIndex.load(filename)
+            self.assertEqual(loaded.search('tooth decay'),
+                             self.index.search('tooth decay'))
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
@@ -5,16 +5,27 @@
 #
 from __future__ import unicode_literals
 
+import os
+import shutil
+import tempfile
 import unittest
 
-from cjktools.resources.split_by_codes import load_coded_dictionary
+from cjktools.common import sopen
+from cjktools.resources.auto_format import load_dictionary, detect_format
+from cjktools.resources.bilingual_dict import CompactDictionaryEntry
+from cjktools.resources.split_by_codes import (load_coded_dictionary,
+                                               split_dictionary, get_codes,
+                                               get_code_filename,
+                                               _known_codes)
 
 from .._common import to_unicode_stream
 
 
 def suite():
     test_suite = unittest.TestSuite((
-        unittest.makeSuite(SplitByCodesTestCase)
+        unittest.makeSuite(SplitByCodesTestCase),
+        unittest.makeSuite(SplitDictionaryTestCase),
+        unittest.makeSuite(EntryCodesTestCase),
     ))
     return test_suite
 
@@ -57,5 +68,109 @@ class SplitByCodesTestCase(unittest.TestCase):
         self.assertEqual(subarashii.readings[-1], 'すんばらしい')
 
 
+class EntryCodesTestCase(unittest.TestCase):
+    def setUp(self):
+        self.fmt = detect_format(EDICT_SAMPLE.splitlines()[0])
+
+    def test_get_codes(self):
+        self.assertEqual(get_codes('(v5k,vt) (1) to write'),
+                         set(['v5k', 'vt']))
+        self.assertEqual(get_codes('(n,foo) (uk) thing (Bob)'),
+                         set(['n', 'uk']))
+        self.assertEqual(get_codes('(n, uk) thing'), set())
+        self.assertEqual(get_codes('no codes'), set())
+
+    def test_entry_codes(self):
+        entry = self.fmt.parse_line('書く [かく] /(v5k,vt) to write/(P)/')
+        self.assertEqual(entry.codes, frozenset(['v5k', 'vt']))
+
+        other = self.fmt.parse_line('描く [かく] /(vt,v5k) to draw/')
+        self.assertIs(other.codes, entry.codes)
+
+    def test_merged_codes(self):
+        entry = self.fmt.parse_line('齲歯 [うし] /(n) cavity/')
+        entry.codes
+        entry.update(self.fmt.parse_line('齲歯 [むしば] /(adj-no) caries/'))
+        self.assertEqual(entry.codes, frozenset(['n', 'adj-no']))
+
+        entry.update(self.fmt.parse_line('齲歯 [むしば] /(uk) cavity/'))
+        self.assertEqual(entry.codes, frozenset(['n', 'adj-no', 'uk']))
+
+    def test_compact_codes(self):
+        entry = CompactDictionaryEntry('書く', ['かく'],
+                                       ['(v5k,vt) to write', '(P)'])
+        self.assertEqual(entry.codes, frozenset(['v5k', 'vt']))
+
+        entry.senses = ['(n) writing']
+        self.assertEqual(entry.codes, frozenset(['n']))
+
+
+class SplitDictionaryTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def test_split(self):
+        counts = split_dictionary(to_unicode_stream(EDICT_SAMPLE),
+                                  self.tmp_dir)
+        self.assertEqual(counts, {'adj-i': 2})
+        self.assertEqual(os.listdir(self.tmp_dir), ['adj-i'])
+
+        with sopen(os.path.join(self.tmp_dir, 'adj-i'), 'r') as istream:
+            self.assertEqual(istream.read(), EDICT_SAMPLE)
+
+    def test_split_compressed(self):
+        filename = os.path.join(self.tmp_dir, 'enamdict.gz')
+        with sopen(filename, 'w') as ostream:
+            ostream.write(ENAMDICT_SAMPLE)
+
+        output_dir = os.path.join(self.tmp_dir, 'split')
+        os.mkdir(output_dir)
+        counts = split_dictionary(filename, output_dir, suffix='.gz')
+        self.assertEqual(counts, {'p': 2})
+
+        with sopen(os.path.join(output_dir, 'p.gz'), 'r') as istream:
+            dictionary = load_dictionary(istream)
+        self.assertEqual(len(dictionary['秋葉橋'].senses), 2)
+
+    def test_split_parallel(self):
+        lines = EDICT_SAMPLE.splitlines(True)
+        sample = lines[0] + ''.join(lines[1:] * 50)
+
+        counts = split_dictionary(to_unicode_stream(sample), self.tmp_dir,
+                                  processes=2, chunk_size=7)
+        self.assertEqual(counts, {'adj-i': 100})
+
+        with sopen(os.path.join(self.tmp_dir, 'adj-i'), 'r') as istream:
+            self.assertEqual(istream.read(), sample)
+
+    def test_split_case(self):
+        sample = ('　？？？ /EDICT, EDICT_SUB(P), EDICT2 Japanese-English '
+                  'Electronic Dictionary Files/\n'
+                  '齲歯 [むしば] /(n,uk) tooth decay/\n'
+                  '嗚呼 [ああ] /(int,uK) ah!/\n')
+        counts = split_dictionary(to_unicode_stream(sample), self.tmp_dir)
+        self.assertEqual(counts, {'n': 1, 'uk': 1, 'int': 1, 'uK': 1})
+
+        filenames = os.listdir(self.tmp_dir)
+        self.assertEqual(sorted(filenames), ['int', 'n', 'u_k', 'uk'])
+        self.assertEqual(len(set(f.lower() for f in filenames)), 4)
+
+        for code, word in (('uk', '齲歯'), ('uK', '嗚呼')):
+            filename = os.path.join(self.tmp_dir, get_code_filename(code))
+            with sopen(filename, 'r') as istream:
+                self.assertEqual(list(load_dictionary(istream)), [word])
+
+    def test_code_filenames(self):
+        self.assertEqual(get_code_filename('adj-no'), 'adj-no')
+        self.assertEqual(get_code_filename('MA'), '_m_a')
+        self.assertEqual(get_code_filename('Buddh'), '_buddh')
+        filenames = [get_code_filename(c) for c in _known_codes]
+        self.assertEqual(len(set(f.lower() for f in filenames)),
+                         len(_known_codes))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
 if __name__ == "__main__":
     unittest.TextTestRunner(verbosity=1).run(suite())
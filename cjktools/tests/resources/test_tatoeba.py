@@ -7,6 +7,8 @@
 from __future__ import unicode_literals
 
 import os
+import shutil
+import tempfile
 from .._common import to_unicode_stream, to_string_stream
 import unittest
 
@@ -164,6 +166,12 @@ class TatoebaSentenceReaderTest(ReaderBaseCase):
         with self.assertRaises(tatoeba.InvalidIDError):
             sr.language(193)
 
+    def test_language_sets(self):
+        sr = self.load_file(languages={'fra', 'pol', 'rus'})
+
+        self.assertEqual(sr._language_dict,
+                         {'fra': {6381}, 'pol': {508870}, 'rus': {2172488}})
+
     def test_sentence(self):
         sr = self.load_file()
 
@@ -247,10 +255,177 @@ class TatoebaSentenceReaderMiscTests(unittest.TestCase):
             sr = tatoeba.TatoebaSentenceReader(invalid)
 
 
+class TatoebaSentenceReaderQuotingTest(unittest.TestCase):
+    """
+    Tatoeba files are not quoted, so every reader must keep quotation marks
+    as part of the text.
+    """
+    rows = ('1\teng\t"Hi," he said.\n'
+            '2\teng\tShe said "no".\n'
+            '3\tfra\t"Salut\n'
+            '4\teng\tHello."\n'
+            '5\teng\t"\n')
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.fpath = os.path.join(self.tmp_dir, 'sentences.csv')
+        with open(self.fpath, 'wb') as ostream:
+            ostream.write(self.rows.encode('utf-8'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def test_identical_modes(self):
+        readers = [
+            tatoeba.TatoebaSentenceReader(self.fpath),
+            tatoeba.TatoebaSentenceReader(self.fpath, compact=True),
+            tatoeba.TatoebaLazySentenceReader(self.fpath),
+        ]
+
+        expected = {1: '"Hi," he said.', 2: 'She said "no".', 3: '"Salut',
+                    4: 'Hello."', 5: '"'}
+        for sr in readers:
+            self.assertEqual(dict(sr), expected)
+            self.assertEqual([sr.language(i) for i in sorted(sr)],
+                             ['eng', 'eng', 'fra', 'eng', 'eng'])
+
+
 class TatoebaSentenceReaderFObjTest(FileObjReaderMixin,
                                     TatoebaSentenceReaderTest):
     pass
 
+
+class CompactReaderMixin(object):
+    """
+    Mixin to run the existing tests with the sentences stored compactly.
+    """
+    def load_file(self, resource=None, **kwargs):
+        return super(CompactReaderMixin, self).load_file(resource,
+                                                         compact=True,
+                                                         **kwargs)
+
+
+class TatoebaSentenceReaderCompactTest(CompactReaderMixin,
+                                       TatoebaSentenceReaderTest):
+    def test_unsorted(self):
+        rows = ('30\tjpn\t三十\n'
+                '10\teng\tten\n'
+                '20\tfra\tvingt\n'
+                '10\teng\tTen\n')
+        sr = tatoeba.TatoebaSentenceReader(to_string_stream(rows),
+                                           compact=True)
+
+        self.assertEqual(list(sr), [10, 20, 30])
+        self.assertEqual([sr[i] for i in sr], ['Ten', 'vingt', '三十'])
+        self.assertEqual([sr.language(i) for i in sr], ['eng', 'fra', 'jpn'])
+
+    def test_non_integer_key(self):
+        sr = self.load_file()
+
+        self.assertNotIn('6381', sr)
+        with self.assertRaises(tatoeba.InvalidIDError):
+            sr.sentence('6381')
+
+
+class TatoebaSentenceReaderDetailedCompactTest(
+        CompactReaderMixin, TatoebaSentenceReaderDetailedTest):
+    pass
+
+
+class LazyReaderMixin(object):
+    """
+    Mixin to run the existing tests with the sentences read lazily, from a
+    copy of the sample file so that its index is written elsewhere.
+    """
+    ReaderClass = tatoeba.TatoebaLazySentenceReader
+
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        shutil.copy(get_data_loc(self._resource_name), self.tmp_dir)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+    def resource_fpath(self):
+        return os.path.join(self.tmp_dir,
+                            os.path.basename(get_data_loc(self._resource_name)))
+
+    @unittest.skip('rows are only parsed when accessed')
+    def test_custom_filter_row(self):
+        pass
+
+    def test_repr(self):
+        sr = self.load_file()
+
+        expected_fmt = "TatoebaLazySentenceReader(sentences='{}')"
+        expected = expected_fmt.format(self.resource_fpath())
+
+        self.assertEqual(repr(sr), expected)
+
+    def test_non_integer_key(self):
+        sr = self.load_file()
+
+        self.assertNotIn('6381', sr)
+        with self.assertRaises(tatoeba.InvalidIDError):
+            sr.sentence('6381')
+
+
+class TatoebaSentenceReaderLazyTest(LazyReaderMixin,
+                                    TatoebaSentenceReaderTest):
+    def test_index_file(self):
+        fpath = self.resource_fpath()
+        index_file = fpath + '.idx'
+
+        self.load_file()
+        self.assertTrue(os.path.exists(index_file))
+        mtime = os.path.getmtime(index_file)
+
+        # The index is reused while the file is unchanged...
+        sr = self.load_file()
+        self.assertEqual(os.path.getmtime(index_file), mtime)
+        self.assertNotIn(3, sr)
+
+        # ...and rebuilt once it changes.
+        with open(fpath, 'ab') as ostream:
+            ostream.write('3\tfra\tTrois\n'.encode('utf-8'))
+
+        sr = self.load_file()
+        self.assertEqual(sr[3], 'Trois')
+        self.assertEqual(sr.language(3), 'fra')
+
+    def test_custom_index_file(self):
+        index_file = os.path.join(self.tmp_dir, 'sentences.idx')
+        sr = self.load_file(index_file=index_file)
+
+        self.assertTrue(os.path.exists(index_file))
+        self.assertFalse(os.path.exists(self.resource_fpath() + '.idx'))
+        self.assertEqual(sr.language(29390), 'eng')
+
+    def test_unsorted(self):
+        fpath = os.path.join(self.tmp_dir, 'unsorted.csv')
+        with open(fpath, 'wb') as ostream:
+            ostream.write('30\tjpn\t三十\r\n'
+                          '10\teng\tten\r\n'
+                          '20\tfra\tvingt\r\n'
+                          '10\teng\tTen'.encode('utf-8'))
+
+        sr = tatoeba.TatoebaLazySentenceReader(fpath)
+
+        self.assertEqual(list(sr), [10, 20, 30])
+        self.assertEqual([sr[i] for i in sr], ['Ten', 'vingt', '三十'])
+        self.assertEqual([sr.language(i) for i in sr], ['eng', 'fra', 'jpn'])
+
+    def test_file_object(self):
+        with open(self.resource_fpath()) as istream:
+            with self.assertRaises(ValueError):
+                tatoeba.TatoebaLazySentenceReader(istream)
+
+
+class TatoebaSentenceReaderDetailedLazyTest(
+        LazyReaderMixin, TatoebaSentenceReaderDetailedTest):
+    pass
+
+
 class TatoebaSentenceReaderDetailedFObjTest(FileObjReaderMixin,
                                             TatoebaSentenceReaderDetailedTest):
     pass
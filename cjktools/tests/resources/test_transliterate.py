@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+#
+#  test_transliterate.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from six.moves import StringIO
+
+from cjktools.common import sopen
+from cjktools.resources import pinyin_table, zhuyin_table
+from cjktools.resources.transliterate import (Transliterator,
+                                              transliterate_lines,
+                                              transliterate_file)
+
+from .._common import to_string_stream
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(TransliterateTestCase)
+    ))
+    return test_suite
+
+
+ZHUYIN_SAMPLE = \
+"""ㄧ yi
+ㄉㄞ dai
+ㄈㄥ feng
+ㄌㄧㄡ liu
+"""  # nopep8
+
+HANZI_SAMPLE = \
+"""一 yi1
+代 dai4
+风 feng1
+流 liu2
+"""  # nopep8
+
+
+class TransliterateTestCase(unittest.TestCase):
+    def setUp(self):
+        segmenter = pinyin_table.PinyinSegmenter(
+            to_string_stream(ZHUYIN_SAMPLE))
+        self.pinyin_table = pinyin_table.PinyinTable(StringIO(HANZI_SAMPLE),
+                                                     segmenter=segmenter)
+        self.zhuyin_table = zhuyin_table.ZhuyinTable(
+            to_string_stream(ZHUYIN_SAMPLE))
+
+    def transliterator(self, script, tones):
+        return Transliterator(script, tones, pinyin_table=self.pinyin_table,
+                              zhuyin_table=self.zhuyin_table)
+
+    def test_styles(self):
+        expected = [
+            ('pinyin', 'marks', 'yīdàifēnglíu'),
+            ('pinyin', 'numbers', 'yi1dai4feng1liu2'),
+            ('pinyin', 'none', 'yidaifengliu'),
+            ('zhuyin', 'marks', 'ㄧㄉㄞˋㄈㄥㄌㄧㄡˊ'),
+            ('zhuyin', 'none', 'ㄧㄉㄞㄈㄥㄌㄧㄡ'),
+        ]
+        for script, tones, result in expected:
+            self.assertEqual(self.transliterator(script, tones)('一代风流'),
+                             result)
+
+    def test_mixed_scripts(self):
+        # Only hanzi are converted; spaces, punctuation, Latin text and
+        # hanzi without a reading are passed through in every style.
+        line = '一代 iPhone, Obama 好流!'
+        expected = [
+            ('pinyin', 'marks', 'yīdài iPhone, Obama 好líu!'),
+            ('pinyin', 'numbers', 'yi1dai4 iPhone, Obama 好liu2!'),
+            ('pinyin', 'none', 'yidai iPhone, Obama 好liu!'),
+            ('zhuyin', 'marks', 'ㄧㄉㄞˋ iPhone, Obama 好ㄌㄧㄡˊ!'),
+            ('zhuyin', 'none', 'ㄧㄉㄞ iPhone, Obama 好ㄌㄧㄡ!'),
+        ]
+        for script, tones, result in expected:
+            self.assertEqual(self.transliterator(script, tones)(line), result)
+
+    def test_invalid_styles(self):
+        with self.assertRaises(ValueError):
+            self.transliterator('zhuyin', 'numbers')
+
+        with self.assertRaises(ValueError):
+            self.transliterator('romaji', 'marks')
+
+    def test_lines_keep_order(self):
+        lines = ['一代\n', '风流\n', '流\n', '\n', '一\n'] * 7
+        expected = ['yi1dai4', 'feng1liu2', 'liu2', '', 'yi1'] * 7
+        transliterator = self.transliterator('pinyin', 'numbers')
+        for processes in (1, 2):
+            self.assertEqual(
+                list(transliterate_lines(lines, transliterator,
+                                         processes=processes, chunk_size=3)),
+                expected
+            )
+
+    def test_file(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            input_file = os.path.join(tmp_dir, 'input.txt.gz')
+            output_file = os.path.join(tmp_dir, 'output.txt')
+            with sopen(input_file, 'w') as ostream:
+                ostream.write('一代\n风流\n')
+
+            n_lines = transliterate_file(
+                input_file, output_file,
+                self.transliterator('pinyin', 'marks'), processes=1,
+            )
+
+            with sopen(output_file, 'r') as istream:
+                output = istream.read()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+        self.assertEqual(n_lines, 2)
+        self.assertEqual(output, 'yīdài\nfēnglíu\n')
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
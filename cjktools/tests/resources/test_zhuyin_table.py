@@ -11,10 +11,13 @@ from six.moves import StringIO
 
 from cjktools.resources import zhuyin_table
 
+from .._common import to_string_stream
+
 
 def suite():
     test_suite = unittest.TestSuite((
-        unittest.makeSuite(ZhuyinTableTestCase)
+        unittest.makeSuite(ZhuyinTableTestCase),
+        unittest.makeSuite(ZhuyinTableObjectTestCase),
     ))
     return test_suite
 
@@ -48,5 +51,52 @@ class ZhuyinTableTestCase(unittest.TestCase):
         assert pattern.match(u'beijingdaxue')
 
 
+class ZhuyinTableObjectTestCase(unittest.TestCase):
+    def setUp(self):
+        data = u'\n'.join((u'ㄔㄚ cha',
+                           u'ㄅㄟ bei',
+                           u'ㄐㄧㄥ jing',
+                           u'ㄉㄚ da',
+                           u'ㄒㄩㄝ xue',
+                           u'ㄒㄧ xi',
+                           u'ㄢ an',
+                           u'ㄦ er'))
+        self.table = zhuyin_table.ZhuyinTable(to_string_stream(data))
+
+    def test_mappings(self):
+        self.assertEqual(self.table.zhuyin_to_pinyin[u'ㄔㄚ'], u'cha')
+        self.assertEqual(self.table.pinyin_to_zhuyin[u'cha'], u'ㄔㄚ')
+        self.assertEqual(self.table.all_pinyin[0], u'r')
+        self.assertIn(u'jing', self.table.all_pinyin)
+        self.assertIn(u'ㄐㄧㄥ', self.table.all_zhuyin)
+
+        zhuyin_pattern = re.compile(
+            r'^(%s)+$' % self.table.zhuyin_regex_pattern, re.UNICODE
+        )
+        assert zhuyin_pattern.match(u'ㄅㄟˇㄐㄧㄥ')
+        assert not zhuyin_pattern.match(u'beijing')
+
+    def test_to_zhuyin(self):
+        self.assertEqual(self.table.to_zhuyin(u'bei3jing1'), u'ㄅㄟˇㄐㄧㄥ')
+        self.assertEqual(self.table.to_zhuyin(u'Běijīng dàxué'),
+                         u'ㄅㄟˇㄐㄧㄥ ㄉㄚˋㄒㄩㄝˊ')
+        self.assertEqual(self.table.to_zhuyin(u"xi'an"), u'ㄒㄧㄢ')
+        self.assertEqual(self.table.to_zhuyin(u'da5r'), u'ㄉㄚ˙ㄦ')
+        self.assertEqual(self.table.to_zhuyin(u'北jing!'), u'北ㄐㄧㄥ!')
+
+    def test_to_pinyin(self):
+        self.assertEqual(self.table.to_pinyin(u'ㄅㄟˇㄐㄧㄥ'), u'běijīng')
+        self.assertEqual(self.table.to_pinyin(u'ㄅㄟˇㄐㄧㄥ', tone_marks=False),
+                         u'bei3jing1')
+        self.assertEqual(self.table.to_pinyin(u'˙ㄉㄚ ㄔㄚˋ', tone_marks=False),
+                         u'da5 cha4')
+
+    def test_round_trip(self):
+        pinyin = u'bei3jing1da4xue2'
+        zhuyin = self.table.to_zhuyin(pinyin)
+        self.assertEqual(self.table.to_pinyin(zhuyin, tone_marks=False),
+                         pinyin)
+
+
 if __name__ == "__main__":
     unittest.TextTestRunner(verbosity=1).run(suite())
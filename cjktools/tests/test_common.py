@@ -0,0 +1,60 @@
+# -*- coding: utf-8 -*-
+#
+#  test_common.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import bz2
+import gzip
+import shutil
+import tempfile
+import unittest
+
+from cjktools.common import sopen
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(SopenTestCase)
+    ))
+    return test_suite
+
+
+class SopenTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+
+    def test_same_encoding_when_compressed(self):
+        text = 'café 咖啡\n'
+        for encoding in ('utf8', 'utf-16', 'gb18030'):
+            data = text.encode(encoding)
+            filenames = []
+            for suffix, open_method in (('', open), ('.gz', gzip.open),
+                                        ('.bz2', bz2.BZ2File)):
+                filename = os.path.join(self.tmp_dir, 'sample' + suffix)
+                with open_method(filename, 'wb') as ostream:
+                    ostream.write(data)
+                filenames.append(filename)
+
+            for filename in filenames:
+                with sopen(filename, 'r', encoding=encoding) as istream:
+                    self.assertEqual(istream.read(), text)
+
+    def test_write(self):
+        for suffix in ('', '.gz', '.bz2'):
+            filename = os.path.join(self.tmp_dir, 'output' + suffix)
+            with sopen(filename, 'w', encoding='gb18030') as ostream:
+                ostream.write('咖啡\n')
+
+            with sopen(filename, 'rb', encoding=None) as istream:
+                self.assertEqual(istream.read(), '咖啡\n'.encode('gb18030'))
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+#
+#  test_packed.py
+#  cjktools
+#
+
+import mmap
+import struct
+import tempfile
+import unittest
+
+from cjktools import packed
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(PackedTestCase)
+    ))
+    return test_suite
+
+
+class PackedTestCase(unittest.TestCase):
+    def test_bits(self):
+        for ids in ([], [0], [3], [0, 1, 5, 64, 200]):
+            bits = packed.to_bits(ids)
+            self.assertEqual(bits, sum(1 << i for i in ids))
+            self.assertEqual(list(packed.iter_bits(bits)), ids)
+
+    def test_select_bits(self):
+        values = tuple(range(10, 20))
+        for ids in ([], [0], [3], [0, 1, 5, 9]):
+            bits = packed.to_bits(ids)
+            self.assertEqual(packed.select_bits(values, bits),
+                             tuple(values[i] for i in ids))
+
+    def test_array_view(self):
+        values = [7, 0, 2 ** 32 - 1]
+        buf = struct.pack('=H3I', 1, *values)
+
+        view, end = packed.array_view(buf, 2, 3, 'I')
+        self.assertEqual(list(view), values)
+        self.assertEqual(end, len(buf))
+
+        view, end = packed.array_view(buf, 2, 0, 'I')
+        self.assertEqual(list(view), [])
+        self.assertEqual(end, 2)
+
+    def test_array_view_mmap(self):
+        values = [7, 0, 2 ** 32 - 1]
+        with tempfile.TemporaryFile() as ostream:
+            ostream.write(struct.pack('=H3I', 1, *values))
+            ostream.flush()
+            buf = mmap.mmap(ostream.fileno(), 0, access=mmap.ACCESS_READ)
+            view, end = packed.array_view(buf, 2, 3, 'I')
+            self.assertEqual(list(view), values)
+            self.assertEqual(end, 14)
+
+            # A view must be released before its buffer can be closed.
+            del view
+            buf.close()
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
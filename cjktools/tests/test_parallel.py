@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+#  test_parallel.py
+#  cjktools
+#
+
+from __future__ import unicode_literals
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from cjktools import parallel
+
+
+def suite():
+    test_suite = unittest.TestSuite((
+        unittest.makeSuite(ParallelTestCase)
+    ))
+    return test_suite
+
+
+def _collect(line_stream):
+    return list(line_stream)
+
+
+def _tag_chunk(tag, chunk):
+    return [(tag, len(chunk), item) for item in chunk]
+
+
+class ParallelTestCase(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.lines = ['$ 一 1\n', '偏下\n', '$ ｜ 1\n', '偏中\n', '$ 口 3\n',
+                      '中右古\n', '言語\n']
+        self.filename = os.path.join(self.tmp_dir, 'sample')
+        with open(self.filename, 'wb') as ostream:
+            ostream.write(''.join(self.lines).encode('utf8'))
+
+    def test_split_file(self):
+        chunks = parallel.split_file(self.filename, 3)
+        self.assertEqual(chunks[0][0], 0)
+        self.assertIsNone(chunks[-1][1])
+
+        lines = []
+        for start, end in chunks:
+            lines.extend(parallel.iter_lines(self.filename, start, end))
+
+        self.assertEqual(lines, self.lines)
+
+    def test_split_file_boundary(self):
+        chunks = parallel.split_file(self.filename, 7, boundary=b'$')
+        self.assertGreater(len(chunks), 1)
+        for start, end in chunks:
+            first_line = next(parallel.iter_lines(self.filename, start, end))
+            self.assertTrue(first_line.startswith('$'))
+
+    def test_split_file_single_chunk(self):
+        self.assertEqual(parallel.split_file(self.filename, 1), [(0, None)])
+
+    def test_parse_files(self):
+        for processes in (1, 2):
+            partials = parallel.parse_files(_collect, [self.filename] * 2,
+                                            processes=processes,
+                                            chunks_per_file=3)
+            lines = [line for partial in partials for line in partial]
+            self.assertEqual(lines, self.lines * 2)
+
+    def test_iter_chunks(self):
+        self.assertEqual(list(parallel.iter_chunks(range(7), 3)),
+                         [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertEqual(list(parallel.iter_chunks([], 3)), [])
+
+    def test_map_chunks(self):
+        items = list(range(100))
+        expected = [('x', 7 if i < 98 else 2, i) for i in items]
+        for processes in (1, 2):
+            results = parallel.map_chunks(_tag_chunk, iter(items), 'x',
+                                          processes=processes, chunk_size=7)
+            self.assertEqual([r for result in results for r in result],
+                             expected)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir)
+
+
+if __name__ == "__main__":
+    unittest.TextTestRunner(verbosity=1).run(suite())
@@ -0,0 +1,888 @@
+#!/usr/bin/env python
+"""
+Benchmarks for the expensive parts of cjktools, run against the cjkdata pack.
+Run all of them, or just the named ones, with::
+
+    python -m scripts.benchmark [name ...]
+"""
+from __future__ import print_function
+
+import shutil
+import sys
+import tempfile
+import timeit
+
+BENCHMARKS = {}
+_TEMP_DIRS = []
+
+
+def benchmark(method):
+    """ Registers a benchmark under its function name. """
+    BENCHMARKS[method.__name__] = method
+    return method
+
+
+def temp_dir():
+    """
+    Makes a temporary directory, which is removed along with its contents
+    once the running benchmark finishes.
+    """
+    path = tempfile.mkdtemp(prefix='cjktools-benchmark-')
+    _TEMP_DIRS.append(path)
+    return path
+
+
+def remove_temp_dirs():
+    """ Removes the temporary directories made by the last benchmark. """
+    while _TEMP_DIRS:
+        shutil.rmtree(_TEMP_DIRS.pop(), ignore_errors=True)
+
+
+def report(label, method, repeat=3):
+    """ Prints the best of several timings of a method, and returns it. """
+    best = min(timeit.repeat(method, number=1, repeat=repeat))
+    print('  %-48s %9.4fs' % (label, best))
+    return best
+
+
+@benchmark
+def kanjidic():
+    """ Serial against process-parallel parsing of kanjidic and kanjd212. """
+    from cjktools.resources.kanjidic import Kanjidic
+
+    report('Kanjidic()', lambda: Kanjidic())
+    for processes in (2, 4, None):
+        report('Kanjidic(processes=%s)' % processes,
+               lambda: Kanjidic(processes=processes))
+
+
+@benchmark
+def radical_search():
+    """ Multi-radical kanji search with the RadkDict bitset index. """
+    from cjktools.resources.radkdict import RadkDict, RadicalIndex
+
+    radk_dict = RadkDict()
+    report('RadicalIndex()', lambda: RadicalIndex(radk_dict))
+    index = RadicalIndex(radk_dict)
+
+    for radicals in ([u'\u53e3'], [u'\u53e3', u'\u6728'], index.radicals[:3]):
+        n = 1000
+        total = timeit.timeit(lambda: index.search(radicals), number=n)
+        print('  %-48s %9.1fus' % ('search(%s)' % ' '.join(radicals),
+                                    1e6 * total / n))
+
+
+def synthetic_radkfile(n_radicals=250, n_kanji=13000, seed=0):
+    """
+    Returns the lines of a synthetic radkfile, in which each kanji has two
+    to eight radicals, and a few radicals are much commoner than the rest,
+    as in the real file.
+    """
+    import random
+    from six import unichr
+
+    rng = random.Random(seed)
+    radicals = [unichr(0x3400 + i) for i in range(n_radicals)]
+    weights = [1.0 / (i + 10) for i in range(n_radicals)]
+
+    radical_to_kanji = dict((r, []) for r in radicals)
+    for i in range(n_kanji):
+        kanji = unichr(0x4e00 + i)
+        n = rng.randint(2, 8)
+        for radical in set(weighted_sample(rng, radicals, weights, n)):
+            radical_to_kanji[radical].append(kanji)
+
+    lines = []
+    for i, radical in enumerate(radicals):
+        lines.append('$ %s %d\n' % (radical, 1 + i % 17))
+        kanji = radical_to_kanji[radical]
+        for j in range(0, len(kanji), 30):
+            lines.append(''.join(kanji[j:j + 30]) + '\n')
+
+    return lines
+
+
+def weighted_sample(rng, values, weights, n):
+    """ Picks n values at random, with replacement, by weight. """
+    import bisect
+
+    totals = []
+    total = 0.0
+    for weight in weights:
+        total += weight
+        totals.append(total)
+
+    return [values[bisect.bisect(totals, rng.random() * totals[-1])]
+            for _ in range(n)]
+
+
+@benchmark
+def radical_search_synthetic():
+    """ RadicalIndex.search over a synthetic 13k-kanji radkfile. """
+    from cjktools.resources.radkdict import RadkDict, RadicalIndex
+
+    radk_dict = RadkDict(synthetic_radkfile())
+    stroke_counts = dict((k, ord(k) % 23) for k in radk_dict)
+    report('RadicalIndex()',
+           lambda: RadicalIndex(radk_dict, kanji_stroke_count=stroke_counts))
+
+    common = sorted(radk_dict.radical_to_kanji,
+                    key=lambda r: -len(radk_dict.radical_to_kanji[r]))
+    queries = [[], common[:1], common[:2], common[:3], common[100:102]]
+    print('  %-48s %9s %9s' % ('', 'first', 'repeat'))
+    for radicals in queries:
+        # Searches may be cached, so time the first call on a fresh index
+        # separately from repeated calls.
+        index = RadicalIndex(radk_dict, kanji_stroke_count=stroke_counts)
+        first = timeit.timeit(lambda: index.search(radicals), number=1)
+        n = 1000
+        total = timeit.timeit(lambda: index.search(radicals), number=n)
+        kanji, remaining = index.search(radicals)
+        label = 'search(%d radicals): %d kanji, %d radicals' % (
+            len(radicals), len(kanji), len(remaining))
+        print('  %-48s %7.1fus %7.1fus' % (label, 1e6 * first,
+                                            1e6 * total / n))
+
+
+@benchmark
+def radkdict_load():
+    """ Parsing the radkfile against loading its compiled form. """
+    import os
+    from cjktools.resources.radkdict import RadkDict, CompiledRadkDict
+
+    filename = os.path.join(temp_dir(), 'radkfile.bin')
+    RadkDict().compile(filename)
+
+    report('RadkDict()', lambda: RadkDict())
+    report('CompiledRadkDict()', lambda: CompiledRadkDict(filename))
+
+    radk_dict = RadkDict()
+    compiled = CompiledRadkDict(filename)
+    for name, mapping in (('RadkDict', radk_dict),
+                          ('CompiledRadkDict', compiled)):
+        report('%s lookup of every kanji' % name,
+               lambda: [mapping[k] for k in radk_dict])
+
+
+@benchmark
+def pinyin_segmenter():
+    """ Trie against regex pinyin segmentation. """
+    from cjktools.resources.pinyin_table import (PinyinSegmenter,
+                                                 RegexPinyinSegmenter)
+
+    text = 'wo3shang4da4xue2cheng2zhewei2wang2yi1ge4jin4r' * 2000
+    for cls in (RegexPinyinSegmenter, PinyinSegmenter):
+        report('%s()' % cls.__name__, lambda: cls())
+        segmenter = cls()
+        report('%s.segment_pinyin()' % cls.__name__,
+               lambda: segmenter.segment_pinyin(text))
+
+    segmenter = PinyinSegmenter()
+    report('PinyinSegmenter.segment_pinyin(score=...)',
+           lambda: segmenter.segment_pinyin(text, lambda p, t: -1))
+
+
+@benchmark
+def pinyin_from_hanzi():
+    """ Hanzi to tone-marked pinyin, per character and precomputed. """
+    from six import unichr
+    from cjktools.resources.pinyin_table import PinyinTable
+
+    report('PinyinTable()', lambda: PinyinTable())
+    table = PinyinTable()
+
+    text = ''.join(unichr(c) for c in range(0x4e00, 0x4e00 + 5000)) * 4
+    lines = [text[i:i + 40] for i in range(0, len(text), 40)]
+
+    def per_character():
+        return ''.join(table.from_ascii(table.get(char, (char,))[0])
+                       for char in text)
+
+    report('per-character from_ascii', per_character)
+    report('from_hanzi()', lambda: table.from_hanzi(text))
+    report('from_hanzi_many() over %d lines' % len(lines),
+           lambda: table.from_hanzi_many(lines))
+
+
+@benchmark
+def pinyin_phrases():
+    """ Phrase-level hanzi to pinyin by CEDICT longest match. """
+    from six import unichr
+    from cjktools.resources.pinyin_table import (get_pinyin_table,
+                                                 get_phrase_pinyin_table)
+
+    table = get_pinyin_table()
+    report('get_phrase_pinyin_table()', get_phrase_pinyin_table, repeat=1)
+    phrases = get_phrase_pinyin_table()
+
+    text = ''.join(unichr(c) for c in range(0x4e00, 0x4e00 + 5000)) * 4
+    lines = [text[i:i + 40] for i in range(0, len(text), 40)]
+    report('PinyinTable.from_hanzi_many() over %d lines' % len(lines),
+           lambda: table.from_hanzi_many(lines))
+    seconds = report('PhrasePinyinTable.from_hanzi_many()',
+                     lambda: phrases.from_hanzi_many(lines))
+    print('  %-48s %9.0f' % ('characters per second', len(text) / seconds))
+
+
+@benchmark
+def zhuyin():
+    """ Zhuyin table lookups and whole-string conversion. """
+    from cjktools.resources import zhuyin_table
+
+    report('ZhuyinTable()', lambda: zhuyin_table.ZhuyinTable())
+    report('100 x pinyin_to_zhuyin_table()',
+           lambda: [zhuyin_table.pinyin_to_zhuyin_table()
+                    for i in range(100)])
+
+    table = zhuyin_table.ZhuyinTable.get_cached()
+    pinyin = 'bei3jing1da4xue2 shi4 yi1ge4 hao3 di4fang1. ' * 2000
+    report('to_zhuyin() of %d characters' % len(pinyin),
+           lambda: table.to_zhuyin(pinyin))
+    zhuyin = table.to_zhuyin(pinyin)
+    report('to_pinyin() of %d characters' % len(zhuyin),
+           lambda: table.to_pinyin(zhuyin))
+
+
+@benchmark
+def transliterate():
+    """ Whole-file hanzi to pinyin transliteration, in lines per second. """
+    import os
+    from six import unichr
+    from cjktools.common import sopen
+    from cjktools.resources.transliterate import transliterate_file
+
+    tmp_dir = temp_dir()
+    input_file = os.path.join(tmp_dir, 'corpus.txt')
+    output_file = os.path.join(tmp_dir, 'corpus.pinyin')
+
+    text = ''.join(unichr(c) for c in range(0x4e00, 0x4e00 + 5000))
+    n_lines = 200000
+    with sopen(input_file, 'w') as ostream:
+        for i in range(n_lines):
+            start = (i * 37) % 4960
+            ostream.write(text[start:start + 40] + '\n')
+
+    for processes in (1, 2, 4):
+        seconds = report('transliterate_file(processes=%d)' % processes,
+                         lambda: transliterate_file(input_file, output_file,
+                                                    processes=processes),
+                         repeat=1)
+        print('  %-48s %9.0f' % ('lines per second', n_lines / seconds))
+
+
+def synthetic_edict(n_lines=200000):
+    """
+    Writes a synthetic EDICT with the given number of entries to a temporary
+    file, and returns its filename. Every fourth headword is a homograph of
+    the one before.
+    """
+    import os
+    from six import unichr
+    from cjktools.common import sopen
+
+    filename = os.path.join(temp_dir(), 'edict')
+    with sopen(filename, 'w') as ostream:
+        ostream.write('\u3000\uff1f\uff1f\uff1f /EDICT synthetic/\n')
+        for i in range(n_lines):
+            n = i - 1 if i % 4 == 3 else i
+            word = unichr(0x4e00 + n % 20000) + unichr(0x4e00 + n // 20000)
+            reading = unichr(0x3041 + i % 83) + unichr(0x3041 + i // 83 % 83)
+            ostream.write('%s [%s] /(n) sense %d/gloss %d/%s\n' % (
+                word, reading, i, i, '(P)/' if i % 5 == 0 else ''))
+
+    return filename
+
+
+@benchmark
+def parse_dictionary():
+    """ Serial against process-parallel parsing of a 200k-line EDICT. """
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+
+    filename = synthetic_edict()
+
+    def parse(processes):
+        with sopen(filename, 'r') as istream:
+            return load_dictionary(istream, processes=processes)
+
+    for processes in (1, 2, 4, None):
+        report('load_dictionary(processes=%s)' % processes,
+               lambda: parse(processes), repeat=1)
+
+
+@benchmark
+def dict_store():
+    """ Parsing a 200k-line EDICT against opening its SQLite store. """
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources.dict_store import DictionaryStore, save_dictionary
+
+    filename = synthetic_edict()
+    with sopen(filename, 'r') as istream:
+        dictionary = load_dictionary(istream)
+
+    store_file = filename + '.sqlite'
+    report('save_dictionary()',
+           lambda: save_dictionary(dictionary, store_file), repeat=1)
+
+    def parse():
+        with sopen(filename, 'r') as istream:
+            return load_dictionary(istream)
+
+    report('load_dictionary()', parse, repeat=1)
+    report('DictionaryStore()', lambda: DictionaryStore(store_file))
+
+    words = list(dictionary)[::20]
+    store = DictionaryStore(store_file, cache_size=len(words))
+    report('%d lookups, cold' % len(words),
+           lambda: [store[w] for w in words], repeat=1)
+    report('%d lookups, cached' % len(words),
+           lambda: [store[w] for w in words])
+
+
+@benchmark
+def dict_trie():
+    """ Greedy tokenization by DictionaryTrie against probing a dict. """
+    import random
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources.dict_trie import DictionaryTrie
+
+    with sopen(synthetic_edict(), 'r') as istream:
+        dictionary = load_dictionary(istream)
+
+    # EDICT has some long expressions, which every probe has to allow for.
+    random.seed(0)
+    words = list(dictionary)
+    dictionary[''.join(words[:12])] = None
+
+    report('DictionaryTrie()', lambda: DictionaryTrie(dictionary), repeat=1)
+    trie = DictionaryTrie(dictionary)
+
+    text = ''.join(random.choice(words) for i in range(100000))
+    max_len = max(len(w) for w in dictionary)
+
+    def probe():
+        tokens = []
+        i = 0
+        while i < len(text):
+            for end in range(min(len(text), i + max_len), i, -1):
+                if text[i:end] in dictionary:
+                    break
+            tokens.append(text[i:end])
+            i = end
+        return tokens
+
+    report('probing the dictionary, %d characters' % len(text), probe)
+    report('DictionaryTrie.tokenize()', lambda: trie.tokenize(text))
+
+
+@benchmark
+def sense_index():
+    """ Reverse lookup by SenseIndex against scanning every sense. """
+    import os
+    import random
+    from cjktools.resources.bilingual_dict import DictionaryEntry
+    from cjktools.resources.sense_index import SenseIndex, tokenize
+
+    # A Zipf-like vocabulary, so that some terms are very common.
+    random.seed(0)
+    vocabulary = ['w%d' % i for i in range(20000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocabulary))]
+    n_entries = 170000
+    glosses = iter(random.choices(vocabulary, weights, k=n_entries * 8))
+    entries = [
+        DictionaryEntry('e%d' % i, ['r'],
+                        [' '.join(next(glosses) for j in range(4)),
+                         ' '.join(next(glosses) for j in range(4))])
+        for i in range(n_entries)
+    ]
+
+    report('SenseIndex() over %d entries' % n_entries,
+           lambda: SenseIndex(entries), repeat=1)
+    index = SenseIndex(entries)
+
+    filename = os.path.join(temp_dir(), 'senses.idx')
+    index.save(filename)
+    report('SenseIndex.load()', lambda: SenseIndex.load(filename), repeat=1)
+
+    def scan(terms):
+        return [e.word for e in entries
+                if any(all(t in tokenize(s) for t in terms)
+                       for s in e.senses)]
+
+    report('scanning for w1 w50', lambda: scan(['w1', 'w50']), repeat=1)
+    for query in ('w1 w50', 'w5000 w6000', '"w1 w2"'):
+        report('search(%s)' % query, lambda: index.search(query, limit=20))
+    report('search(w1 w50, or)',
+           lambda: index.search('w1 w50', operator='or', limit=20))
+
+
+@benchmark
+def alternation_index():
+    """ Rendaku- and onbin-tolerant lookup by a precomputed index. """
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources.alternation_index import (AlternationIndex,
+                                                      reading_segmentations)
+    from cjktools.alternations import canonical_forms
+
+    with sopen(synthetic_edict(), 'r') as istream:
+        dictionary = load_dictionary(istream)
+
+    report('AlternationIndex()', lambda: AlternationIndex(dictionary),
+           repeat=1)
+    index = AlternationIndex(dictionary)
+    print('  %-48s %9d' % ('variants', len(index)))
+
+    queries = [dictionary[w].readings[0] for w in list(dictionary)[::200]]
+
+    def search(query):
+        # Expand the query's canonical forms at query time instead.
+        forms = set([query])
+        for segments in reading_segmentations('\u4e00\u4e00', query):
+            forms.update(''.join(f) for f in canonical_forms(segments))
+        return [w for f in forms for w in dictionary.words_by_reading(f)]
+
+    report('%d query-time expansions' % len(queries),
+           lambda: [search(q) for q in queries])
+    report('%d index lookups' % len(queries),
+           lambda: [index.lookup(q) for q in queries])
+
+
+@benchmark
+def format_parsers():
+    """ Hand-written EDICT and CEDICT line parsers against their regexes. """
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import known_formats
+    from cjktools.resources.dict_format import RegexFormat
+
+    with sopen(synthetic_edict(), 'r') as istream:
+        edict_lines = list(istream)[1:]
+
+    # The same entries in CEDICT's layout.
+    cedict_lines = []
+    for i, line in enumerate(edict_lines):
+        word, rest = line.split(' ', 1)
+        senses = rest.split(' ', 1)[1]
+        cedict_lines.append('%s %s [ma%d shang%d] %s' % (
+            word, word, i % 5 + 1, i % 4 + 1, senses))
+
+    lines = {'edict': edict_lines, 'cedict': cedict_lines}
+    for fast_format in known_formats:
+        if fast_format.name not in lines:
+            continue
+
+        regex_format = RegexFormat(
+            fast_format.name,
+            fast_format.header_pattern.pattern,
+            fast_format.line_pattern.pattern,
+            fast_format.sense_pattern.pattern,
+        )
+        format_lines = lines[fast_format.name]
+        for f in (regex_format, fast_format):
+            seconds = report(
+                '%s %s' % (type(f).__name__, f.name),
+                lambda: [f.parse_line(line) for line in format_lines],
+            )
+            print('  %-48s %9.0f' % ('lines per second',
+                                     len(format_lines) / seconds))
+
+
+@benchmark
+def compact_entries():
+    """ Heap used by a 200k-line EDICT with plain and compact entries. """
+    import gc
+    import tracemalloc
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+
+    filename = synthetic_edict()
+    for compact in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        with sopen(filename, 'r') as istream:
+            dictionary = load_dictionary(istream, compact=compact)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        print('  %-48s %8.1fMB' % ('load_dictionary(compact=%s)' % compact,
+                                   size / 1e6))
+        del dictionary
+
+    report('load_dictionary(compact=False)',
+           lambda: load_dictionary(sopen(filename, 'r')), repeat=1)
+    report('load_dictionary(compact=True)',
+           lambda: load_dictionary(sopen(filename, 'r'), compact=True),
+           repeat=1)
+
+
+@benchmark
+def jmdict():
+    """ Streaming a 100k-entry gzipped JMdict, in time and peak heap. """
+    import os
+    import gzip
+    import tracemalloc
+    from six import unichr
+    from cjktools.resources import jmdict
+
+    n_entries = 100000
+    filename = os.path.join(temp_dir(), 'JMdict_e.gz')
+    with gzip.open(filename, 'wb') as ostream:
+        ostream.write(b'<?xml version="1.0" encoding="UTF-8"?>\n'
+                      b'<!DOCTYPE JMdict [\n'
+                      b'<!ENTITY n "noun (common) (futsuumeishi)">\n'
+                      b']>\n<JMdict>\n')
+        for i in range(n_entries):
+            word = unichr(0x4e00 + i % 20000) + unichr(0x4e00 + i // 20000)
+            reading = unichr(0x3041 + i % 83) + unichr(0x3041 + i // 83 % 83)
+            ostream.write(((
+                '<entry>\n<ent_seq>%d</ent_seq>\n'
+                '<k_ele>\n<keb>%s</keb>\n</k_ele>\n'
+                '<r_ele>\n<reb>%s</reb>\n</r_ele>\n'
+                '<sense>\n<pos>&n;</pos>\n<gloss>sense %d</gloss>\n'
+                '<gloss>gloss %d</gloss>\n</sense>\n</entry>\n'
+            ) % (i, word, reading, i, i)).encode('utf8'))
+        ostream.write(b'</JMdict>\n')
+
+    seconds = report('iter_entries(JMdict_e.gz)',
+                     lambda: sum(1 for e in jmdict.iter_entries(filename)),
+                     repeat=1)
+    print('  %-48s %9.0f' % ('entries per second', n_entries / seconds))
+
+    tracemalloc.start()
+    for entry in jmdict.iter_entries(filename):
+        pass
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print('  %-48s %8.1fMB' % ('peak heap while streaming', peak / 1e6))
+
+
+@benchmark
+def dict_diff():
+    """ Refreshing a 200k-line EDICT after 1% of its lines change. """
+    import os
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources.dict_diff import diff_files
+    from cjktools.resources.dict_store import save_dictionary
+
+    old_filename = synthetic_edict()
+    new_filename = os.path.join(os.path.dirname(old_filename), 'edict.new')
+    with sopen(old_filename, 'r') as istream:
+        with sopen(new_filename, 'w') as ostream:
+            for i, line in enumerate(istream):
+                if i % 100 == 1:
+                    line = line.replace('/gloss', '/revised gloss')
+                ostream.write(line)
+
+    def reload():
+        with sopen(new_filename, 'r') as istream:
+            return load_dictionary(istream)
+
+    report('load_dictionary(new)', reload, repeat=1)
+    report('diff_files(old, new)',
+           lambda: diff_files(old_filename, new_filename), repeat=1)
+
+    delta = diff_files(old_filename, new_filename)
+    with sopen(old_filename, 'r') as istream:
+        dictionary = load_dictionary(istream)
+    report('delta.apply(dictionary) (%d words)' % len(delta),
+           lambda: delta.apply(dictionary), repeat=1)
+
+    store_filename = old_filename + '.sqlite'
+    report('save_dictionary(new)',
+           lambda: save_dictionary(reload(), store_filename), repeat=1)
+    report('delta.apply_to_store()',
+           lambda: delta.apply_to_store(store_filename), repeat=1)
+
+
+@benchmark
+def merge_dictionaries():
+    """ Merging three 100k-entry dictionaries into a 200k-line EDICT. """
+    from six import unichr
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources.bilingual_dict import (BilingualDictionary,
+                                                   DictionaryEntry,
+                                                   ClashPolicy)
+
+    with sopen(synthetic_edict(), 'r') as istream:
+        base = load_dictionary(istream)
+
+    # Specialist dictionaries, each sharing a tenth of its headwords with
+    # the base.
+    base_words = list(base)
+    extras = []
+    for k in range(3):
+        extra = BilingualDictionary(base.format)
+        for i in range(100000):
+            if i % 10 == 0:
+                word = base_words[(i * 7 + k) % len(base_words)]
+            else:
+                word = unichr(0x3400 + i % 6000) + unichr(0x4e00 + k) + \
+                    unichr(0x4e00 + i // 6000)
+            extra.add_entry(DictionaryEntry(word, ['\u3042'],
+                                            ['term %d' % i]))
+        extras.append(extra)
+
+    def by_hand():
+        merged = BilingualDictionary(base.format)
+        for d in [base] + extras:
+            for word, entry in d.items():
+                entry = DictionaryEntry(word, list(entry.readings),
+                                        list(entry.senses))
+                if word in merged:
+                    merged[word].update(entry)
+                    merged[word] = merged[word]
+                else:
+                    merged[word] = entry
+        return merged
+
+    def merge():
+        merged = BilingualDictionary(base.format)
+        for d in [base] + extras:
+            merged.update(d, clash_policy=ClashPolicy.Merge)
+        return merged
+
+    report('copying loop', by_hand, repeat=1)
+    report('update(clash_policy=Merge)', merge, repeat=1)
+
+
+@benchmark
+def code_index():
+    """ Boolean code queries over a 200k-line EDICT: sets against bitmaps. """
+    import timeit
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources.code_index import CodeIndex
+    from cjktools.resources.split_by_codes import load_coded_dictionary
+
+    filename = synthetic_edict()
+
+    # Mark a third of the entries as archaic, for something to exclude.
+    with sopen(filename, 'r') as istream:
+        lines = istream.readlines()
+    with sopen(filename, 'w') as ostream:
+        ostream.write(lines[0])
+        for i, line in enumerate(lines[1:]):
+            if i % 3 == 0:
+                line = line.replace('/(n) ', '/(n) (arch) ', 1)
+            ostream.write(line)
+
+    coded = load_coded_dictionary(filename)
+    with sopen(filename, 'r') as istream:
+        dictionary = load_dictionary(istream)
+
+    report('CodeIndex()', lambda: CodeIndex(dictionary), repeat=1)
+    index = CodeIndex(dictionary)
+
+    def with_sets():
+        return set(coded['n']).difference(coded['arch'])
+
+    for label, method in (('set(coded[n]) - coded[arch]', with_sets),
+                          ('index.count(n and not arch)',
+                           lambda: index.count('n and not arch')),
+                          ('index.words(n and not arch)',
+                           lambda: index.words('n and not arch'))):
+        n = 10
+        total = timeit.timeit(method, number=n)
+        print('  %-48s %9.1fms' % (label, 1e3 * total / n))
+
+
+@benchmark
+def split_dictionary():
+    """ Splitting a 200k-line EDICT into one file per code. """
+    import tracemalloc
+    from cjktools.resources import split_by_codes
+
+    filename = synthetic_edict()
+    report('load_coded_dictionary()',
+           lambda: split_by_codes.load_coded_dictionary(filename), repeat=1)
+    for processes in (1, 2, None):
+        for suffix in ('', '.gz'):
+            output_dir = temp_dir()
+            report('split_dictionary(processes=%s, suffix=%r)' %
+                   (processes, suffix),
+                   lambda: split_by_codes.split_dictionary(
+                       filename, output_dir, suffix=suffix,
+                       processes=processes),
+                   repeat=1)
+
+    for label, method in (
+            ('load_coded_dictionary()',
+             lambda: split_by_codes.load_coded_dictionary(filename)),
+            ('split_dictionary()',
+             lambda: split_by_codes.split_dictionary(filename,
+                                                     temp_dir()))):
+        tracemalloc.start()
+        method()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('  %-48s %8.1fMB' % ('peak heap, ' + label, peak / 1e6))
+
+
+@benchmark
+def code_extraction():
+    """ Finding the codes of each entry of a 200k-line EDICT. """
+    from cjktools.common import sopen
+    from cjktools.resources.auto_format import load_dictionary
+    from cjktools.resources import split_by_codes
+
+    filename = synthetic_edict()
+    with sopen(filename, 'r') as istream:
+        entries = list(load_dictionary(istream).values())
+
+    def per_sense():
+        # As load_coded_dictionary used to, one sense at a time.
+        for entry in entries:
+            codes = set()
+            for sense in entry.senses:
+                for match in split_by_codes._code_pattern.findall(sense):
+                    for code in match.split(','):
+                        if code in split_by_codes._known_codes:
+                            codes.add(code)
+
+    def first_use():
+        for entry in entries:
+            entry._codes = None
+            entry.codes
+
+    report('per sense, split and checked', per_sense)
+    report('entry.codes, first use', first_use)
+    report('entry.codes, cached', lambda: [e.codes for e in entries])
+    report('load_coded_dictionary()',
+           lambda: split_by_codes.load_coded_dictionary(filename), repeat=1)
+
+
+def synthetic_tatoeba(n_rows=500000, n_languages=400):
+    """
+    Writes a synthetic sentences_detailed.csv with the given number of rows
+    spread over the given number of languages to a temporary file, and
+    returns its filename.
+    """
+    import os
+    from cjktools.common import sopen
+
+    filename = os.path.join(temp_dir(), 'sentences_detailed.csv')
+    with sopen(filename, 'w') as ostream:
+        for i in range(n_rows):
+            lang = 'l%03d' % (i * 7919 % n_languages)
+            added = '\\N' if i % 3 else '2010-06-24 14:20:%02d' % (i % 60)
+            ostream.write('%d\t%s\tSentence number %d, in %s.\tuser%d\t%s'
+                          '\t2011-01-01 00:00:00\n' %
+                          (2 * i + 1, lang, i, lang, i % 1000, added))
+
+    return filename
+
+
+@benchmark
+def tatoeba_language():
+    """ Looking up sentence languages in a 500k-row, 400-language corpus. """
+    import random
+    from six import iteritems
+    from cjktools.resources.tatoeba import TatoebaSentenceReader
+
+    reader = TatoebaSentenceReader(synthetic_tatoeba())
+    sent_ids = random.sample(list(reader), 10000)
+    language_sets = reader._language_dict
+
+    def scan_sets():
+        # As language() used to, through every language's id set.
+        for sent_id in sent_ids:
+            for lang, sent_id_set in iteritems(language_sets):
+                if sent_id in sent_id_set:
+                    break
+
+    report('10k lookups, scanning language sets', scan_sets)
+    report('10k lookups, language()',
+           lambda: [reader.language(i) for i in sent_ids])
+
+
+@benchmark
+def tatoeba_compact():
+    """ Heap and lookups for a 500k-row Tatoeba, as dicts and columns. """
+    import gc
+    import random
+    import timeit
+    import tracemalloc
+    from cjktools.resources.tatoeba import TatoebaSentenceReader
+
+    filename = synthetic_tatoeba()
+    for compact in (False, True):
+        gc.collect()
+        tracemalloc.start()
+        reader = TatoebaSentenceReader(filename, compact=compact)
+        gc.collect()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('  %-48s %8.1fMB' % ('TatoebaSentenceReader(compact=%s)' %
+                                   compact, size / 1e6))
+
+        sent_ids = random.sample(list(reader), 10000)
+        start = timeit.default_timer()
+        for sent_id in sent_ids:
+            reader[sent_id]
+            reader.language(sent_id)
+            reader.details(sent_id)
+        total = timeit.default_timer() - start
+        print('  %-48s %9.1fus' % ('sentence, language and details',
+                                    1e6 * total / len(sent_ids)))
+
+    report('TatoebaSentenceReader(compact=False)',
+           lambda: TatoebaSentenceReader(filename), repeat=1)
+    report('TatoebaSentenceReader(compact=True)',
+           lambda: TatoebaSentenceReader(filename, compact=True), repeat=1)
+
+
+@benchmark
+def tatoeba_lazy():
+    """ Opening a 500k-row Tatoeba and reading 1k sentences, lazily. """
+    import os
+    import gc
+    import random
+    import tracemalloc
+    from cjktools.resources.tatoeba import (TatoebaSentenceReader,
+                                            TatoebaLazySentenceReader)
+
+    filename = synthetic_tatoeba()
+    sent_ids = random.sample(range(1, 1000000, 2), 1000)
+
+    def read(reader):
+        for sent_id in sent_ids:
+            reader[sent_id]
+            reader.language(sent_id)
+            reader.details(sent_id)
+
+    report('TatoebaSentenceReader(), then reads',
+           lambda: read(TatoebaSentenceReader(filename)), repeat=1)
+    report('TatoebaLazySentenceReader(), building the index',
+           lambda: TatoebaLazySentenceReader(filename), repeat=1)
+    report('TatoebaLazySentenceReader(), with the index',
+           lambda: TatoebaLazySentenceReader(filename))
+    report('TatoebaLazySentenceReader(), then reads',
+           lambda: read(TatoebaLazySentenceReader(filename)))
+
+    gc.collect()
+    tracemalloc.start()
+    reader = TatoebaLazySentenceReader(filename)
+    read(reader)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    print('  %-48s %8.1fMB' % ('TatoebaLazySentenceReader() heap', size / 1e6))
+    print('  %-48s %8.1fMB' % ('index file',
+                               os.path.getsize(filename + '.idx') / 1e6))
+
+
+def main(names):
+    for name in names or sorted(BENCHMARKS):
+        print('%s: %s' % (name, BENCHMARKS[name].__doc__.strip()))
+        try:
+            BENCHMARKS[name]()
+        finally:
+            remove_temp_dirs()
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])